@@ -1,63 +1,69 @@
-import math
+import os
+import sys
 import csv
 import time
+import argparse
 
-def validate_all_builds():
-    """
-    Tests all combinations of Damage, Range, and Area
-    to find valid builds within the PC (Creation Points) budget.
-    """
-    print("Starting validation of all builds...")
-    start_time = time.time()
+# Makes the shared 'Game_Design.libs' importable when running this script directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from Game_Design.libs import columnar, rule_versions
+from Game_Design.libs.synergia_rules import PowerEconomy
 
-    # --- System Constants ---
-    MAX_PC_BUDGET = 60
-    MAX_ALCANCE = 20
-    MAX_AREA = 36
+# --- System Constants ---
+# The PC budget and cost formulas are rule parameters of PowerEconomy (see rule_versions)
+MAX_ALCANCE = 20
+MAX_AREA = 36
 
-    # Maximum 'X' dice to test.
-    # If (X*4)/2 = 60 (d4 damage), X = 30.
-    # Using 30 as a safe ceiling.
-    MAX_DICE_X = 30
+# Maximum 'X' dice to test.
+# If (X*4)/2 = 60 (d4 damage), X = 30.
+# Using 30 as a safe ceiling.
+MAX_DICE_X = 30
 
-    DIE_TYPES_Y = [4, 6, 8, 10, 12]  # d4, d6, d8, d10, d12
-    # -----------------------------
+DIE_TYPES_Y = [4, 6, 8, 10, 12]  # d4, d6, d8, d10, d12
+# -----------------------------
 
-    valid_builds = []
-    total_iterations = 0
 
+def iter_valid_builds():
+    """
+    Yields every valid build (a dict with the CSV columns) one at a time,
+    so callers such as database loaders never hold the whole list.
+    """
     # 4 nested loops to test all combinations
     for y_die in DIE_TYPES_Y:
         for x_dice in range(1, MAX_DICE_X + 1):
             for range_val in range(0, MAX_ALCANCE + 1):
                 for area_val in range(0, MAX_AREA + 1):
 
-                    total_iterations += 1
-
-                    # --- Cost Calculation (Your Formulas) ---
-                    damage_cost = (x_dice * y_die) / 2
-                    range_cost = math.ceil(range_val / 2)
-                    area_cost = area_val
-
-                    total_pc_cost = damage_cost + range_cost + area_cost
-
-                    # --- Validation ---
-                    if total_pc_cost <= MAX_PC_BUDGET:
+                    # --- Cost Calculation and Validation (PowerEconomy rules) ---
+                    cost = PowerEconomy.calculate_cost(x_dice, y_die, range_val, area_val)
+                    if cost["is_valid"]:
                         # Calculates average damage for analysis
                         # Average of 1 die Y = (Y + 1) / 2
-                        calculated_avg_damage = x_dice * ((y_die + 1) / 2)
+                        calculated_avg_damage = PowerEconomy.estimate_avg_damage(x_dice, y_die)
 
-                        build_info = {
+                        yield {
                             "Damage_Description": f"{x_dice}d{y_die}",
                             "Range_Blocks": range_val,
                             "Area_Blocks": area_val,
-                            "Total_PC_Cost": total_pc_cost,
+                            "Total_PC_Cost": cost["total_pc"],
                             "Avg_Damage": round(calculated_avg_damage, 2),
-                            "Damage_Cost": damage_cost,
-                            "Range_Cost": range_cost,
-                            "Area_Cost": area_cost
+                            "Damage_Cost": cost["custo_dano"],
+                            "Range_Cost": cost["custo_alcance"],
+                            "Area_Cost": cost["custo_area"]
                         }
-                        valid_builds.append(build_info)
+
+
+def validate_all_builds(output_format="csv"):
+    """
+    Tests all combinations of Damage, Range, and Area
+    to find valid builds within the PC (Creation Points) budget.
+    output_format: "csv", "npy" (columnar .npy + .schema.json) or "both".
+    """
+    print("Starting validation of all builds...")
+    start_time = time.time()
+
+    valid_builds = list(iter_valid_builds())
+    total_iterations = len(DIE_TYPES_Y) * MAX_DICE_X * (MAX_ALCANCE + 1) * (MAX_AREA + 1)
 
     end_time = time.time()
     print(f"Validation completed in {end_time - start_time:.2f} seconds.")
@@ -68,23 +74,35 @@ def validate_all_builds():
         print("No valid build found with the provided parameters.")
         return
 
-    print(f"Total of {len(valid_builds):,} valid builds (<= {MAX_PC_BUDGET} PC) found.")
+    print(f"Total of {len(valid_builds):,} valid builds (<= {PowerEconomy.MAX_PC_BUDGET} PC) found.")
+
+    # Save the columnar table; the CSV is derived from it
+    table = columnar.builds_table(valid_builds)
+    saved = {}
+    if output_format in ("npy", "both"):
+        try:
+            output_filename = columnar.save_table("power_builds_validation.npy", table, "builds",
+                                                  metadata={"max_pc_budget": PowerEconomy.MAX_PC_BUDGET})
+            saved["npy"] = output_filename
+            print(f"\n[SUCCESS] All valid builds were saved in '{output_filename}'")
+        except Exception as e:
+            print(f"\n[ERROR] Could not save NPY file: {e}")
 
-    # Save to CSV
-    output_filename = "power_builds_validation.csv"
-    try:
-        with open(output_filename, 'w', newline='', encoding='utf-8') as f:
-            # Gets keys from first dictionary to use as header
-            fieldnames = valid_builds[0].keys()
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
+    if output_format in ("csv", "both"):
+        output_filename = "power_builds_validation.csv"
+        try:
+            with open(output_filename, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows(columnar.builds_csv_rows(table))
+            saved["csv_path"] = output_filename
 
-            writer.writeheader()
-            writer.writerows(valid_builds)
+            print(f"\n[SUCCESS] All valid builds were saved in '{output_filename}'")
 
-        print(f"\n[SUCCESS] All valid builds were saved in '{output_filename}'")
+        except Exception as e:
+            print(f"\n[ERROR] Could not save CSV file: {e}")
 
-    except Exception as e:
-        print(f"\n[ERROR] Could not save CSV file: {e}")
+    # Track the output, so a later rule tweak only recomputes it if the economy changed
+    if saved:
+        rule_versions.record_output("builds", {}, **saved)
 
     # --- Quick Analysis (Insights) ---
     print("\n--- Quick Builds Analysis ---")
@@ -97,32 +115,36 @@ def validate_all_builds():
     print(f"   Cost: {build_max_damage_general['Total_PC_Cost']} PC")
 
     # Find builds that cost exactly 60 PC
-    builds_max_level = [b for b in valid_builds if b["Total_PC_Cost"] == MAX_PC_BUDGET]
+    builds_max_level = [b for b in valid_builds if b["Total_PC_Cost"] == PowerEconomy.MAX_PC_BUDGET]
 
     if builds_max_level:
-        print(f"\nFound {len(builds_max_level)} 'max level' builds (exactly 60 PC).")
+        print(f"\nFound {len(builds_max_level)} 'max level' builds (exactly {PowerEconomy.MAX_PC_BUDGET} PC).")
 
         # Find 60 PC build with highest damage
         build_max_damage_60pc = max(builds_max_level, key=lambda b: b["Avg_Damage"])
-        print(f"🎯 Highest Damage Build (costing exactly 60 PC):")
+        print(f"🎯 Highest Damage Build (costing exactly {PowerEconomy.MAX_PC_BUDGET} PC):")
         print(f"   {build_max_damage_60pc['Damage_Description']} (Avg: {build_max_damage_60pc['Avg_Damage']})")
         print(f"   Range: {build_max_damage_60pc['Range_Blocks']}, Area: {build_max_damage_60pc['Area_Blocks']}")
 
         # Find 60 PC build with highest range
         build_max_range_60pc = max(builds_max_level, key=lambda b: b["Range_Blocks"])
-        print(f"🔭 Highest Range Build (costing exactly 60 PC):")
+        print(f"🔭 Highest Range Build (costing exactly {PowerEconomy.MAX_PC_BUDGET} PC):")
         print(f"   {build_max_range_60pc['Damage_Description']} (Avg: {build_max_range_60pc['Avg_Damage']})")
         print(f"   Range: {build_max_range_60pc['Range_Blocks']}, Area: {build_max_range_60pc['Area_Blocks']}")
 
         # Find 60 PC build with highest area
         build_max_area_60pc = max(builds_max_level, key=lambda b: b["Area_Blocks"])
-        print(f"💥 Highest Area Build (costing exactly 60 PC):")
+        print(f"💥 Highest Area Build (costing exactly {PowerEconomy.MAX_PC_BUDGET} PC):")
         print(f"   {build_max_area_60pc['Damage_Description']} (Avg: {build_max_area_60pc['Avg_Damage']})")
         print(f"   Range: {build_max_area_60pc['Range_Blocks']}, Area: {build_max_area_60pc['Area_Blocks']}")
     else:
-        print("\nNo build found that costs exactly 60 PC.")
+        print(f"\nNo build found that costs exactly {PowerEconomy.MAX_PC_BUDGET} PC.")
 
 
 # --- To Run the Script ---
 if __name__ == "__main__":
-    validate_all_builds()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Validates every Damage/Range/Area build within the PC budget.")
+    parser.add_argument("--format", choices=["csv", "npy", "both"], default="csv",
+                        help="Output: CSV, columnar .npy (+ .schema.json sidecar) or both.")
+    args = parser.parse_args()
+    validate_all_builds(output_format=args.format)
\ No newline at end of file
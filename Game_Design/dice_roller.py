@@ -1,5 +1,13 @@
+import re
 from random import randint
 
+import numpy as np
+
+from Game_Design.libs.synergia_rules import DiceEngine
+
+MAX_EXPLOSION_DEPTH = DiceEngine.MAX_EXPLOSION_DEPTH  # Same limits as the rules engine
+EXPLOSION_MODES = DiceEngine.EXPLOSION_MODES
+
 """
 Many functions were inspired by the Discord bot rollem
 
@@ -40,12 +48,25 @@ def roll_XdYdh_Z(x, y, z):
         rolls_sort.pop(0)
     return rolls_sort
 
-# roll XdY exploding at Z and above
-def roll_XdY_eZ(x, y, z):
+# roll XdY exploding at Z and above, one round of explosions per loop (no recursion)
+# mode 'first': while the first die of the latest pool explodes, roll a new XdY
+# mode 'each': every die >= Z adds one more die, which can explode in turn
+def roll_XdY_eZ(x, y, z, mode='first', max_depth=MAX_EXPLOSION_DEPTH):
+    if mode not in EXPLOSION_MODES:
+        raise ValueError(f"Unknown explosion mode '{mode}' (choose from {EXPLOSION_MODES}).")
     result = roll_XdY(x, y)
     soma = sum(result)
-    if result[0] >= z:
-        soma += roll_XdY_eZ(x, y, z)
+    for _ in range(max_depth):
+        if mode == 'first':
+            if not result or result[0] < z:
+                break
+            result = roll_XdY(x, y)
+        else:
+            exploded = sum(1 for r in result if r >= z)
+            if not exploded:
+                break
+            result = roll_XdY(exploded, y)
+        soma += sum(result)
     return soma
 
 # roll XdY, missing in an 1 and criting in the max value of the die
@@ -75,5 +96,150 @@ def roll_witcher_1d10(base=0):
     return base
     pass
 
+# --- Bulk stat arrays (character creation) ---
+
+# "[N#]XdY[dlZ|dhZ]", e.g. 6#4d6dl1 (six stats, each 4d6 dropping the lowest)
+STAT_METHOD_PATTERN = re.compile(r"^(?:(\d+)#)?(\d*)d(\d+)(?:(dl|dh)(\d+))?$")
+
+# Extended 5e point-buy costs for scores 3..18 (8 = 0 points, 15 = 9 points)
+POINT_BUY_MIN_SCORE = 3
+POINT_BUY_COSTS = np.array([-9, -6, -4, -2, -1, 0, 1, 2, 3, 4, 5, 7, 9, 12, 15, 19])
+
+MAX_CHUNK_DICE = 2 ** 24  # Dice drawn per chunk: bounds the temporary arrays of roll_stat_arrays
+
+
+def parse_stat_method(method):
+    """
+    Parses a stat-generation method in rollem notation.
+    Returns (stats, x, y, drop, z), with drop = 'dl', 'dh' or None.
+    """
+    match = STAT_METHOD_PATTERN.match(method.replace(" ", "").lower())
+    if not match:
+        raise ValueError(f"Invalid stat method '{method}' (expected e.g. 6#4d6dl1).")
+    stats, x, y, drop, z = match.groups()
+    stats, x, y, z = int(stats or 1), int(x or 1), int(y), int(z or 0)
+    if stats < 1 or x < 1 or y < 1:
+        raise ValueError("Stats, dice and sides must be at least 1.")
+    if z >= x:
+        raise ValueError(f"Cannot drop {z} of {x} dice.")
+    return stats, x, y, drop, z
+
+
+def die_dtype(y):
+    """Smallest integer dtype that holds every face of a y-sided die."""
+    for dtype in (np.int16, np.int32):
+        if y <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def roll_stat_arrays(method, n_arrays, seed=None):
+    """
+    Rolls n_arrays complete stat arrays at once (e.g. method='6#4d6dl1').
+    Returns an int32 array of shape (n_arrays, stats), one row per character.
+    """
+    stats, x, y, drop, z = parse_stat_method(method)
+    rng = np.random.default_rng(seed)
+    if x * y > np.iinfo(np.int32).max:
+        raise ValueError(f"{x}d{y} totals do not fit a stat array.")
+    result = np.empty((n_arrays, stats), dtype=np.int32)
+    dtype = die_dtype(y)
+
+    chunk = max(1, MAX_CHUNK_DICE // (stats * x))
+    for start in range(0, n_arrays, chunk):
+        stop = min(start + chunk, n_arrays)
+        # Dice on the first axis: reductions run over long contiguous rows
+        rolls = rng.integers(1, y + 1, size=(x, stop - start, stats), dtype=dtype)
+        if drop is None or z == 0:
+            totals = rolls.sum(axis=0)
+        elif z == 1:
+            # Dropping one die is a sum minus a min/max: no sort needed
+            extreme = rolls.min(axis=0) if drop == 'dl' else rolls.max(axis=0)
+            totals = rolls.sum(axis=0) - extreme
+        else:
+            rolls.sort(axis=0)
+            totals = rolls[z:].sum(axis=0) if drop == 'dl' else rolls[:x - z].sum(axis=0)
+        result[start:stop] = totals
+    return result
+
+
+def roll_exploding_pools(n_pools, x, y, z, mode='first', max_depth=MAX_EXPLOSION_DEPTH, seed=None):
+    """
+    Rolls n_pools exploding XdY pools at once, with the rules of roll_XdY_eZ.
+    Every round of explosions is a single draw for all the pools still exploding.
+    Returns an int64 array with the total of every pool.
+    """
+    if mode not in EXPLOSION_MODES:
+        raise ValueError(f"Unknown explosion mode '{mode}' (choose from {EXPLOSION_MODES}).")
+    if x < 1 or y < 1:
+        raise ValueError("Dice and sides must be at least 1.")
+    rng = np.random.default_rng(seed)
+    totals = np.empty(n_pools, dtype=np.int64)
+    dtype = die_dtype(y)
+
+    chunk = max(1, MAX_CHUNK_DICE // x)  # Explosions never add more than x dice per pool and round
+    for start in range(0, n_pools, chunk):
+        n = min(start + chunk, n_pools) - start
+        rolls = rng.integers(1, y + 1, size=(n, x), dtype=dtype)
+        chunk_totals = rolls.sum(axis=1, dtype=np.int64)
+
+        if mode == 'first':
+            exploding = np.flatnonzero(rolls[:, 0] >= z)  # Pools whose latest XdY exploded
+            for _ in range(max_depth):
+                if exploding.size == 0:
+                    break
+                rolls = rng.integers(1, y + 1, size=(exploding.size, x), dtype=dtype)
+                chunk_totals[exploding] += rolls.sum(axis=1, dtype=np.int64)
+                exploding = exploding[rolls[:, 0] >= z]
+        else:
+            pending = (rolls >= z).sum(axis=1)  # Extra dice owed to every pool
+            for _ in range(max_depth):
+                pools = np.flatnonzero(pending)
+                if pools.size == 0:
+                    break
+                owners = np.repeat(pools, pending[pools])
+                dice = rng.integers(1, y + 1, size=owners.size, dtype=dtype)
+                chunk_totals += np.bincount(owners, weights=dice, minlength=n).astype(np.int64)
+                pending = np.bincount(owners[dice >= z], minlength=n)
+
+        totals[start:start + n] = chunk_totals
+    return totals
+
+
+def point_buy_equivalent(arrays):
+    """Point-buy cost of every stat array (scores outside 3..18 are clamped to the table)."""
+    index = np.clip(arrays - POINT_BUY_MIN_SCORE, 0, len(POINT_BUY_COSTS) - 1)
+    return POINT_BUY_COSTS[index].sum(axis=-1)
+
+
+def value_distribution(values):
+    """{value: probability} of an integer array."""
+    low = int(values.min())
+    counts = np.bincount((values - low).ravel())
+    return {low + k: count / values.size for k, count in enumerate(counts.tolist()) if count}
+
+
+def prob_at_least_one(arrays, threshold):
+    """Fraction of stat arrays with at least one stat >= threshold."""
+    return float((arrays.max(axis=1) >= threshold).mean())
+
+
+def analyze_stat_method(method, n_arrays=1000000, seed=None, thresholds=(15, 16, 17, 18)):
+    """Odds of a stat-generation method, from n_arrays bulk-rolled arrays."""
+    arrays = roll_stat_arrays(method, n_arrays, seed)
+    totals = arrays.sum(axis=1, dtype=np.int64)
+    point_buy = point_buy_equivalent(arrays)
+    return {
+        "method": method,
+        "arrays": n_arrays,
+        "avg_total": float(totals.mean()),
+        "total_distribution": value_distribution(totals),
+        "avg_point_buy": float(point_buy.mean()),
+        "point_buy_percentiles": {p: float(np.percentile(point_buy, p)) for p in (10, 25, 50, 75, 90)},
+        "avg_sorted_stats": np.sort(arrays, axis=1)[:, ::-1].mean(axis=0).round(2).tolist(),
+        "prob_at_least_one": {n: prob_at_least_one(arrays, n) for n in thresholds},
+    }
+
+
 #print(roll_Nimble(4, 4, True))
 #print(roll_witcher_1d10(5))
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+Specialized Monte Carlo kernels for one fixed attack configuration.
+
+resolve_attack re-checks armor, crit rule, Vicious and the Advantage state on
+every roll and builds logs the sweeps never read. compile_attack() generates
+Python source for one configuration instead: dead branches removed, constants
+inlined, the sampling loop inside the generated function. Kernels are cached
+per configuration and set of rule parameters.
+
+Kernels draw from the global 'random' stream (random.seed applies) with the
+same distribution as CombatMechanics.resolve_attack, but not the same
+sequence of draws.
+"""
+import operator
+import random
+from functools import lru_cache
+
+from Game_Design.libs.synergia_rules import COMBAT_PARAMETERS, CombatMechanics, rule_parameters
+
+
+class AttackKernel:
+    """Generated functions for one configuration: roll() -> damage, run(n) -> (sum, sum of squares)."""
+
+    def __init__(self, config, source, namespace):
+        self.config = config
+        self.source = source
+        self.roll = namespace['roll']
+        self.run = namespace['run']
+
+    def average(self, n_simulations):
+        total, _ = self.run(n_simulations)
+        return total / n_simulations
+
+
+def _die(y):
+    """Expression for one die roll minus 1 (the +1s are summed up front)."""
+    return f"_int(_random() * {y})"
+
+
+def _finish(armor, bonus_damage):
+    """Damage expression once the final armor is known (same rules as resolve_attack)."""
+    divisor = CombatMechanics.ARMOR_DIVISOR
+    if armor == 's':
+        return f"total + {bonus_damage}"
+    if armor == 'm':
+        return f"(total + {bonus_damage}) // {divisor}"
+    return f"total // {divisor}"  # 'p' and 'b' drop the bonus, then divide
+
+
+def _attack_lines(num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule):
+    """Statements that leave the damage of one attack in 'damage'."""
+    y = die_sides
+    if y < 2:
+        return ["damage = 0"]  # Every primary roll is a 1: always a Miss
+
+    calc_adv_state = adv_state - CombatMechanics.ARMORED_DISADVANTAGE if armor_type == 'b' else adv_state
+    if calc_adv_state == 0:
+        primary = f"1 + {_die(y)}"
+    else:
+        pick = "_max" if calc_adv_state > 0 else "_min"
+        primary = f"1 + {pick}({', '.join([_die(y)] * (abs(calc_adv_state) + 1))})"
+
+    k = num_dice - 1
+    if k == 0:
+        secondary = ""
+    elif k <= 8:
+        secondary = f" + {k} + " + " + ".join([_die(y)] * k)
+    else:
+        secondary = f" + {k} + _sum([{_die(y)} for _ in _range({k})])"
+
+    lines = [
+        f"v = {primary}",
+        "if v == 1:",
+        "    damage = 0",
+        "else:",
+        f"    total = v{secondary}",
+        f"    if v == {y}:",
+    ]
+    if is_vicious:
+        lines += [f"        total += 1 + {_die(y)}"] * CombatMechanics.VICIOUS_DICE
+
+    if crit_rule == 't':
+        # One degradation for the crit plus one per exploding max face: count loop passes
+        lines += [
+            "        steps = 0",
+            f"        e = {y}",
+            f"        while e == {y}:",
+            f"            e = 1 + {_die(y)}",
+            "            total += e",
+            "            steps += 1",
+        ]
+        chain = [armor_type]
+        for _ in range(3):
+            chain.append(CombatMechanics.degrade_armor(chain[-1]))
+        branches = []
+        for steps in range(1, 4):
+            expr = _finish(chain[min(steps, 3)], bonus_damage)
+            if not branches or branches[-1][1] != expr:
+                branches.append((steps, expr))
+        if len(branches) == 1:
+            lines.append(f"        damage = {branches[0][1]}")
+        else:
+            for idx, (steps, expr) in enumerate(branches):
+                if idx == len(branches) - 1:
+                    lines += ["        else:", f"            damage = {expr}"]
+                else:
+                    keyword = "if" if idx == 0 else "elif"
+                    lines += [f"        {keyword} steps <= {branches[idx + 1][0] - 1}:",
+                              f"            damage = {expr}"]
+    else:
+        lines += [
+            f"        e = {y}",
+            f"        while e == {y}:",
+            f"            e = 1 + {_die(y)}",
+            "            total += e",
+            f"        damage = {_finish('s' if crit_rule == 'e' else armor_type, bonus_damage)}",
+        ]
+
+    lines += ["    else:", f"        damage = {_finish(armor_type, bonus_damage)}"]
+    return lines
+
+
+def compile_attack(num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule):
+    """
+    Returns the (cached) AttackKernel for this exact configuration and the current rule parameters.
+    Raises ValueError for a configuration that cannot be compiled.
+    """
+    try:  # Inlined into the generated source: integers only
+        num_dice, die_sides, adv_state, bonus_damage = map(operator.index, (num_dice, die_sides, adv_state,
+                                                                             bonus_damage))
+    except TypeError:
+        raise ValueError("num_dice, die_sides, adv_state and bonus_damage must be integers.") from None
+    if num_dice < 1 or die_sides < 1:
+        raise ValueError("num_dice and die_sides must be at least 1.")
+    if armor_type not in CombatMechanics.ARMOR_TIERS:
+        raise ValueError(f"Unknown armor '{armor_type}' (choose from {CombatMechanics.ARMOR_TIERS}).")
+    if crit_rule not in ('e', 't'):
+        raise ValueError(f"Unknown crit rule '{crit_rule}' (choose 'e' or 't').")
+    config = (num_dice, die_sides, adv_state, bool(is_vicious), bonus_damage, armor_type, crit_rule)
+    return _compile_attack(config, tuple(rule_parameters(COMBAT_PARAMETERS).values()))
+
+
+@lru_cache(maxsize=1024)
+def _compile_attack(config, parameters):
+    body = _attack_lines(*config)
+
+    source_lines = ["def roll():"]
+    source_lines += ["    " + line for line in body]
+    source_lines += ["    return damage", "", "def run(n):", "    acc = 0", "    acc_sq = 0",
+                     "    for _ in _range(n):"]
+    source_lines += ["        " + line for line in body]
+    source_lines += ["        acc += damage", "        acc_sq += damage * damage", "    return acc, acc_sq"]
+    source = "\n".join(source_lines) + "\n"
+
+    namespace = {
+        '_random': random.random, '_int': int, '_max': max, '_min': min, '_sum': sum, '_range': range,
+    }
+    exec(compile(source, f"<attack kernel {config}>", "exec"), namespace)
+    return AttackKernel(config, source, namespace)
@@ -0,0 +1,144 @@
+"""
+Binary columnar tables: a structured NumPy array (.npy) plus a JSON schema sidecar.
+
+np.load(path, mmap_mode='r') maps the file instead of parsing it, so analysis
+notebooks open a full sweep instantly and only touch the columns they read.
+The CSV outputs are still available, derived from the same arrays.
+
+    table, schema = columnar.load_table("power_builds_validation.npy")
+    table[table["die_sides"] == 8]["Avg_Damage"].mean()
+"""
+import csv
+import json
+
+import numpy as np
+
+from Game_Design.libs.sweeps import DICE_TYPES
+from Game_Design.libs.synergia_rules import rule_parameters, rules_fingerprint
+
+SCHEMA_VERSION = 1
+
+# Column names follow the CSV headers; "XdY" descriptions are split into two integer columns
+BUILD_DTYPE = np.dtype([
+    ("num_dice", "<i2"),
+    ("die_sides", "<i2"),
+    ("Range_Blocks", "<i2"),
+    ("Area_Blocks", "<i2"),
+    ("Total_PC_Cost", "<f8"),
+    ("Avg_Damage", "<f8"),
+    ("Damage_Cost", "<f8"),
+    ("Range_Cost", "<i2"),
+    ("Area_Cost", "<i2"),
+])
+BUILD_CSV_HEADER = ["Damage_Description", "Range_Blocks", "Area_Blocks", "Total_PC_Cost", "Avg_Damage",
+                    "Damage_Cost", "Range_Cost", "Area_Cost"]
+
+
+def npy_path(path):
+    return path if path.endswith(".npy") else path + ".npy"
+
+
+def schema_path(path):
+    return npy_path(path)[:-len(".npy")] + ".schema.json"
+
+
+# --- Save / load ---
+
+def save_table(path, table, kind, metadata=None):
+    """Writes the structured array and its schema sidecar. Returns the .npy path."""
+    path = npy_path(path)
+    np.save(path, table, allow_pickle=False)
+    schema = {
+        "schema_version": SCHEMA_VERSION,
+        "kind": kind,
+        "rows": len(table),
+        "columns": [{"name": name, "dtype": table.dtype[name].str} for name in table.dtype.names],
+        "rules": rules_fingerprint(),
+        "parameters": rule_parameters(),
+        "metadata": metadata or {},
+    }
+    with open(schema_path(path), 'w', encoding='utf-8') as f:
+        json.dump(schema, f, indent=2)
+    return path
+
+
+def load_table(path, mmap=True):
+    """
+    Returns (table, schema). With 'mmap' the array is a read-only memory map.
+    Raises ValueError if the array does not match its sidecar.
+    """
+    path = npy_path(path)
+    with open(schema_path(path), encoding='utf-8') as f:
+        schema = json.load(f)
+    if schema.get("schema_version") != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported schema version {schema.get('schema_version')!r}.")
+
+    table = np.load(path, mmap_mode='r' if mmap else None, allow_pickle=False)
+    columns = [{"name": name, "dtype": table.dtype[name].str} for name in table.dtype.names or ()]
+    if columns != schema["columns"] or len(table) != schema["rows"]:
+        raise ValueError(f"'{path}' does not match its schema sidecar.")
+    return table, schema
+
+
+# --- Build validation (validate_all_builds) ---
+
+def builds_table(builds):
+    """Structured array from iter_valid_builds() dicts."""
+    def rows():
+        for b in builds:
+            x, y = b["Damage_Description"].split('d')
+            yield (int(x), int(y), b["Range_Blocks"], b["Area_Blocks"], b["Total_PC_Cost"], b["Avg_Damage"],
+                   b["Damage_Cost"], b["Range_Cost"], b["Area_Cost"])
+    return np.fromiter(rows(), dtype=BUILD_DTYPE)
+
+
+def builds_csv_rows(table):
+    """CSV rows (header first), identical to the csv.DictWriter output of validate_all_builds."""
+    csv_rows = [list(BUILD_CSV_HEADER)]
+    for row in table.tolist():
+        x, y, range_blocks, area_blocks, total_cost, avg_damage, damage_cost, range_cost, area_cost = row
+        csv_rows.append([f"{x}d{y}", range_blocks, area_blocks, total_cost, avg_damage,
+                         damage_cost, range_cost, area_cost])
+    return csv_rows
+
+
+def builds_table_from_csv(path):
+    """Reads a validate_all_builds CSV back into a builds table."""
+    int_columns = ("Range_Blocks", "Area_Blocks", "Range_Cost", "Area_Cost")
+    with open(path, newline='', encoding='utf-8') as f:
+        builds = [{k: (int(v) if k in int_columns else v if k == "Damage_Description" else float(v))
+                   for k, v in row.items()} for row in csv.DictReader(f)]
+    return builds_table(builds)
+
+
+# --- Scenario grid (run_cenario_mode) ---
+
+def scenario_dtype():
+    return np.dtype([("num_dice", "<i2")] + [(f"d{y}", "<f8") for y in DICE_TYPES])
+
+
+def scenario_table(max_dice, values):
+    """Structured array (one row per dice count) from the {(num_dice, die_sides): average} of scenario_values."""
+    table = np.zeros(max_dice, dtype=scenario_dtype())
+    table["num_dice"] = np.arange(1, max_dice + 1)
+    for y in DICE_TYPES:
+        table[f"d{y}"] = [values[(i, y)] for i in range(1, max_dice + 1)]
+    return table
+
+
+def scenario_csv_rows(table):
+    """CSV rows (header first), formatted like scenario_grid."""
+    csv_rows = [["Dice Count"] + [f"d{y}" for y in DICE_TYPES]]
+    for row in table.tolist():
+        csv_rows.append([f"{row[0]}d"] + [f"{value:.3f}" for value in row[1:]])
+    return csv_rows
+
+
+def scenario_table_from_csv(path):
+    """Reads a scenario CSV back into a scenario table (values rounded to 3 decimals, as written)."""
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f, delimiter=';'))[1:]
+    table = np.zeros(len(rows), dtype=scenario_dtype())
+    for i, row in enumerate(rows):
+        table[i] = (int(row[0].rstrip('d')),) + tuple(float(v) for v in row[1:])
+    return table
@@ -0,0 +1,281 @@
+"""
+Space-filling sweeps over the joint rule-parameter space.
+
+A full grid over dice count x die type x advantage x vicious x bonus x crit
+rule x armor grows multiplicatively. Instead, a Latin hypercube or Sobol
+design picks a few hundred points spread evenly over the space. Each point is
+evaluated for every armor type, and a polynomial surrogate of expected damage
+is fitted per armor. An independent set of random held-out points measures
+how far the surrogate is from the engine.
+
+    result = doe.run_doe(max_dice=20, max_bonus=10, n_points=256, design='sobol')
+    result['surrogate'].predict('p', num_dice=12, die_sides=8, adv_state=1,
+                                is_vicious=False, bonus_damage=3, crit_rule='t')
+"""
+import itertools
+import math
+
+import numpy as np
+
+from Game_Design.libs.sweeps import DICE_TYPES, SWEEP_SEED, average_damage, derive_seed
+from Game_Design.libs.synergia_rules import CombatMechanics
+
+ARMOR_TYPES = ('s', 'm', 'p', 'b')
+DESIGNS = ('lhs', 'sobol')
+DEFAULT_DEGREE = 3
+HOLDOUT_FRACTION = 0.25  # Held-out points as a fraction of the design size (at least 32)
+
+# Design dimensions, in order; armor is not one of them (every point is evaluated per armor)
+FACTORS = ('num_dice', 'die_sides', 'adv_state', 'is_vicious', 'bonus_damage', 'crit_rule')
+
+# --- Designs on the unit hypercube ---
+
+# Joe & Kuo (2008) primitive polynomials (degree s, coefficients a) and initial
+# direction numbers m for Sobol dimensions 2..8 (dimension 1 is the van der Corput sequence)
+SOBOL_PARAMETERS = (
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+)
+SOBOL_BITS = 30
+
+
+def latin_hypercube(n, dims, rng):
+    """n points in [0, 1)^dims with exactly one point in each of the n slices of every axis."""
+    slices = np.stack([rng.permutation(n) for _ in range(dims)], axis=1)
+    return (slices + rng.random((n, dims))) / n
+
+
+def _sobol_directions(dims):
+    directions = np.zeros((dims, SOBOL_BITS), dtype=np.int64)
+    directions[0] = [1 << (SOBOL_BITS - 1 - i) for i in range(SOBOL_BITS)]
+    for d in range(1, dims):
+        s, a, m = SOBOL_PARAMETERS[d - 1]
+        v = directions[d]
+        for i in range(SOBOL_BITS):
+            if i < s:
+                v[i] = m[i] << (SOBOL_BITS - 1 - i)
+                continue
+            value = v[i - s] ^ (v[i - s] >> s)
+            for k in range(1, s):
+                if (a >> (s - 1 - k)) & 1:
+                    value ^= v[i - k]
+            v[i] = value
+    return directions
+
+
+def sobol(n, dims, rng=None):
+    """
+    First n points of the Sobol sequence in [0, 1)^dims (Gray-code order).
+    With an rng the points get a random digital shift: still a (t, s)-sequence, but no point at the origin.
+    Balance is best when n is a power of two.
+    """
+    if dims > len(SOBOL_PARAMETERS) + 1:
+        raise ValueError(f"Sobol designs support up to {len(SOBOL_PARAMETERS) + 1} dimensions.")
+    directions = _sobol_directions(dims)
+    points = np.zeros((n, dims), dtype=np.int64)
+    current = np.zeros(dims, dtype=np.int64)
+    for i in range(1, n):
+        bit = (~(i - 1) & i).bit_length() - 1  # Lowest zero bit of i - 1
+        current ^= directions[:, bit]
+        points[i] = current
+    if rng is not None:
+        points ^= rng.integers(0, 1 << SOBOL_BITS, size=dims)
+    return points / float(1 << SOBOL_BITS)
+
+
+# --- Parameter space ---
+
+def factor_levels(max_dice, max_bonus):
+    """Discrete levels of every design factor."""
+    return {
+        'num_dice': tuple(range(1, max_dice + 1)),
+        'die_sides': tuple(DICE_TYPES),
+        'adv_state': (-1, 0, 1),
+        'is_vicious': (False, True),
+        'bonus_damage': tuple(range(0, max_bonus + 1)),
+        'crit_rule': ('e', 't'),
+    }
+
+
+def to_configs(unit_points, levels):
+    """Maps points of [0, 1)^dims to configurations (dicts of factor -> level), slicing each axis evenly."""
+    configs = []
+    for point in unit_points:
+        config = {}
+        for u, factor in zip(point, FACTORS):
+            options = levels[factor]
+            config[factor] = options[min(int(u * len(options)), len(options) - 1)]
+        configs.append(config)
+    return configs
+
+
+def random_configs(n, levels, rng):
+    """n configurations drawn uniformly from the grid (held-out points, independent of the design)."""
+    return [{factor: levels[factor][rng.integers(len(levels[factor]))] for factor in FACTORS} for _ in range(n)]
+
+
+def _numeric(factor, value):
+    if factor == 'crit_rule':
+        return 1.0 if value == 't' else 0.0
+    return float(value)
+
+
+def encode(configs, levels):
+    """Configurations as a float matrix, every factor scaled to [0, 1] over its levels."""
+    columns = []
+    for factor in FACTORS:
+        options = [_numeric(factor, level) for level in levels[factor]]
+        low, span = min(options), (max(options) - min(options)) or 1.0
+        columns.append([(_numeric(factor, c[factor]) - low) / span for c in configs])
+    return np.array(columns, dtype=float).T
+
+
+# --- Surrogate ---
+
+def monomial_exponents(levels, degree):
+    """
+    Exponent tuples of every monomial up to total 'degree'. A factor with k levels
+    is capped at power k - 1 (x^2 = x for a yes/no factor adds nothing).
+    """
+    caps = [min(degree, len(levels[factor]) - 1) for factor in FACTORS]
+    return [exps for exps in itertools.product(*(range(cap + 1) for cap in caps)) if sum(exps) <= degree]
+
+
+class PolynomialSurrogate:
+    """Least-squares polynomial of the scaled factors, with one coefficient vector per armor type."""
+
+    def __init__(self, levels, degree, coefficients):
+        self.levels = levels
+        self.degree = degree
+        self.exponents = monomial_exponents(levels, degree)
+        self.coefficients = coefficients  # armor -> array aligned with self.exponents
+
+    @staticmethod
+    def features(x, exponents):
+        return np.stack([np.prod(x ** np.array(exps), axis=1) for exps in exponents], axis=1)
+
+    @classmethod
+    def fit(cls, configs, values, levels, degree=DEFAULT_DEGREE):
+        """values: {armor: expected damage of every config}."""
+        exponents = monomial_exponents(levels, degree)
+        if len(configs) < len(exponents):
+            raise ValueError(f"A degree-{degree} surrogate needs at least {len(exponents)} design points "
+                             f"(got {len(configs)}).")
+        x = cls.features(encode(configs, levels), exponents)
+        coefficients = {armor: np.linalg.lstsq(x, np.asarray(v, dtype=float), rcond=None)[0]
+                        for armor, v in values.items()}
+        return cls(levels, degree, coefficients)
+
+    def predict_many(self, armor, configs):
+        return self.features(encode(configs, self.levels), self.exponents) @ self.coefficients[armor]
+
+    def predict(self, armor, **config):
+        return float(self.predict_many(armor, [config])[0])
+
+    def to_dict(self):
+        """JSON-friendly form: the factors, their levels, the monomial exponents and the coefficients."""
+        return {
+            "factors": list(FACTORS),
+            "levels": {factor: list(options) for factor, options in self.levels.items()},
+            "scaling": "each factor mapped linearly from [min level, max level] to [0, 1] (crit_rule: e=0, t=1)",
+            "degree": self.degree,
+            "exponents": [list(exps) for exps in self.exponents],
+            "coefficients": {armor: c.tolist() for armor, c in self.coefficients.items()},
+        }
+
+
+def error_summary(actual, predicted):
+    """RMSE, largest absolute error, mean relative error (where the actual value is not 0) and R^2."""
+    actual, predicted = np.asarray(actual, dtype=float), np.asarray(predicted, dtype=float)
+    errors = predicted - actual
+    nonzero = actual != 0
+    total_var = float(np.sum((actual - actual.mean()) ** 2))
+    return {
+        "n": int(actual.size),
+        "rmse": float(np.sqrt(np.mean(errors ** 2))),
+        "max_abs_error": float(np.max(np.abs(errors))),
+        "mean_rel_error": float(np.mean(np.abs(errors[nonzero]) / actual[nonzero])) if nonzero.any() else 0.0,
+        "r2": 1 - float(np.sum(errors ** 2)) / total_var if total_var else 1.0,
+    }
+
+
+# --- Evaluation ---
+
+def exact_evaluator(config, armor_type):
+    """Expected damage from CombatMechanics.expected_damage (closed form, no sampling noise)."""
+    return CombatMechanics.expected_damage(armor_type=armor_type, **config)
+
+
+def monte_carlo_evaluator(n_simulations, seed=SWEEP_SEED):
+    """Evaluator running the compiled Monte Carlo kernels, one derived seed (and cache entry) per point."""
+    def evaluate(config, armor_type):
+        key = tuple(config[factor] for factor in FACTORS) + (armor_type,)
+        return average_damage(armor_type=armor_type, n_simulations=n_simulations,
+                              seed=None if seed is None else derive_seed(seed, 'doe', *key), **config)
+    return evaluate
+
+
+def design_points(design, n_points, levels, rng):
+    if design == 'lhs':
+        unit = latin_hypercube(n_points, len(FACTORS), rng)
+    elif design == 'sobol':
+        unit = sobol(n_points, len(FACTORS), rng)
+    else:
+        raise ValueError(f"Unknown design '{design}' (choose from {DESIGNS}).")
+    return to_configs(unit, levels)
+
+
+def run_doe(max_dice, max_bonus, n_points, design='lhs', degree=DEFAULT_DEGREE, n_holdout=None,
+            evaluate=exact_evaluator, seed=SWEEP_SEED, on_point=None):
+    """
+    Samples 'n_points' configurations with the design, evaluates each one for every
+    armor type, fits a PolynomialSurrogate and scores it on 'n_holdout' independent
+    random configurations. 'on_point' is called after every evaluated configuration.
+
+    Returns {'design', 'configs', 'values', 'surrogate', 'holdout', 'errors'} where
+    values and holdout values are {armor: list} and errors is {armor or 'all': error_summary}.
+    """
+    levels = factor_levels(max_dice, max_bonus)
+    rng = np.random.default_rng(seed)
+    if n_holdout is None:
+        n_holdout = max(32, math.ceil(n_points * HOLDOUT_FRACTION))
+
+    memo = {}  # Designs on coarse axes repeat configurations: evaluate each one once
+
+    def evaluate_all(configs):
+        values = {armor: [] for armor in ARMOR_TYPES}
+        for config in configs:
+            key = tuple(config[factor] for factor in FACTORS)
+            if key not in memo:
+                memo[key] = {armor: evaluate(config, armor) for armor in ARMOR_TYPES}
+            for armor in ARMOR_TYPES:
+                values[armor].append(memo[key][armor])
+            if on_point is not None:
+                on_point()
+        return values
+
+    configs = design_points(design, n_points, levels, rng)
+    values = evaluate_all(configs)
+    surrogate = PolynomialSurrogate.fit(configs, values, levels, degree)
+
+    holdout_configs = random_configs(n_holdout, levels, rng)
+    holdout_values = evaluate_all(holdout_configs)
+    predicted = {armor: surrogate.predict_many(armor, holdout_configs) for armor in ARMOR_TYPES}
+
+    errors = {armor: error_summary(holdout_values[armor], predicted[armor]) for armor in ARMOR_TYPES}
+    errors['all'] = error_summary(np.concatenate([holdout_values[a] for a in ARMOR_TYPES]),
+                                  np.concatenate([predicted[a] for a in ARMOR_TYPES]))
+    return {
+        "design": design,
+        "configs": configs,
+        "values": values,
+        "surrogate": surrogate,
+        "holdout": {"configs": holdout_configs, "values": holdout_values,
+                    "predicted": {armor: p.tolist() for armor, p in predicted.items()}},
+        "errors": errors,
+    }
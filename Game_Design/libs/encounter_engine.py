@@ -0,0 +1,197 @@
+import heapq
+import random
+from array import array
+from collections import Counter
+
+from Game_Design.libs.result_cache import cached
+from Game_Design.libs.synergia_rules import CombatMechanics, DiceEngine
+
+
+class Combatant:
+    """
+    Static description of one fighter (a player or a monster).
+    The attack fields are passed straight to CombatMechanics.resolve_attack.
+    """
+
+    def __init__(self, name, hp, armor='s', num_dice=1, die_sides=6, adv_state=0, is_vicious=False,
+                 bonus_damage=0, crit_rule='t', initiative=0, speed=10):
+        self.name = name
+        self.hp = hp
+        self.armor = armor
+        self.num_dice = num_dice
+        self.die_sides = die_sides
+        self.adv_state = adv_state
+        self.is_vicious = is_vicious
+        self.bonus_damage = bonus_damage
+        self.crit_rule = crit_rule
+        self.initiative = initiative  # Bonus added to the d20 initiative roll
+        self.speed = speed  # Ticks between two turns (ROUND_TICKS = one action per round)
+
+
+# --- Targeting policies ---
+# Each policy receives the alive enemy indices plus the state arrays and returns one index.
+
+def target_random(alive, hp, armor):
+    return random.choice(alive)
+
+
+def target_weakest(alive, hp, armor):
+    """Focus fire: lowest current HP."""
+    return min(alive, key=hp.__getitem__)
+
+
+def target_strongest(alive, hp, armor):
+    """Tank first: highest current HP."""
+    return max(alive, key=hp.__getitem__)
+
+
+def target_softest(alive, hp, armor):
+    """Lowest armor first (index 3 is 's' in ARMOR_TIERS)."""
+    return max(alive, key=armor.__getitem__)
+
+
+TARGETING_POLICIES = {
+    'random': target_random,
+    'weakest': target_weakest,
+    'strongest': target_strongest,
+    'softest': target_softest,
+}
+
+
+class Encounter:
+    """
+    Event-driven fight between two sides (0 = party, 1 = monsters).
+
+    Per-combatant state lives in compact parallel arrays (indexed by combatant),
+    and turns are scheduled with a heap of (tick, -initiative, index), so
+    faster combatants simply get pushed back into the queue more often.
+    """
+
+    ROUND_TICKS = 10
+    ARMOR_INDEX = {tier: i for i, tier in enumerate(CombatMechanics.ARMOR_TIERS)}
+
+    def __init__(self, party, monsters, party_policy='weakest', monster_policy='random', max_rounds=50):
+        self.combatants = list(party) + list(monsters)
+        self.sides = array('b', [0] * len(party) + [1] * len(monsters))
+        self.policies = (TARGETING_POLICIES[party_policy], TARGETING_POLICIES[monster_policy])
+        self.max_ticks = max_rounds * self.ROUND_TICKS
+
+        # Attack configuration is constant during the fight: pre-pack it once.
+        self.attacks = [
+            (c.num_dice, c.die_sides, c.adv_state, c.is_vicious, c.bonus_damage, c.crit_rule)
+            for c in self.combatants
+        ]
+        self.start_hp = array('i', [c.hp for c in self.combatants])
+        self.start_armor = array('b', [self.ARMOR_INDEX[c.armor] for c in self.combatants])
+
+    def run(self):
+        """
+        Plays one fight until a side is wiped out or max_rounds is reached.
+        Returns (winner, rounds), with winner = 0, 1 or None (draw / timeout).
+        """
+        tiers = CombatMechanics.ARMOR_TIERS
+        resolve_attack = CombatMechanics.resolve_attack
+        hp = array('i', self.start_hp)
+        armor = array('b', self.start_armor)
+        alive = ([], [])
+        turn_queue = []
+
+        # 1. Initiative: d20 + bonus, higher acts first on the same tick
+        for idx, c in enumerate(self.combatants):
+            alive[self.sides[idx]].append(idx)
+            init_roll = DiceEngine.roll_die(20) + c.initiative
+            turn_queue.append((0, -init_roll, idx))
+        heapq.heapify(turn_queue)
+
+        tick = 0
+        while alive[0] and alive[1]:
+            tick, order, idx = heapq.heappop(turn_queue)
+            if tick >= self.max_ticks:
+                return None, self.max_ticks // self.ROUND_TICKS
+            if hp[idx] <= 0:
+                continue  # Dead combatants drop out of the queue
+
+            # 2. Pick a target on the other side and attack
+            enemy_side = 1 - self.sides[idx]
+            enemies = alive[enemy_side]
+            target = self.policies[self.sides[idx]](enemies, hp, armor)
+            num_dice, die_sides, adv_state, is_vicious, bonus_damage, crit_rule = self.attacks[idx]
+            result = resolve_attack(num_dice, die_sides, adv_state, is_vicious, bonus_damage,
+                                    tiers[armor[target]], crit_rule)
+
+            # 3. Apply damage and persistent armor wear (Tactical crits only; Epic ignores armor once)
+            hp[target] -= result["damage"]
+            if crit_rule == 't' and "final_armor" in result:
+                armor[target] = self.ARMOR_INDEX[result["final_armor"]]
+            if hp[target] <= 0:
+                enemies.remove(target)
+
+            heapq.heappush(turn_queue, (tick + self.combatants[idx].speed, order, idx))
+
+        winner = 0 if alive[0] else 1
+        return winner, tick // self.ROUND_TICKS + 1
+
+
+@cached
+def run_encounters(party, monsters, n_encounters=1000, seed=None, **encounter_options):
+    """
+    Runs the same encounter many times and aggregates the outcomes.
+    Returns win rates per side, draw rate and the fight-length distribution (in rounds).
+    Seeded runs are stored in the on-disk result cache; a seed does not disturb the global random stream.
+    """
+    encounter = Encounter(party, monsters, **encounter_options)  # Bad options raise before the seed is set
+    wins = [0, 0]
+    draws = 0
+    lengths = Counter()
+
+    if seed is not None:
+        outer_state = random.getstate()
+    try:
+        if seed is not None:
+            random.seed(seed)
+        for _ in range(n_encounters):
+            winner, rounds = encounter.run()
+            if winner is None:
+                draws += 1
+            else:
+                wins[winner] += 1
+            lengths[rounds] += 1
+    finally:
+        if seed is not None:
+            random.setstate(outer_state)
+
+    return {
+        "encounters": n_encounters,
+        "party_win_rate": wins[0] / n_encounters,
+        "monster_win_rate": wins[1] / n_encounters,
+        "draw_rate": draws / n_encounters,
+        "avg_rounds": sum(r * c for r, c in lengths.items()) / n_encounters,
+        "length_distribution": dict(sorted(lengths.items())),
+    }
+
+
+# --- To Run the Script (from the repository root: python -m Game_Design.libs.encounter_engine) ---
+if __name__ == "__main__":
+    import time
+
+    party = [
+        Combatant("Warrior", hp=40, armor='p', num_dice=2, die_sides=8, bonus_damage=3, initiative=1),
+        Combatant("Mage", hp=24, armor='s', num_dice=4, die_sides=6, is_vicious=True, initiative=2),
+        Combatant("Rogue", hp=30, armor='m', num_dice=3, die_sides=6, adv_state=1, initiative=4, speed=8),
+    ]
+    monsters = [
+        Combatant(f"Goblin {i}", hp=15, armor='m', num_dice=1, die_sides=8, bonus_damage=2, crit_rule='e')
+        for i in range(1, 5)
+    ] + [Combatant("Ogre", hp=60, armor='b', num_dice=2, die_sides=12, bonus_damage=4, speed=14)]
+
+    start_time = time.time()
+    summary = run_encounters.uncached(party, monsters, n_encounters=5000, seed=42)  # Measure, not cache
+    elapsed = time.time() - start_time
+
+    print(f"{summary['encounters']:,} encounters in {elapsed:.2f}s "
+          f"({summary['encounters'] / elapsed:,.0f} encounters/s)")
+    print(f"Party wins: {summary['party_win_rate'] * 100:.1f}% | "
+          f"Monsters win: {summary['monster_win_rate'] * 100:.1f}% | "
+          f"Draws: {summary['draw_rate'] * 100:.1f}%")
+    print(f"Average fight length: {summary['avg_rounds']:.2f} rounds")
+    print(f"Length distribution: {summary['length_distribution']}")
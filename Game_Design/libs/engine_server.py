@@ -0,0 +1,297 @@
+"""
+Rules-engine sidecar: one warm process owning synergia_rules, serving analysis
+requests over a Unix socket (standard library only).
+
+Web workers no longer each import and warm their own engine and caches: they
+send newline-delimited JSON requests to this process (see Portal/core/engine_client.py)
+
+    -> {"id": 1, "op": "attack_analysis", "args": {"num_dice": 3, "die_sides": 8, ...}}
+    <- {"id": 1, "result": {...}}    or    {"id": 1, "error": "..."}
+
+Requests arriving within BATCH_WINDOW of each other, from any connection, are
+coalesced into one batch: identical requests (popular builds at a busy table)
+are evaluated once, results are kept in an LRU, and the whole batch runs in a
+single call on the engine thread. Requests that arrive while a batch is
+running form the next batch, so batches grow with the load.
+
+Batching only deduplicates: the distinct requests of a batch are still
+evaluated one after another (the operations are single-configuration exact
+computations with nothing to vectorize). What a batch saves is the duplicate
+and cached evaluations and one thread hand-off per batch instead of per request.
+
+    python -m Game_Design.libs.engine_server --socket /tmp/synergia-engine.sock
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from Game_Design.balance.balancete_magico import DIE_TYPES_Y, MAX_ALCANCE, MAX_AREA, MAX_DICE_X
+from Game_Design.libs import planner
+from Game_Design.libs.synergia_rules import CombatMechanics, PowerEconomy, rules_fingerprint
+
+DEFAULT_SOCKET = "/tmp/synergia-engine.sock"
+BATCH_WINDOW = 0.002  # Seconds a batch stays open for more requests after its first one
+MAX_BATCH = 256
+RESULT_CACHE_SIZE = 4096
+MAX_LINE = 64 * 1024  # Bytes per request line
+DAMAGE_PERCENTILES = (5, 25, 50, 75, 95)
+DISTRIBUTION_TOLERANCE = 1e-4  # Largest CDF error of an analysis (see planner)
+
+# Argument bounds (the portal views check the same ones)
+MAX_ATTACK_DICE = 100
+MAX_ATTACK_SIDES = 100
+MAX_ATTACK_BONUS = 100  # The distribution spans the bonus: bounds its size
+MAX_ADVANTAGE = 3
+
+
+# --- Operations ---
+
+def check_int(name, value, low, high):
+    """Raises ValueError unless 'value' is an integer (not a bool) in [low, high]."""
+    if not isinstance(value, int) or isinstance(value, bool) or not low <= value <= high:
+        raise ValueError(f"{name} must be an integer from {low} to {high} (got {value!r}).")
+
+
+def attack_analysis(num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule):
+    """
+    Damage analysis of one attack configuration. The distribution comes from the
+    cheapest method the planner finds within DISTRIBUTION_TOLERANCE (reported as 'method').
+    """
+    check_int('num_dice', num_dice, 1, MAX_ATTACK_DICE)
+    check_int('die_sides', die_sides, 2, MAX_ATTACK_SIDES)
+    check_int('adv_state', adv_state, -MAX_ADVANTAGE, MAX_ADVANTAGE)
+    check_int('bonus_damage', bonus_damage, 0, MAX_ATTACK_BONUS)
+    if not isinstance(is_vicious, bool):
+        raise ValueError(f"is_vicious must be a boolean (got {is_vicious!r}).")
+    if armor_type not in CombatMechanics.ARMOR_TIERS or crit_rule not in ('e', 't'):
+        raise ValueError("armor_type must be s, m, p or b and crit_rule e or t.")
+    config = (num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule)
+    evaluation = planner.default_planner().evaluate(config, 'distribution', DISTRIBUTION_TOLERANCE)
+    distribution = evaluation['value']
+    return {
+        'method': evaluation['method'],
+        'expected_damage': CombatMechanics.expected_damage(*config),
+        'std': distribution.variance() ** 0.5,
+        'p_zero_damage': distribution.prob(0),
+        'percentiles': {str(p): distribution.quantile(p / 100) for p in DAMAGE_PERCENTILES},
+    }
+
+
+def power_cost(num_dice, die_type, range_blocks, area_blocks):
+    """Cost breakdown (PowerEconomy.calculate_cost) and average damage of one power."""
+    # Same limits as the build catalog (balancete_magico)
+    check_int('num_dice', num_dice, 1, MAX_DICE_X)
+    check_int('die_type', die_type, 1, max(DIE_TYPES_Y))
+    check_int('range_blocks', range_blocks, 0, MAX_ALCANCE)
+    check_int('area_blocks', area_blocks, 0, MAX_AREA)
+    cost = PowerEconomy.calculate_cost(num_dice, die_type, range_blocks, area_blocks)
+    return {
+        'damage_cost': cost['custo_dano'], 'range_cost': cost['custo_alcance'], 'area_cost': cost['custo_area'],
+        'total_pc_cost': cost['total_pc'], 'is_valid': cost['is_valid'], 'max_pc_budget': PowerEconomy.MAX_PC_BUDGET,
+        'avg_damage': PowerEconomy.estimate_avg_damage(num_dice, die_type),
+    }
+
+
+def hello():
+    """Identifies the engine: clients refuse one running other rules than their own."""
+    return {'rules_version': rules_fingerprint(), 'pid': os.getpid()}
+
+
+def stats():
+    """'stats' run in-process (no batching here); the sidecar answers with EngineServer.stats_response."""
+    return {'in_process': True, 'pid': os.getpid()}
+
+
+# op -> fn(**args); results must be JSON-serializable
+OPERATIONS = {
+    'attack_analysis': attack_analysis,
+    'power_cost': power_cost,
+    'hello': hello,
+    'stats': stats,
+}
+UNCACHED_OPERATIONS = {'hello', 'stats'}
+
+
+def run_operation(op, args):
+    """{'result': ...} or {'error': ...} of one request (the same for the sidecar and in-process callers)."""
+    fn = OPERATIONS.get(op)
+    if fn is None:
+        return {'error': f"Unknown operation '{op}'."}
+    try:
+        return {'result': fn(**args)}
+    except (TypeError, ValueError, KeyError, IndexError) as e:
+        return {'error': str(e)}
+
+
+# --- Server ---
+
+class EngineServer:
+    """Unix-socket server coalescing concurrent requests into batches evaluated on one engine thread."""
+
+    def __init__(self, path=DEFAULT_SOCKET, window=BATCH_WINDOW, max_batch=MAX_BATCH,
+                 cache_size=RESULT_CACHE_SIZE):
+        self.path = path
+        self.window = window
+        self.max_batch = max_batch
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # (op, canonical args) -> response
+        self.engine = ThreadPoolExecutor(max_workers=1, thread_name_prefix="synergia-engine")
+        self.queue = None
+        self.stats = {'requests': 0, 'batches': 0, 'largest_batch': 0, 'evaluations': 0, 'cache_hits': 0}
+
+    def evaluate_batch(self, requests):
+        """Responses of a batch of (op, args): each distinct request is evaluated once (engine thread)."""
+        responses = []
+        evaluated = {}  # (op, canonical args) -> response, within this batch
+        for op, args in requests:
+            try:
+                if not isinstance(op, str):
+                    raise ValueError("'op' must be a string.")
+                key = (op, json.dumps(args, sort_keys=True))
+            except (TypeError, ValueError) as e:
+                responses.append({'error': f"Bad request: {e}"})
+                continue
+            if key not in evaluated:
+                evaluated[key] = self.evaluate_one(key, op, args)
+            responses.append(evaluated[key])
+        return responses
+
+    def evaluate_one(self, key, op, args):
+        """Response of one distinct request; never raises, so one request cannot fail its batch."""
+        try:
+            if op == 'stats':
+                return self.stats_response()
+            if op in UNCACHED_OPERATIONS:
+                return run_operation(op, args)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                return cached
+            response = run_operation(op, args)
+        except Exception as e:
+            return {'error': f"Engine failure: {e}"}
+        self.stats['evaluations'] += 1
+        if 'result' in response:
+            self.cache[key] = response
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return response
+
+    def stats_response(self):
+        return {'result': dict(self.stats, cached_results=len(self.cache), in_process=False, pid=os.getpid())}
+
+    async def batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.stats['batches'] += 1
+            self.stats['largest_batch'] = max(self.stats['largest_batch'], len(batch))
+            try:
+                responses = await loop.run_in_executor(self.engine, self.evaluate_batch,
+                                                       [(op, args) for op, args, _ in batch])
+            except Exception as e:  # Never leave a client waiting on a dead batch
+                responses = [{'error': f"Engine failure: {e}"}] * len(batch)
+            for (_, _, future), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(response)
+
+    async def handle_client(self, reader, writer):
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                pending.add(asyncio.ensure_future(self.respond(line, writer)))
+                pending = {task for task in pending if not task.done()}
+            await asyncio.gather(*pending)  # The client stopped sending: still answer what it asked
+        except (ConnectionError, ValueError):  # ValueError: line longer than MAX_LINE
+            pass
+        finally:
+            for task in pending:
+                task.cancel()
+            writer.close()
+
+    async def respond(self, line, writer):
+        """Queues one request line and writes its response (responses of one connection may come out of order)."""
+        try:
+            request = json.loads(line)
+            request_id, op, args = request.get('id'), request['op'], request.get('args', {})
+            if not isinstance(op, str):
+                raise ValueError("'op' must be a string.")
+            if not isinstance(args, dict):
+                raise ValueError("'args' must be an object.")
+        except (ValueError, KeyError, AttributeError) as e:
+            writer.write(json.dumps({'id': None, 'error': f"Bad request: {e}"}).encode('utf-8') + b"\n")
+            return
+
+        self.stats['requests'] += 1
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((op, args, future))
+        response = await future
+        writer.write(json.dumps({'id': request_id, **response}).encode('utf-8') + b"\n")
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def serve(self):
+        self.queue = asyncio.Queue()
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Stale socket of a previous run
+        server = await asyncio.start_unix_server(self.handle_client, path=self.path, limit=MAX_LINE)
+        batcher = asyncio.ensure_future(self.batcher())
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            batcher.cancel()
+            self.engine.shutdown(wait=False)
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+
+def warm_up():
+    """Fills the engine's lazy caches (residue roots, die characters) before the first request."""
+    for die_sides in (4, 6, 8, 10, 12):
+        for armor in CombatMechanics.ARMOR_TIERS:
+            attack_analysis(1, die_sides, 0, False, 0, armor, 't')
+
+
+# --- To Run the Script (from the repository root: python -m Game_Design.libs.engine_server) ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warm synergia_rules engine serving batched requests on a Unix socket.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET)
+    parser.add_argument("--window", type=float, default=BATCH_WINDOW * 1000,
+                        help="Milliseconds a batch waits for more requests.")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--cache-size", type=int, default=RESULT_CACHE_SIZE, help="Results kept in the LRU.")
+    args = parser.parse_args()
+
+    warm_up()
+    engine_server = EngineServer(args.socket, window=args.window / 1000, max_batch=args.max_batch,
+                                 cache_size=args.cache_size)
+    print(f"Synergia engine (rules {rules_fingerprint()}) listening on {args.socket}")
+    asyncio.run(engine_server.serve())
@@ -0,0 +1,388 @@
+"""
+Cost-based choice of how to evaluate an attack configuration.
+
+The same question (average damage, or the whole damage distribution) can be
+answered several ways:
+
+    closed_form   CombatMechanics.expected_damage (mean only; exact, constant time)
+    exact         damage_distribution with exact convolution (cost grows with the pool's support)
+    edgeworth     damage_distribution with a Normal/Edgeworth pool (cheaper on huge pools; error ~ 1/dice)
+    monte_carlo   the compiled attack kernel (error ~ 1/sqrt(samples))
+
+For a configuration and a requested precision the planner estimates the cost
+and the error of every method, runs the cheapest one that meets the precision
+and reports which one it used. Costs come from linear models
+(seconds = fixed + per_unit * work) fitted to recorded timings: every
+evaluation records its own, and 'calibrate' times every method on a set of
+reference configurations (and measures the Edgeworth error against exact).
+The timings are kept in the cache directory (see result_cache).
+
+Precision is an absolute error on the mean (in damage points), or the largest
+error of the cumulative distribution (Kolmogorov distance) for distributions,
+at CONFIDENCE for Monte Carlo.
+
+    python -m Game_Design.libs.planner calibrate
+    python -m Game_Design.libs.planner plan --num-dice 400 --die-sides 20 --quantity distribution
+"""
+import argparse
+import json
+import math
+import os
+import random
+import time
+
+import numpy as np
+
+from Game_Design.libs.attack_kernels import compile_attack
+from Game_Design.libs.result_cache import DEFAULT_CACHE_DIR
+from Game_Design.libs.synergia_rules import CombatMechanics, Distribution
+
+QUANTITIES = ('mean', 'distribution')
+METHODS = {
+    'mean': ('closed_form', 'exact', 'edgeworth', 'monte_carlo'),
+    'distribution': ('exact', 'edgeworth', 'monte_carlo'),
+}
+DEFAULT_TOLERANCE = {'mean': 0.01, 'distribution': 0.001}
+CONFIDENCE = 0.99
+Z_SCORE = 2.5758  # Two-sided normal quantile for CONFIDENCE
+TIMINGS_FILENAME = "planner_timings.json"
+MAX_OBSERVATIONS = 200  # Latest timings kept per (method, quantity)
+MIN_OBSERVATIONS = 5  # Below this the prior cost model is used
+SAVE_EVERY = 100  # Recorded timings between two saves of the timings file
+ERROR_SAFETY = 2.0  # Margin on the worst Edgeworth error seen during calibration
+MIN_ERROR_COEFFICIENT = 1e-9
+
+# (method, quantity) -> (fixed seconds, seconds per unit of work): used until enough timings are recorded
+PRIOR_COSTS = {
+    ('closed_form', 'mean'): (2e-5, 0.0),
+    ('exact', 'mean'): (8e-5, 1.5e-8),
+    ('exact', 'distribution'): (8e-5, 1.5e-8),
+    ('edgeworth', 'mean'): (1e-4, 3e-8),
+    ('edgeworth', 'distribution'): (1e-4, 3e-8),
+    ('monte_carlo', 'mean'): (1e-4, 1e-7),
+    ('monte_carlo', 'distribution'): (1e-4, 1.1e-7),
+}
+# Edgeworth error ~ coefficient / num_dice (mean: times die_sides); calibrate() measures them
+PRIOR_ERROR_COEFFICIENTS = {'mean': 1e-6, 'distribution': 0.006}
+
+# (num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule)
+CALIBRATION_CONFIGS = (
+    (1, 6, 0, False, 0, 's', 't'),
+    (3, 8, 1, True, 2, 'm', 't'),
+    (8, 10, -1, False, 3, 'p', 'e'),
+    (20, 12, 0, True, 0, 'b', 't'),
+    (60, 6, 1, False, 5, 's', 'e'),
+    (150, 12, 0, False, 0, 'm', 't'),
+    (400, 20, 0, True, 2, 's', 't'),
+    (1500, 12, 0, False, 0, 'p', 'e'),
+)
+CALIBRATION_SAMPLES = (2000, 10000)
+
+
+# --- Work and error estimates ---
+
+def support_size(num_dice, die_sides):
+    """Rough number of damage values of a configuration (the pool's range)."""
+    return max(num_dice * die_sides, 2)
+
+
+def damage_std_bound(num_dice, die_sides):
+    """Loose upper bound on the damage standard deviation (pool spread plus one crit burst)."""
+    return math.sqrt(num_dice * (die_sides ** 2 - 1) / 12 + die_sides ** 2)
+
+
+def monte_carlo_samples(quantity, tolerance, num_dice, die_sides):
+    """Samples for the error to stay below 'tolerance' at CONFIDENCE (CLT for the mean, DKW for the CDF)."""
+    if quantity == 'mean':
+        n = (Z_SCORE * damage_std_bound(num_dice, die_sides) / tolerance) ** 2
+    else:
+        n = math.log(2 / (1 - CONFIDENCE)) / (2 * tolerance ** 2)
+    return max(int(math.ceil(n)), 1)
+
+
+def ks_distance(a, b):
+    """Largest difference between the cumulative distributions of two Distributions."""
+    low = min(a.offset, b.offset)
+    high = max(a.offset + len(a.pmf), b.offset + len(b.pmf))
+    cdfs = []
+    for d in (a, b):
+        pmf = np.zeros(high - low)
+        pmf[d.offset - low:d.offset - low + len(d.pmf)] = d.pmf
+        cdfs.append(np.cumsum(pmf))
+    return float(np.max(np.abs(cdfs[0] - cdfs[1])))
+
+
+# --- Cost models ---
+
+class CostModel:
+    """seconds = fixed + per_unit * work, least-squares fitted to recorded (work, seconds) pairs."""
+
+    def __init__(self, prior, observations=()):
+        self.prior = prior
+        self.observations = list(observations)[-MAX_OBSERVATIONS:]
+        self._fit = None
+
+    def record(self, work, seconds):
+        self.observations.append((float(work), float(seconds)))
+        del self.observations[:-MAX_OBSERVATIONS]
+        self._fit = None
+
+    def coefficients(self):
+        if len(self.observations) < MIN_OBSERVATIONS:
+            return self.prior
+        if self._fit is None:
+            work, seconds = np.array(self.observations).T
+            if np.ptp(work) == 0:
+                self._fit = (float(np.median(seconds)), 0.0)  # Constant work: nothing to fit per unit
+            else:
+                fixed, per_unit = np.linalg.lstsq(np.stack([np.ones_like(work), work], axis=1), seconds,
+                                                  rcond=None)[0]
+                self._fit = (max(float(fixed), 0.0), max(float(per_unit), 0.0))
+        return self._fit
+
+    def predict(self, work):
+        fixed, per_unit = self.coefficients()
+        return fixed + per_unit * work
+
+
+# --- Planner ---
+
+class Planner:
+    """Chooses, runs and times the cheapest evaluation method meeting a precision."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.models = {key: CostModel(prior) for key, prior in PRIOR_COSTS.items()}
+        self.error_coefficients = dict(PRIOR_ERROR_COEFFICIENTS)
+        self._unsaved = 0
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}  # Unreadable timings: start again from the priors
+            for key, observations in data.get("timings", {}).items():
+                method, quantity = key.split('/')
+                if (method, quantity) in self.models:
+                    self.models[(method, quantity)] = CostModel(PRIOR_COSTS[(method, quantity)], observations)
+            self.error_coefficients.update(data.get("error_coefficients", {}))
+
+    def save(self):
+        if self.path is None:
+            return
+        data = {
+            "timings": {f"{method}/{quantity}": model.observations for (method, quantity), model in self.models.items()},
+            "error_coefficients": self.error_coefficients,
+        }
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+
+    def record(self, method, quantity, work, seconds):
+        self.models[(method, quantity)].record(work, seconds)
+        self._unsaved += 1
+        if self._unsaved >= SAVE_EVERY:
+            try:
+                self.save()
+            except OSError:
+                pass  # Timings are an optimization: never fail an evaluation over them
+
+    @staticmethod
+    def work(method, quantity, num_dice, die_sides, n_samples=0):
+        if method == 'closed_form':
+            return 1.0
+        if method == 'exact':
+            size = support_size(num_dice, die_sides)
+            return size * math.log2(size)  # FFT convolutions
+        if method == 'edgeworth':
+            return float(support_size(num_dice, die_sides))
+        return float(n_samples * (num_dice + 1))
+
+    def estimated_error(self, method, quantity, tolerance, num_dice, die_sides):
+        if method in ('closed_form', 'exact'):
+            return 0.0
+        if method == 'monte_carlo':
+            return tolerance  # The sample count is chosen to meet it
+        error = self.error_coefficients[quantity] / num_dice
+        return error * die_sides if quantity == 'mean' else error
+
+    def candidates(self, config, quantity='mean', tolerance=None):
+        """Every method for this configuration with its estimated error and cost, cheapest first."""
+        if quantity not in QUANTITIES:
+            raise ValueError(f"Unknown quantity '{quantity}' (choose from {QUANTITIES}).")
+        tolerance = DEFAULT_TOLERANCE[quantity] if tolerance is None else tolerance
+        if tolerance <= 0:
+            raise ValueError("The tolerance must be positive.")
+        num_dice, die_sides = config[0], config[1]
+
+        rows = []
+        for method in METHODS[quantity]:
+            n_samples = monte_carlo_samples(quantity, tolerance, num_dice, die_sides) if method == 'monte_carlo' else 0
+            work = self.work(method, quantity, num_dice, die_sides, n_samples)
+            error = self.estimated_error(method, quantity, tolerance, num_dice, die_sides)
+            rows.append({
+                "method": method, "n_samples": n_samples, "work": work,
+                "estimated_seconds": self.models[(method, quantity)].predict(work),
+                "estimated_error": error, "meets_tolerance": error <= tolerance,
+            })
+        rows.sort(key=lambda row: row["estimated_seconds"])
+        return rows
+
+    def plan(self, config, quantity='mean', tolerance=None):
+        """The cheapest candidate meeting the tolerance (exact methods always do)."""
+        return next(row for row in self.candidates(config, quantity, tolerance) if row["meets_tolerance"])
+
+    def evaluate(self, config, quantity='mean', tolerance=None, seed=None):
+        """
+        Runs the planned method. Returns {'value', 'method', 'n_samples', 'estimated_error',
+        'estimated_seconds', 'seconds'}; value is a float for 'mean' and a Distribution for 'distribution'.
+        """
+        chosen = self.plan(config, quantity, tolerance)
+        start = time.perf_counter()
+        value = run_method(chosen["method"], quantity, config, chosen["n_samples"], seed)
+        seconds = time.perf_counter() - start
+        self.record(chosen["method"], quantity, chosen["work"], seconds)
+        return {"value": value, "method": chosen["method"], "n_samples": chosen["n_samples"],
+                "estimated_error": chosen["estimated_error"], "estimated_seconds": chosen["estimated_seconds"],
+                "seconds": seconds}
+
+    def calibrate(self, configs=CALIBRATION_CONFIGS, samples=CALIBRATION_SAMPLES, on_step=None):
+        """
+        Times every method on 'configs' (Monte Carlo at each sample count) and
+        measures the Edgeworth error against the exact distribution. Saves the timings.
+        """
+        worst = {'mean': 0.0, 'distribution': 0.0}
+        for config in configs:
+            num_dice, die_sides = config[0], config[1]
+            compile_attack(*config)  # Time the sampling, not the one-off kernel compilation
+            for quantity in QUANTITIES:
+                for method in METHODS[quantity]:
+                    for n_samples in (samples if method == 'monte_carlo' else (0,)):
+                        start = time.perf_counter()
+                        run_method(method, quantity, config, n_samples, seed=0)
+                        self.record(method, quantity, self.work(method, quantity, num_dice, die_sides, n_samples),
+                                    time.perf_counter() - start)
+                        if on_step is not None:
+                            on_step()
+
+            exact = CombatMechanics.damage_distribution(*config, method='exact')
+            approximate = CombatMechanics.damage_distribution(*config, method='edgeworth')
+            worst['distribution'] = max(worst['distribution'], ks_distance(exact, approximate) * num_dice)
+            worst['mean'] = max(worst['mean'], abs(exact.mean() - approximate.mean()) * num_dice / die_sides)
+
+        for quantity, coefficient in worst.items():
+            self.error_coefficients[quantity] = max(coefficient * ERROR_SAFETY, MIN_ERROR_COEFFICIENT)
+        self.save()
+        return self.error_coefficients
+
+
+def run_method(method, quantity, config, n_samples=0, seed=None):
+    """Evaluates 'quantity' of the configuration with one method (float mean, or Distribution)."""
+    if method == 'closed_form':
+        return CombatMechanics.expected_damage(*config)
+    if method in ('exact', 'edgeworth'):
+        distribution = CombatMechanics.damage_distribution(*config, method=method)
+        return distribution.mean() if quantity == 'mean' else distribution
+    if method != 'monte_carlo':
+        raise ValueError(f"Unknown method '{method}'.")
+
+    kernel = compile_attack(*config)
+    if seed is not None:
+        outer_state = random.getstate()
+    try:
+        if seed is not None:
+            random.seed(seed)
+        if quantity == 'mean':
+            total_damage_sum, _ = kernel.run(n_samples)
+            return total_damage_sum / n_samples
+        roll = kernel.roll
+        samples = np.fromiter((roll() for _ in range(n_samples)), dtype=np.int64, count=n_samples)
+    finally:
+        if seed is not None:
+            random.setstate(outer_state)
+    low = int(samples.min())
+    return Distribution(np.bincount(samples - low) / n_samples, low)
+
+
+_default_planner = None
+
+
+def default_planner():
+    """Process-wide planner; its timings live next to the result cache (in memory only with SYNERGIA_CACHE=off)."""
+    global _default_planner
+    if _default_planner is None:
+        path = None
+        if os.environ.get('SYNERGIA_CACHE') != 'off':
+            path = os.path.join(os.environ.get('SYNERGIA_CACHE_DIR', DEFAULT_CACHE_DIR), TIMINGS_FILENAME)
+        _default_planner = Planner(path)
+    return _default_planner
+
+
+def mean_tolerance_of(n_simulations, num_dice, die_sides):
+    """Error of an n_simulations Monte Carlo mean (what callers asking for a sample count accept)."""
+    return Z_SCORE * damage_std_bound(num_dice, die_sides) / math.sqrt(n_simulations)
+
+
+def average_damage(num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule,
+                   n_simulations=100000, seed=None):
+    """
+    Average damage at least as precise as an n_simulations Monte Carlo run, by
+    the cheapest method. Same signature as sweeps.average_damage (scenario_values average_fn).
+    """
+    config = (num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule)
+    tolerance = mean_tolerance_of(n_simulations, num_dice, die_sides)
+    return default_planner().evaluate(config, 'mean', tolerance, seed=seed)["value"]
+
+
+# --- To Run the Script (from the repository root: python -m Game_Design.libs.planner) ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cost-based choice of exact, approximate or Monte Carlo evaluation.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("calibrate", help="Time every method on reference configurations and save the timings.")
+    plan_cmd = commands.add_parser("plan", help="Estimated cost and error of every method for one configuration.")
+    plan_cmd.add_argument("--num-dice", type=int, default=4)
+    plan_cmd.add_argument("--die-sides", type=int, default=8)
+    plan_cmd.add_argument("--adv", type=int, default=0)
+    plan_cmd.add_argument("--vicious", action="store_true")
+    plan_cmd.add_argument("--bonus", type=int, default=0)
+    plan_cmd.add_argument("--armor", default='s', choices=CombatMechanics.ARMOR_TIERS)
+    plan_cmd.add_argument("--crit", default='t', choices=('e', 't'))
+    plan_cmd.add_argument("--quantity", default='mean', choices=QUANTITIES)
+    plan_cmd.add_argument("--tolerance", type=float, help="Default: 0.01 damage (mean) or 0.001 CDF (distribution).")
+    plan_cmd.add_argument("--run", action="store_true", help="Also run the chosen method.")
+    args = parser.parse_args()
+
+    planner = default_planner()
+    if args.command == "calibrate":
+        steps = len(CALIBRATION_CONFIGS) * sum(
+            len(CALIBRATION_SAMPLES) if m == 'monte_carlo' else 1 for q in QUANTITIES for m in METHODS[q])
+        done = 0
+
+        def progress():
+            global done
+            done += 1
+            print(f"\r{done}/{steps} timings", end="", flush=True)
+
+        coefficients = planner.calibrate(on_step=progress)
+        print(f"\nEdgeworth error coefficients: {coefficients}")
+        for (method, quantity), model in planner.models.items():
+            fixed, per_unit = model.coefficients()
+            print(f"   {method:<12} {quantity:<13} {fixed * 1e6:10.1f} us + {per_unit * 1e9:8.3f} ns/unit")
+        print(f"Timings saved to '{planner.path}'." if planner.path else "SYNERGIA_CACHE=off: timings not saved.")
+    else:
+        config = (args.num_dice, args.die_sides, args.adv, args.vicious, args.bonus, args.armor, args.crit)
+        rows = planner.candidates(config, args.quantity, args.tolerance)
+        chosen = next(row for row in rows if row["meets_tolerance"])
+        for row in rows:
+            samples = f" ({row['n_samples']:,} samples)" if row['n_samples'] else ""
+            print(f"{'*' if row is chosen else ' '} "
+                  f"{row['method']:<12} ~{row['estimated_seconds'] * 1000:10.3f} ms  "
+                  f"error <= {row['estimated_error']:.3g}{'' if row['meets_tolerance'] else ' (too coarse)'}{samples}")
+        if args.run:
+            result = planner.evaluate(config, args.quantity, args.tolerance)
+            value = result["value"]
+            shown = f"{value:.4f}" if args.quantity == 'mean' else f"mean {value.mean():.4f}, std {value.variance() ** 0.5:.4f}"
+            print(f"\n{result['method']}: {shown} in {result['seconds'] * 1000:.3f} ms")
@@ -0,0 +1,181 @@
+"""
+Persistent, content-addressed cache for expensive simulation results.
+
+Entries live in one SQLite file (WAL mode), so several processes (CLI runs,
+portal job workers) can share it safely. The key is a hash of the function
+name, its normalized arguments (sample count and seed included), a
+fingerprint of the synergia_rules.py code plus the module defining the
+function, and the values of the rule parameters the function depends on.
+Editing rule code invalidates everything computed with the old code; tuning
+a parameter only invalidates the functions that depend on it.
+
+Settings (environment variables):
+    SYNERGIA_CACHE_DIR     cache directory (default: Game_Design/.cache)
+    SYNERGIA_CACHE_MAX_MB  size bound before LRU eviction (default: 256)
+    SYNERGIA_CACHE         set to 'off' to bypass the cache
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sqlite3
+import time
+
+from Game_Design.libs.synergia_rules import code_fingerprint, parameters_fingerprint
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache')
+DEFAULT_MAX_MB = 256
+
+
+class ResultCache:
+    """Size-bounded LRU key/value store on SQLite, safe across processes."""
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._conn_pid = None
+
+    def _connection(self):
+        # A connection must not cross a fork: reopen in each process
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def get(self, key):
+        """Returns (hit, value)."""
+        conn = self._connection()
+        row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False, None
+        conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        return True, pickle.loads(row[0])
+
+    def set(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time())
+            )
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn):
+        """Drops least recently used entries until the total size fits max_bytes."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT key, size FROM entries ORDER BY last_access")
+        stale_keys = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale_keys.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", stale_keys)
+
+    def stats(self):
+        entries, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes, "path": self.path}
+
+    def clear(self):
+        self._connection().execute("DELETE FROM entries")
+
+
+_default_cache = None
+
+
+def default_cache():
+    """Process-wide cache configured from the environment."""
+    global _default_cache
+    if _default_cache is None:
+        cache_dir = os.environ.get('SYNERGIA_CACHE_DIR', DEFAULT_CACHE_DIR)
+        max_mb = float(os.environ.get('SYNERGIA_CACHE_MAX_MB', DEFAULT_MAX_MB))
+        _default_cache = ResultCache(os.path.join(cache_dir, 'results.sqlite3'), int(max_mb * 1024 * 1024))
+    return _default_cache
+
+
+# --- Keys ---
+
+def normalize(value):
+    """JSON-ready canonical form of an argument (objects become their attribute dicts)."""
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    if isinstance(value, float):
+        return repr(value)
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if hasattr(value, '__dict__'):
+        return {'__class__': type(value).__name__, **normalize(vars(value))}
+    return repr(value)
+
+
+@functools.lru_cache(maxsize=None)
+def source_fingerprint(source_path):
+    """Rules code fingerprint combined with the hash of the module implementing the cached function."""
+    digest = hashlib.sha256(code_fingerprint().encode('utf-8'))
+    with open(source_path, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def cache_key(name, arguments, fingerprint):
+    payload = json.dumps({'fn': name, 'args': normalize(arguments), 'rules': fingerprint}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def cached(fn=None, *, parameters=None):
+    """
+    Caches fn's return value on disk. Calls with seed=None are not reproducible,
+    so they always run. The undecorated function stays available as fn.uncached.
+    'parameters' names the rule parameters the result depends on (default: all of them):
+
+        @cached(parameters=COMBAT_PARAMETERS)
+        def average_damage(...): ...
+    """
+    if fn is None:
+        return functools.partial(cached, parameters=parameters)
+    signature = inspect.signature(fn)
+    name = f"{fn.__module__}.{fn.__qualname__}"
+    source_path = inspect.getsourcefile(fn)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = bound.arguments
+        if os.environ.get('SYNERGIA_CACHE') == 'off' or arguments.get('seed', 0) is None:
+            return fn(*args, **kwargs)
+
+        cache = default_cache()
+        fingerprint = source_fingerprint(source_path) + parameters_fingerprint(parameters)
+        key = cache_key(name, arguments, fingerprint)
+        hit, value = cache.get(key)
+        if hit:
+            return value
+        value = fn(*args, **kwargs)
+        cache.set(key, value)
+        return value
+
+    wrapper.uncached = fn
+    return wrapper
@@ -0,0 +1,353 @@
+"""
+Append-only binary audit log of rolls (tournament play).
+
+A RollStream is a seeded dice source for one session (a table, a room, a
+tournament match). Installed as DiceEngine.stream, every roll made through
+DiceEngine / CombatMechanics becomes one record: stream position of its first
+die, expression, raw dice and final result(s).
+
+File format: a sequence of records, each one
+
+    u32 length | u32 crc32(body) | body
+
+with a one-byte record type at the start of the body (SESSION or ROLL, see
+encode_*). Writers only append; a torn last record (crash mid-write) fails its
+length/CRC check and is ignored by the reader. Records are buffered in memory
+and a background thread writes and fsyncs them in batches, so a roll never
+waits for the disk.
+
+    python -m Game_Design.libs.roll_audit verify roll_audit.log [--session ID]
+"""
+import argparse
+import atexit
+import os
+import random
+import re
+import secrets
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from Game_Design.libs.synergia_rules import CombatMechanics, DiceEngine
+
+SESSION, ROLL = 1, 2
+RECORD_HEADER = struct.Struct("<II")  # length, crc32
+SESSION_HEADER = struct.Struct("<BQQdH")  # type, session id, seed, time, name length
+ROLL_HEADER = struct.Struct("<BQQdBHHBH")  # type, session, position, time, kind len, expr len, segments, width, results
+SEGMENT = struct.Struct("<II")  # sides, count
+DIE_FORMATS = {1: "B", 2: "H", 4: "I"}  # Bytes per die value -> struct code
+
+SYNC_INTERVAL = 0.5  # Seconds between background fsyncs
+SYNC_BATCH = 4096  # Pending records that trigger an early sync
+
+
+# --- Encoding ---
+
+def _frame(body):
+    return RECORD_HEADER.pack(len(body), zlib.crc32(body)) + body
+
+
+def encode_session(session_id, seed, name, timestamp):
+    name = name.encode('utf-8')
+    return _frame(SESSION_HEADER.pack(SESSION, session_id, seed, timestamp, len(name)) + name)
+
+
+def encode_roll(session_id, position, timestamp, kind, expression, sides, dice, results):
+    """'sides' is the die size of every value in 'dice' (run-length encoded on disk)."""
+    segments = []
+    for s in sides:
+        if segments and segments[-1][0] == s:
+            segments[-1][1] += 1
+        else:
+            segments.append([s, 1])
+    largest = max(sides, default=1)
+    width = 1 if largest < 2 ** 8 else 2 if largest < 2 ** 16 else 4
+
+    kind, expression = kind.encode('utf-8'), expression.encode('utf-8')
+    body = b"".join([
+        ROLL_HEADER.pack(ROLL, session_id, position, timestamp, len(kind), len(expression), len(segments), width,
+                         len(results)),
+        kind, expression,
+        b"".join(SEGMENT.pack(s, count) for s, count in segments),
+        struct.pack(f"<{len(dice)}{DIE_FORMATS[width]}", *dice),
+        struct.pack(f"<{len(results)}q", *results),
+    ])
+    return _frame(body)
+
+
+def decode_record(body):
+    if body[0] == SESSION:
+        _, session_id, seed, timestamp, name_len = SESSION_HEADER.unpack_from(body)
+        offset = SESSION_HEADER.size
+        return {"type": "session", "session": session_id, "seed": seed, "time": timestamp,
+                "name": body[offset:offset + name_len].decode('utf-8')}
+
+    _, session_id, position, timestamp, kind_len, expr_len, n_segments, width, n_results = \
+        ROLL_HEADER.unpack_from(body)
+    offset = ROLL_HEADER.size
+    kind = body[offset:offset + kind_len].decode('utf-8')
+    offset += kind_len
+    expression = body[offset:offset + expr_len].decode('utf-8')
+    offset += expr_len
+    sides = []
+    for _ in range(n_segments):
+        s, count = SEGMENT.unpack_from(body, offset)
+        sides += [s] * count
+        offset += SEGMENT.size
+    dice = list(struct.unpack_from(f"<{len(sides)}{DIE_FORMATS[width]}", body, offset))
+    offset += len(sides) * width
+    results = list(struct.unpack_from(f"<{n_results}q", body, offset))
+    return {"type": "roll", "session": session_id, "position": position, "time": timestamp, "kind": kind,
+            "expression": expression, "sides": sides, "dice": dice, "results": results}
+
+
+# --- Writing ---
+
+class AuditLog:
+    """
+    Appends encoded records to a file. append() only touches an in-memory
+    buffer; a daemon thread writes and fsyncs the buffer every SYNC_INTERVAL
+    seconds (or as soon as SYNC_BATCH records are pending). Thread-safe.
+    """
+
+    def __init__(self, path, sync_interval=SYNC_INTERVAL, sync_batch=SYNC_BATCH):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.sync_batch = sync_batch
+        self._file = open(path, 'ab')
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._run, name="roll-audit-sync", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def append(self, record):
+        with self._lock:
+            self._pending.append(record)
+            if len(self._pending) >= self.sync_batch:
+                self._wake.set()
+
+    def sync(self):
+        """Writes and fsyncs everything appended so far."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if pending:
+            self._file.write(b"".join(pending))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.sync_interval)
+            self._wake.clear()
+            self.sync()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._flusher.join()
+        self.sync()
+        self._file.close()
+
+
+class RollRecord:
+    __slots__ = ("kind", "expression", "position", "sides", "dice", "results")
+
+    def __init__(self, kind, expression, position):
+        self.kind = kind
+        self.expression = expression
+        self.position = position
+        self.sides = []
+        self.dice = []
+        self.results = []
+
+
+_NESTED = RollRecord("", "", 0)  # Handed to nested record() calls: their dice belong to the outer roll
+
+
+class RollStream:
+    """
+    Seeded dice source for one session. 'position' counts the dice drawn so
+    far, so (seed, position) pins down every die. With a log, the session is
+    announced on creation and every top-level roll is appended to it.
+    """
+
+    def __init__(self, seed=None, log=None, name=""):
+        self.seed = secrets.randbits(63) if seed is None else seed
+        self.session_id = secrets.randbits(63)
+        self.log = log
+        self.position = 0
+        self.current = None
+        self._random = random.Random(self.seed)
+        if log is not None:
+            log.append(encode_session(self.session_id, self.seed, name, time.time()))
+
+    def draw(self, sides):
+        value = self._random.randint(1, sides)
+        self.position += 1
+        record = self.current
+        if record is not None:
+            record.sides.append(sides)
+            record.dice.append(value)
+        return value
+
+    def randint(self, low, high):
+        """Drop-in for random.randint on one die (low must be 1)."""
+        if low != 1:
+            raise ValueError("Audited rolls are dice: randint(1, sides).")
+        return self.draw(high)
+
+    @contextmanager
+    def record(self, kind, expression):
+        """Groups the dice drawn inside the block into one roll; the caller sets record.results."""
+        if self.current is not None:
+            yield _NESTED
+            return
+        record = self.current = RollRecord(kind, expression, self.position)
+        try:
+            yield record
+        finally:
+            self.current = None
+        if self.log is not None:
+            self.log.append(encode_roll(self.session_id, record.position, time.time(), kind, expression,
+                                        record.sides, record.dice, record.results))
+
+
+@contextmanager
+def using_stream(stream):
+    """Installs 'stream' as DiceEngine.stream for the block, in the current thread / task only."""
+    token = DiceEngine.stream.set(stream)
+    try:
+        yield stream
+    finally:
+        DiceEngine.stream.reset(token)
+
+
+# --- Reading, replay and verification ---
+
+def read_log(path):
+    """Yields the decoded records in file order, stopping at a torn or corrupt tail."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(data):
+        length, crc = RECORD_HEADER.unpack_from(data, offset)
+        body = data[offset + RECORD_HEADER.size:offset + RECORD_HEADER.size + length]
+        if len(body) < length or zlib.crc32(body) != crc:
+            return
+        yield decode_record(body)
+        offset += RECORD_HEADER.size + length
+
+
+ATTACK_EXPRESSION = re.compile(
+    r"^(\d+)d(\d+)([+-]\d+) adv=(-?\d+) vicious=([01]) armor=([smpb]) crit=([et])$"
+)
+
+
+def _resolve_dice(expression):
+    num_die, rest = expression.split('d', 1)
+    if 'dl' in rest:
+        sides, drop_n = rest.split('dl')
+        return [sum(DiceEngine.roll_XdY_drop_lowest(int(num_die), int(sides), int(drop_n)))]
+    if 'e' in rest:
+        rest, *options = rest.split()  # e.g. "6e6 each depth=10"
+        sides, threshold = rest.split('e')
+        options = dict(option.partition('=')[::2] for option in options)
+        mode = 'each' if 'each' in options else 'first'
+        max_depth = int(options['depth']) if 'depth' in options else None
+        return [DiceEngine.roll_XdY_explode(int(num_die), int(sides), int(threshold), mode, max_depth)]
+    return [sum(DiceEngine.roll_XdY(int(num_die), int(rest)))]
+
+
+def _resolve_attack(expression):
+    num_dice, die_sides, bonus, adv, vicious, armor, crit = ATTACK_EXPRESSION.match(expression).groups()
+    result = CombatMechanics.resolve_attack(int(num_dice), int(die_sides), int(adv), vicious == '1', int(bonus),
+                                            armor, crit)
+    return [result["damage"]]
+
+
+def _resolve_action(expression):
+    from Game_Design.simulations.action_runner import run_action  # The action syntax lives with its parser
+    return [r["total"] for r in run_action(expression)]
+
+
+# kind -> fn(expression) -> results, re-run under the replay stream
+RESOLVERS = {'dice': _resolve_dice, 'attack': _resolve_attack, 'action': _resolve_action}
+
+
+def verify_session(records, session_id, resolvers=RESOLVERS):
+    """
+    Replays one session from its seed and checks every roll: stream position,
+    each raw die, and (for kinds with a resolver) the final results.
+    Returns (rolls_checked, problems), problems being human-readable strings.
+    """
+    session = next((r for r in records if r["type"] == "session" and r["session"] == session_id), None)
+    if session is None:
+        return 0, [f"Session {session_id} has no SESSION record."]
+
+    stream = RollStream(session["seed"])
+    problems = []
+    checked = 0
+    for record in records:
+        if record["type"] != "roll" or record["session"] != session_id:
+            continue
+        checked += 1
+        label = f"Roll at position {record['position']} ({record['kind']} '{record['expression']}')"
+        if record["position"] != stream.position:
+            problems.append(f"{label}: expected position {stream.position} (rolls missing or reordered).")
+            break
+
+        resolver = resolvers.get(record["kind"])
+        with stream.record(record["kind"], record["expression"]) as replay:
+            if resolver is not None:
+                with using_stream(stream):
+                    replay.results = resolver(record["expression"])
+            else:
+                replay.results = record["results"]
+                for sides in record["sides"]:
+                    stream.draw(sides)
+
+        if replay.dice != record["dice"] or replay.sides != record["sides"]:
+            problems.append(f"{label}: dice {record['dice']} do not match the seeded stream {replay.dice}.")
+            break
+        if replay.results != record["results"]:
+            problems.append(f"{label}: results {record['results']} should be {replay.results}.")
+    return checked, problems
+
+
+def verify_log(path, session_id=None):
+    """Verifies one session, or every session in the log. Returns {session_id: (rolls_checked, problems)}."""
+    records = list(read_log(path))
+    sessions = [session_id] if session_id is not None else [r["session"] for r in records if r["type"] == "session"]
+    return {sid: verify_session(records, sid) for sid in sessions}
+
+
+# --- To Run the Script (from the repository root: python -m Game_Design.libs.roll_audit) ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roll audit log tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    verify = commands.add_parser("verify", help="Replay sessions from their seeds and check every roll.")
+    dump = commands.add_parser("dump", help="Print the records.")
+    for command in (verify, dump):
+        command.add_argument("log")
+        command.add_argument("--session", type=int)
+    args = parser.parse_args()
+
+    if args.command == "dump":
+        for record in read_log(args.log):
+            if args.session is None or record["session"] == args.session:
+                print(record)
+    else:
+        failed = False
+        for sid, (checked, problems) in verify_log(args.log, args.session).items():
+            print(f"Session {sid}: {checked} roll(s) checked, {'OK' if not problems else 'FAILED'}")
+            for problem in problems:
+                print(f"   {problem}")
+            failed = failed or bool(problems)
+        raise SystemExit(1 if failed else 0)
@@ -0,0 +1,297 @@
+"""
+Versioned rule parameters and incremental recomputation of sweep outputs.
+
+The tunable constants of CombatMechanics and PowerEconomy (see
+synergia_rules.rule_parameters) are versioned in a JSON manifest: every
+distinct set of values gets the next version number. The sweeps register
+the tables they write (power builds, scenario grids) together with how to
+rebuild them and the values of the parameters they depend on. After a tweak
+only the outputs whose dependencies changed are recomputed, and each new
+table is diffed against the one it replaces.
+
+    python -m Game_Design.libs.rule_versions status
+    python -m Game_Design.libs.rule_versions recompute --set PowerEconomy.MAX_PC_BUDGET=70
+    python -m Game_Design.libs.rule_versions history
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from contextlib import ExitStack
+
+from Game_Design.libs import columnar
+from Game_Design.libs.synergia_rules import (COMBAT_PARAMETERS, ECONOMY_PARAMETERS, code_fingerprint,
+                                             rule_overrides, rule_parameters)
+
+MANIFEST_FILENAME = "synergia_rules_manifest.json"
+FLOAT_TOLERANCE = 1e-9  # Smaller differences between two tables do not count as changes
+MAX_DIFF_EXAMPLES = 5
+
+# Parameters each kind of output reads. Builds only use the economy (their
+# Avg_Damage is the plain dice average); scenario grids only the combat rules.
+DEPENDENCIES = {
+    "builds": ECONOMY_PARAMETERS,
+    "scenario": COMBAT_PARAMETERS,
+}
+KEY_COLUMNS = {
+    "builds": ("num_dice", "die_sides", "Range_Blocks", "Area_Blocks"),
+    "scenario": ("num_dice",),
+}
+
+
+# --- Rebuilding outputs ---
+
+def build_builds(spec):
+    from Game_Design.balance import balancete_magico  # Imports this module's callers: keep it lazy
+    return columnar.builds_table(balancete_magico.iter_valid_builds())
+
+
+def build_scenario(spec):
+    from Game_Design.libs import planner, sweeps
+    # Grids of the simulator go through the planner; older specs were always Monte Carlo
+    average_fn = planner.average_damage if spec.get("method") == "planned" else sweeps.average_damage
+    values = sweeps.scenario_values(spec["max_dice"], spec["adv_state"], spec["is_vicious"], spec["bonus_damage"],
+                                    spec["armor_type"], spec["crit_rule"], average_fn=average_fn, seed=spec["seed"],
+                                    n_simulations=spec["n_simulations"])
+    return columnar.scenario_table(spec["max_dice"], values)
+
+
+# kind -> (build table from spec, CSV rows from table, CSV delimiter, table from CSV)
+BUILDERS = {
+    "builds": (build_builds, columnar.builds_csv_rows, ',', columnar.builds_table_from_csv),
+    "scenario": (build_scenario, columnar.scenario_csv_rows, ';', columnar.scenario_table_from_csv),
+}
+
+
+def write_output(entry, table):
+    """Writes the table to the output's .npy and/or CSV files."""
+    _, csv_rows, delimiter, _ = BUILDERS[entry["kind"]]
+    if entry.get("npy"):
+        columnar.save_table(entry["npy"], table, entry["kind"], metadata=entry["spec"])
+    if entry.get("csv"):
+        with open(entry["csv"], 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f, delimiter=delimiter).writerows(csv_rows(table))
+
+
+def read_output(entry):
+    """The output's current table (from the .npy when there is one, else the CSV), or None if missing."""
+    if entry.get("npy") and os.path.exists(entry["npy"]):
+        table, _ = columnar.load_table(entry["npy"], mmap=False)
+        return table
+    if entry.get("csv") and os.path.exists(entry["csv"]):
+        return BUILDERS[entry["kind"]][3](entry["csv"])
+    return None
+
+
+# --- Diffs ---
+
+def diff_tables(old, new, key_columns):
+    """
+    Row-by-row comparison of two tables matched on 'key_columns'.
+    Returns counts of added, removed and changed rows, the number of changed
+    rows and largest absolute change per column, and a few changed rows.
+    """
+    value_columns = [name for name in new.dtype.names if name not in key_columns]
+
+    def rows(table):
+        return {tuple(row[k].item() for k in key_columns): row for row in table}
+
+    old_rows, new_rows = rows(old), rows(new)
+    common = old_rows.keys() & new_rows.keys()
+    columns = {name: {"changed": 0, "max_abs_change": 0.0} for name in value_columns}
+    changed_keys = []
+    for key in sorted(common):
+        row_changed = False
+        for name in value_columns:
+            delta = abs(float(new_rows[key][name]) - float(old_rows[key][name]))
+            if delta > FLOAT_TOLERANCE:
+                columns[name]["changed"] += 1
+                columns[name]["max_abs_change"] = max(columns[name]["max_abs_change"], delta)
+                row_changed = True
+        if row_changed:
+            changed_keys.append(key)
+
+    return {
+        "rows_before": len(old_rows),
+        "rows_after": len(new_rows),
+        "added": len(new_rows.keys() - old_rows.keys()),
+        "removed": len(old_rows.keys() - new_rows.keys()),
+        "changed": len(changed_keys),
+        "columns": {name: stats for name, stats in columns.items() if stats["changed"]},
+        "examples": [
+            {"key": dict(zip(key_columns, key)),
+             "before": {name: old_rows[key][name].item() for name in value_columns},
+             "after": {name: new_rows[key][name].item() for name in value_columns}}
+            for key in changed_keys[:MAX_DIFF_EXAMPLES]
+        ],
+    }
+
+
+# --- Manifest ---
+
+class RuleManifest:
+    """
+    JSON manifest of parameter versions and tracked outputs:
+
+        {"versions": [{"version", "parameters", "created"}],
+         "outputs": {name: {"kind", "spec", "npy", "csv", "version", "code", "parameters"}}}
+
+    An output's "parameters" holds only the values it depends on (DEPENDENCIES).
+    """
+
+    def __init__(self, path=MANIFEST_FILENAME):
+        self.path = path
+        self.data = {"versions": [], "outputs": {}}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.data = json.load(f)
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)  # Readers never see a half-written manifest
+
+    def current_version(self):
+        """Version number of the current parameter values (a new version if they were never seen)."""
+        parameters = rule_parameters()
+        for version in reversed(self.data["versions"]):
+            if version["parameters"] == parameters:
+                return version["version"]
+        number = len(self.data["versions"]) + 1
+        self.data["versions"].append({"version": number, "parameters": parameters,
+                                      "created": time.strftime('%Y-%m-%dT%H:%M:%S%z')})
+        return number
+
+    def record_output(self, kind, spec, npy=None, csv_path=None):
+        """Registers (or refreshes) an output just written with the current parameters."""
+        name = os.path.splitext(npy or csv_path)[0]
+        self.data["outputs"][name] = {
+            "kind": kind, "spec": spec, "npy": npy, "csv": csv_path,
+            "version": self.current_version(),
+            "code": code_fingerprint(),
+            "parameters": rule_parameters(DEPENDENCIES[kind]),
+        }
+        self.save()
+        return name
+
+    def changes(self, name):
+        """{parameter: (built with, current)} of one output; {'rules code': ...} if the rule code changed."""
+        entry = self.data["outputs"][name]
+        if entry["code"] != code_fingerprint():
+            return {"rules code": (entry["code"], code_fingerprint())}
+        current = rule_parameters(DEPENDENCIES[entry["kind"]])
+        return {p: (entry["parameters"].get(p), value) for p, value in current.items()
+                if entry["parameters"].get(p) != value}
+
+    def stale_outputs(self):
+        """{name: changes} of the outputs that must be recomputed for the current rules."""
+        stale = {}
+        for name in self.data["outputs"]:
+            changes = self.changes(name)
+            if changes:
+                stale[name] = changes
+        return stale
+
+
+def record_output(kind, spec, npy=None, csv_path=None, manifest_path=MANIFEST_FILENAME):
+    """Called by the sweeps after saving an output; never fails the sweep itself."""
+    try:
+        RuleManifest(manifest_path).record_output(kind, spec, npy=npy, csv_path=csv_path)
+    except (OSError, ValueError) as e:
+        print(f"[WARNING] Could not update the rules manifest '{manifest_path}': {e}")
+
+
+def recompute(manifest, dry_run=False):
+    """
+    Recomputes every stale output of the manifest for the current parameters.
+    Returns [{"output", "changes", "diff"}] (diff is None on a dry run or when the old table is missing).
+    """
+    reports = []
+    for name, changes in manifest.stale_outputs().items():
+        entry = manifest.data["outputs"][name]
+        report = {"output": name, "changes": changes, "diff": None}
+        if not dry_run:
+            old_table = read_output(entry)
+            new_table = BUILDERS[entry["kind"]][0](entry["spec"])
+            write_output(entry, new_table)
+            manifest.record_output(entry["kind"], entry["spec"], npy=entry.get("npy"), csv_path=entry.get("csv"))
+            if old_table is not None:
+                report["diff"] = diff_tables(old_table, new_table, KEY_COLUMNS[entry["kind"]])
+        reports.append(report)
+    return reports
+
+
+# --- Command line ---
+
+def parse_assignment(text):
+    name, _, value = text.partition('=')
+    try:
+        return name.strip(), int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected NAME=INTEGER, got '{text}'.")
+
+
+def print_report(report):
+    changes = ", ".join(f"{p}: {old} -> {new}" for p, (old, new) in report["changes"].items())
+    print(f"{report['output']}  ({changes})")
+    diff = report["diff"]
+    if diff is None:
+        return
+    print(f"   rows {diff['rows_before']} -> {diff['rows_after']} | added {diff['added']} | "
+          f"removed {diff['removed']} | changed {diff['changed']}")
+    for column, stats in diff["columns"].items():
+        print(f"   {column}: {stats['changed']} row(s) changed, max |change| {stats['max_abs_change']:.6g}")
+
+
+# --- To Run the Script (from the repository root: python -m Game_Design.libs.rule_versions) ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Versioned rule parameters and incremental recomputation.")
+    parser.add_argument("--manifest", default=MANIFEST_FILENAME)
+    commands = parser.add_subparsers(dest="command", required=True)
+    status = commands.add_parser("status", help="Current parameters and the outputs they make stale.")
+    recompute_cmd = commands.add_parser("recompute", help="Recompute the stale outputs and diff them.")
+    commands.add_parser("history", help="Parameter versions and what changed in each.")
+    for command in (status, recompute_cmd):
+        command.add_argument("--set", dest="overrides", type=parse_assignment, action="append", default=[],
+                             metavar="NAME=VALUE", help="Override a rule parameter for this run.")
+    recompute_cmd.add_argument("--dry-run", action="store_true", help="Only list what would be recomputed.")
+    recompute_cmd.add_argument("--report", help="Also write the diffs to this JSON file.")
+    args = parser.parse_args()
+
+    manifest = RuleManifest(args.manifest)
+    if args.command == "history":
+        previous = {}
+        for version in manifest.data["versions"]:
+            changed = {p: v for p, v in version["parameters"].items() if previous.get(p) != v}
+            print(f"v{version['version']}  {version['created']}  "
+                  + ", ".join(f"{p}={v}" for p, v in changed.items()))
+            previous = version["parameters"]
+        raise SystemExit(0)
+
+    with ExitStack() as stack:
+        try:
+            stack.enter_context(rule_overrides(dict(args.overrides)))
+        except ValueError as e:
+            parser.error(str(e))
+
+        if args.command == "status":
+            for name, value in rule_parameters().items():
+                print(f"{name} = {value}")
+            stale = manifest.stale_outputs()
+            print(f"\n{len(manifest.data['outputs'])} tracked output(s), {len(stale)} stale")
+            for name in manifest.data["outputs"]:
+                changes = stale.get(name)
+                detail = ", ".join(f"{p}: {old} -> {new}" for p, (old, new) in changes.items()) if changes else ""
+                print(f"   {'STALE' if changes else 'ok   '} {name}  {detail}")
+        else:
+            reports = recompute(manifest, dry_run=args.dry_run)
+            if not reports:
+                print("Every tracked output is up to date.")
+            for report in reports:
+                print_report(report)
+            if args.report:
+                with open(args.report, 'w', encoding='utf-8') as f:
+                    json.dump({"version": manifest.current_version(), "parameters": rule_parameters(),
+                               "outputs": reports}, f, indent=2)
@@ -0,0 +1,299 @@
+"""
+One-at-a-time sensitivity analysis of the combat and economy rules.
+
+Every input of resolve_attack (dice count, die type, advantage, vicious,
+bonus, armor tier, crit rule) and every rule parameter is stepped down and
+up from a base configuration, and the outputs (expected damage, miss rate,
+attacks to kill; or the PowerEconomy cost terms) are recomputed with the
+exact engine. Each factor gets its swing and, for numeric factors, its
+elasticity at the base point. Rows are sorted by swing, ready for a tornado
+chart.
+
+    python -m Game_Design.libs.sensitivity combat --num-dice 4 --die-sides 8 --armor m -o tornado.csv
+    python -m Game_Design.libs.sensitivity economy --num-dice 10 --die-type 6 --range 4 --area 2
+"""
+import argparse
+import csv
+import json
+import math
+
+import numpy as np
+
+from Game_Design.libs.sweeps import DICE_TYPES
+from Game_Design.libs.synergia_rules import (COMBAT_PARAMETERS, ECONOMY_PARAMETERS, CombatMechanics, PowerEconomy,
+                                             rule_overrides, rule_parameters, set_rule_parameters)
+
+COMBAT_OUTPUTS = ('expected_damage', 'miss_rate', 'time_to_kill')
+ECONOMY_OUTPUTS = ('total_pc', 'custo_dano', 'custo_alcance', 'custo_area', 'budget_headroom', 'damage_per_pc')
+DEFAULT_TARGET_HP = 30
+ARMOR_ORDER = ('s', 'm', 'p', 'b')  # Lightest to heaviest: one step down/up is the neighbouring tier
+MAX_ADV_STATE = 3
+
+TORNADO_HEADER = ["Output", "Rank", "Factor", "Kind", "Base", "Low", "High",
+                  "Output_Low", "Output_Base", "Output_High", "Swing", "Elasticity"]
+
+
+# --- Metrics ---
+
+def time_to_kill(distribution, hp):
+    """
+    Expected number of attacks until the damage adds up to 'hp', each attack
+    drawn independently from 'distribution' (the target's armor does not degrade
+    between attacks). Infinite when an attack can never deal damage.
+    """
+    pmf = np.zeros(hp + 1)
+    values = distribution.values
+    inside = (values >= 0) & (values <= hp)
+    pmf[values[inside]] = distribution.pmf[inside]
+    p_zero = pmf[0]
+    if p_zero >= 1:
+        return math.inf
+
+    # attacks[k]: expected attacks to deal k more damage (renewal equation, damage >= k ends it)
+    attacks = np.zeros(hp + 1)
+    for k in range(1, hp + 1):
+        attacks[k] = (1 + pmf[1:k] @ attacks[k - 1:0:-1]) / (1 - p_zero)
+    return float(attacks[hp])
+
+
+def combat_metrics(config, target_hp=DEFAULT_TARGET_HP):
+    """Expected damage, chance of a Miss (primary roll of 1) and expected attacks to kill of one attack."""
+    adv_state = config['adv_state']
+    if config['armor_type'] == 'b':
+        adv_state -= CombatMechanics.ARMORED_DISADVANTAGE
+    args = (config['num_dice'], config['die_sides'], config['adv_state'], config['is_vicious'],
+            config['bonus_damage'], config['armor_type'], config['crit_rule'])
+    return {
+        'expected_damage': CombatMechanics.expected_damage(*args),
+        'miss_rate': CombatMechanics.primary_distribution(config['die_sides'], adv_state)[0],
+        'time_to_kill': time_to_kill(CombatMechanics.damage_distribution(*args), target_hp),
+    }
+
+
+def economy_metrics(build):
+    """PowerEconomy cost terms of one build, its budget headroom and its average damage per PC."""
+    cost = PowerEconomy.calculate_cost(build['num_dice'], build['die_type'], build['range_blocks'],
+                                       build['area_blocks'])
+    avg_damage = PowerEconomy.estimate_avg_damage(build['num_dice'], build['die_type'])
+    return {
+        'total_pc': cost['total_pc'],
+        'custo_dano': cost['custo_dano'],
+        'custo_alcance': cost['custo_alcance'],
+        'custo_area': cost['custo_area'],
+        'budget_headroom': PowerEconomy.MAX_PC_BUDGET - cost['total_pc'],
+        'damage_per_pc': avg_damage / cost['total_pc'] if cost['total_pc'] else math.inf,
+    }
+
+
+# --- Perturbations ---
+
+def _neighbours(options, value):
+    """The options one step below and above 'value' (the value itself at either end)."""
+    i = options.index(value)
+    return options[max(i - 1, 0)], options[min(i + 1, len(options) - 1)]
+
+
+def _rule_perturbations(names):
+    """(name, 'rule', base, low, high, overrides_low, overrides_high) for every rule parameter in 'names'."""
+    minimums = {f"{cls.__name__}.{name}": minimum for cls in (CombatMechanics, PowerEconomy)
+                for name, minimum in cls.PARAMETERS.items()}
+    rows = []
+    for name, value in rule_parameters(names).items():
+        low, high = max(value - 1, minimums[name]), value + 1
+        rows.append((name, 'rule', value, low, high, {name: low}, {name: high}))
+    return rows
+
+
+def combat_perturbations(config):
+    """
+    (factor, kind, base, low, high, low point, high point) for every attack input
+    and combat rule parameter. A point is (config, rule overrides).
+    """
+    rows = []
+
+    def step(factor, low, high):
+        rows.append((factor, 'input', config[factor], low, high,
+                     ({**config, factor: low}, {}), ({**config, factor: high}, {})))
+
+    step('num_dice', max(config['num_dice'] - 1, 1), config['num_dice'] + 1)
+    if config['die_sides'] in DICE_TYPES:
+        step('die_sides', *_neighbours(DICE_TYPES, config['die_sides']))
+    else:
+        step('die_sides', max(config['die_sides'] - 2, 2), config['die_sides'] + 2)
+    step('adv_state', max(config['adv_state'] - 1, -MAX_ADV_STATE), min(config['adv_state'] + 1, MAX_ADV_STATE))
+    step('is_vicious', False, True)
+    step('bonus_damage', max(config['bonus_damage'] - 1, 0), config['bonus_damage'] + 1)
+    step('armor_type', *_neighbours(list(ARMOR_ORDER), config['armor_type']))
+    step('crit_rule', 'e', 't')
+
+    for factor, kind, base, low, high, low_overrides, high_overrides in _rule_perturbations(COMBAT_PARAMETERS):
+        rows.append((factor, kind, base, low, high, (config, low_overrides), (config, high_overrides)))
+    return rows
+
+
+def economy_perturbations(build):
+    """Like combat_perturbations, for the build inputs and the PowerEconomy parameters."""
+    rows = []
+
+    def step(factor, low, high):
+        rows.append((factor, 'input', build[factor], low, high,
+                     ({**build, factor: low}, {}), ({**build, factor: high}, {})))
+
+    step('num_dice', max(build['num_dice'] - 1, 1), build['num_dice'] + 1)
+    if build['die_type'] in DICE_TYPES:
+        step('die_type', *_neighbours(DICE_TYPES, build['die_type']))
+    else:
+        step('die_type', max(build['die_type'] - 2, 2), build['die_type'] + 2)
+    step('range_blocks', max(build['range_blocks'] - 1, 0), build['range_blocks'] + 1)
+    step('area_blocks', max(build['area_blocks'] - 1, 0), build['area_blocks'] + 1)
+
+    for factor, kind, base, low, high, low_overrides, high_overrides in _rule_perturbations(ECONOMY_PARAMETERS):
+        rows.append((factor, kind, base, low, high, (build, low_overrides), (build, high_overrides)))
+    return rows
+
+
+# --- Tornado tables ---
+
+def evaluate_points(points, metrics):
+    """
+    metrics(config) of every (config, overrides) point, in one batch: points
+    sharing the same rule overrides are evaluated together under one override.
+    """
+    results = [None] * len(points)
+    groups = {}
+    for i, (_, overrides) in enumerate(points):
+        groups.setdefault(tuple(sorted(overrides.items())), []).append(i)
+    for overrides, indices in groups.items():
+        previous = set_rule_parameters(dict(overrides))
+        try:
+            for i in indices:
+                results[i] = metrics(points[i][0])
+        finally:
+            set_rule_parameters(previous)
+    return results
+
+
+def elasticity(x_low, x_high, x_base, y_low, y_high, y_base):
+    """Point elasticity (dy/dx) * x / y at the base, or None for non-numeric or zero/infinite bases."""
+    numeric = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (x_low, x_high, x_base))
+    if not numeric or x_high == x_low or not x_base or not y_base:
+        return None
+    if not all(math.isfinite(v) for v in (y_low, y_high, y_base)):
+        return None
+    return (y_high - y_low) / (x_high - x_low) * x_base / y_base
+
+
+def tornado(base, perturbations, metrics, outputs):
+    """
+    {output: rows} with one row per factor, sorted by absolute swing (largest first).
+    A row is a dict: factor, kind, base, low, high, output_low, output_base, output_high, swing, elasticity.
+    """
+    points = [(base, {})]
+    for *_, low_point, high_point in perturbations:
+        points += [low_point, high_point]
+    results = evaluate_points(points, metrics)
+    base_metrics = results[0]
+
+    tables = {}
+    for output in outputs:
+        y_base = base_metrics[output]
+        rows = []
+        for i, (factor, kind, x_base, low, high, _, _) in enumerate(perturbations):
+            y_low, y_high = results[1 + 2 * i][output], results[2 + 2 * i][output]
+            swing = y_high - y_low if math.isfinite(y_high) and math.isfinite(y_low) else math.inf
+            rows.append({
+                'factor': factor, 'kind': kind, 'base': x_base, 'low': low, 'high': high,
+                'output_low': y_low, 'output_base': y_base, 'output_high': y_high, 'swing': swing,
+                'elasticity': elasticity(low, high, x_base, y_low, y_high, y_base),
+            })
+        rows.sort(key=lambda row: -abs(row['swing']))
+        tables[output] = rows
+    return base_metrics, tables
+
+
+def combat_sensitivity(num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule,
+                       target_hp=DEFAULT_TARGET_HP):
+    """Tornado tables of expected damage, miss rate and attacks to kill around one attack configuration."""
+    config = {'num_dice': num_dice, 'die_sides': die_sides, 'adv_state': adv_state, 'is_vicious': is_vicious,
+              'bonus_damage': bonus_damage, 'armor_type': armor_type, 'crit_rule': crit_rule}
+    base_metrics, tables = tornado(config, combat_perturbations(config),
+                                   lambda c: combat_metrics(c, target_hp), COMBAT_OUTPUTS)
+    return {'kind': 'combat', 'base': config, 'target_hp': target_hp, 'parameters': rule_parameters(),
+            'metrics': base_metrics, 'tornado': tables}
+
+
+def economy_sensitivity(num_dice, die_type, range_blocks, area_blocks):
+    """Tornado tables of the PowerEconomy cost terms around one build."""
+    build = {'num_dice': num_dice, 'die_type': die_type, 'range_blocks': range_blocks, 'area_blocks': area_blocks}
+    base_metrics, tables = tornado(build, economy_perturbations(build), economy_metrics, ECONOMY_OUTPUTS)
+    return {'kind': 'economy', 'base': build, 'parameters': rule_parameters(),
+            'metrics': base_metrics, 'tornado': tables}
+
+
+def tornado_csv_rows(report):
+    """The report's tornado tables as CSV rows (header first), one block per output."""
+    csv_data = [TORNADO_HEADER]
+    for output, rows in report['tornado'].items():
+        for rank, row in enumerate(rows, start=1):
+            csv_data.append([output, rank, row['factor'], row['kind'], row['base'], row['low'], row['high'],
+                             f"{row['output_low']:.6g}", f"{row['output_base']:.6g}", f"{row['output_high']:.6g}",
+                             f"{row['swing']:.6g}", "" if row['elasticity'] is None else f"{row['elasticity']:.4f}"])
+    return csv_data
+
+
+def print_report(report, limit=None):
+    for output, rows in report['tornado'].items():
+        print(f"\n{output} = {report['metrics'][output]:.6g}")
+        for row in rows[:limit]:
+            elasticity_text = "" if row['elasticity'] is None else f"  elasticity {row['elasticity']:+.3f}"
+            print(f"   {row['factor']:<36} {row['low']!s:>6} -> {row['high']!s:<6} "
+                  f"{row['output_low']:>10.4g} .. {row['output_high']:<10.4g} swing {row['swing']:+.4g}"
+                  f"{elasticity_text}")
+
+
+# --- To Run the Script (from the repository root: python -m Game_Design.libs.sensitivity) ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sensitivity (tornado) tables of the combat and economy rules.")
+    parser.add_argument("-o", "--output", help="Write the tornado tables to this CSV file.")
+    parser.add_argument("--json", help="Write the whole report to this JSON file.")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="NAME=VALUE",
+                        help="Base value of a rule parameter for this run.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    combat = commands.add_parser("combat", help="Inputs of resolve_attack and the combat rule parameters.")
+    combat.add_argument("--num-dice", type=int, default=4)
+    combat.add_argument("--die-sides", type=int, default=8)
+    combat.add_argument("--adv", type=int, default=0, choices=range(-MAX_ADV_STATE, MAX_ADV_STATE + 1))
+    combat.add_argument("--vicious", action="store_true")
+    combat.add_argument("--bonus", type=int, default=0)
+    combat.add_argument("--armor", default='s', choices=ARMOR_ORDER)
+    combat.add_argument("--crit", default='t', choices=('e', 't'))
+    combat.add_argument("--hp", type=int, default=DEFAULT_TARGET_HP, help="Target HP for the attacks to kill.")
+
+    economy = commands.add_parser("economy", help="Build inputs and the PowerEconomy cost terms.")
+    economy.add_argument("--num-dice", type=int, default=10)
+    economy.add_argument("--die-type", type=int, default=6)
+    economy.add_argument("--range", type=int, default=0)
+    economy.add_argument("--area", type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        overrides = {name.strip(): int(value) for name, _, value in (o.partition('=') for o in args.overrides)}
+        with rule_overrides(overrides):
+            if args.command == "combat":
+                report = combat_sensitivity(args.num_dice, args.die_sides, args.adv, args.vicious, args.bonus,
+                                            args.armor, args.crit, target_hp=args.hp)
+            else:
+                report = economy_sensitivity(args.num_dice, args.die_type, args.range, args.area)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(tornado_csv_rows(report))
+        print(f"\nTornado tables written to '{args.output}'.")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to '{args.json}'.")
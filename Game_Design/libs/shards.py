@@ -0,0 +1,248 @@
+"""
+Deterministic sharding of big sweeps across machines.
+
+A grid is cut into work units in a fixed order and shard i of N takes every
+unit k with k % N == i. Every unit has its own seed, derived from the base
+seed and the unit, so results do not depend on how many shards were used.
+Each shard writes a JSON-lines file (header line + one record per unit) to
+any shared directory; merge_shards() validates that the files belong to the
+same run and combines them.
+
+Scenario cells are computed like the simulator's scenario mode: through the
+planner (method 'planned', usually the exact closed form), so sharded and
+single-machine grids agree. With method 'monte_carlo' units can be split into
+'replicas' (parts of one cell's samples); their moments are pooled on merge, so
+averages stay exact rather than being an average of averages.
+"""
+import json
+
+from Game_Design.balance import balancete_magico
+from Game_Design.libs import planner, sweeps
+from Game_Design.libs.synergia_rules import PowerEconomy, rules_fingerprint
+
+
+SCENARIO_METHODS = ('planned', 'monte_carlo')
+
+
+def shard_units(units, shard, of):
+    if not 0 <= shard < of:
+        raise ValueError(f"shard must be between 0 and {of - 1}.")
+    return [unit for k, unit in enumerate(units) if k % of == shard]
+
+
+def write_shard(path, header, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(header) + "\n")
+        for record in records:
+            f.write(json.dumps(record) + "\n")  # Key order kept: build records become CSV columns
+
+
+def read_shard(path):
+    with open(path, encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        records = [json.loads(line) for line in f if line.strip()]
+    return header, records
+
+
+# --- Scenario grid (run_cenario_mode) ---
+
+def scenario_units(max_dice, replicas):
+    return [(i, y, r) for i in range(1, max_dice + 1) for y in sweeps.DICE_TYPES for r in range(replicas)]
+
+
+def run_scenario_shard(path, shard, of, max_dice, adv_state, is_vicious, bonus_damage, armor_type, crit_rule,
+                       n_simulations=sweeps.N_SIMULATIONS_SCENARIO, seed=sweeps.SWEEP_SEED, replicas=1,
+                       method='planned'):
+    """
+    Computes this shard's (cell, replica) units and writes them: the planned
+    average of each cell, or its Monte Carlo damage moments.
+    """
+    if method not in SCENARIO_METHODS:
+        raise ValueError(f"Unknown method '{method}' (choose from {SCENARIO_METHODS}).")
+    if n_simulations < 1 or replicas < 1:
+        raise ValueError("n_simulations and replicas must be at least 1.")
+    if replicas > n_simulations:
+        raise ValueError(f"Cannot split {n_simulations} sample(s) into {replicas} replicas.")
+    if method == 'planned' and replicas != 1:
+        raise ValueError("Planned cells are computed whole: replicas need method 'monte_carlo'.")
+    config = {
+        "max_dice": max_dice, "adv_state": adv_state, "is_vicious": is_vicious, "bonus_damage": bonus_damage,
+        "armor_type": armor_type, "crit_rule": crit_rule, "n_simulations": n_simulations,
+        "seed": seed, "replicas": replicas, "method": method,
+    }
+    header = {"kind": "scenario", "config": config, "shard": shard, "of": of, "rules": rules_fingerprint()}
+
+    records = []
+    for i, y, r in shard_units(scenario_units(max_dice, replicas), shard, of):
+        # A single replica reuses the scenario_grid seed (shared cache)
+        unit_seed = sweeps.derive_seed(seed, i, y) if replicas == 1 else sweeps.derive_seed(seed, i, y, r)
+        if method == 'planned':
+            cell_config = (i, y, adv_state, is_vicious, bonus_damage, armor_type, crit_rule)
+            evaluation = planner.default_planner().evaluate(
+                cell_config, 'mean', planner.mean_tolerance_of(n_simulations, i, y), seed=unit_seed)
+            records.append({"cell": [i, y], "replica": r, "mean": evaluation["value"],
+                            "method": evaluation["method"], "estimated_error": evaluation["estimated_error"]})
+            continue
+        n = n_simulations // replicas + (1 if r < n_simulations % replicas else 0)  # Spread over the replicas
+        stats = sweeps.damage_stats(i, y, adv_state, is_vicious, bonus_damage, armor_type, crit_rule,
+                                    n_simulations=n, seed=unit_seed)
+        records.append({"cell": [i, y], "replica": r, "stats": list(stats)})
+
+    write_shard(path, header, records)
+    return len(records)
+
+
+def merge_scenario(header, records):
+    """Pools the replicas of every cell. Returns (csv_rows, summary)."""
+    config = header["config"]
+    if config.get("method", "monte_carlo") == 'planned':
+        return merge_planned_scenario(config, records)
+    pooled = {}
+    for record in records:
+        cell = tuple(record["cell"])
+        stats = tuple(record["stats"])
+        pooled[cell] = sweeps.combine_stats(pooled[cell], stats) if cell in pooled else stats
+
+    expected = {(i, y) for i, y, _ in scenario_units(config["max_dice"], 1)}
+    if set(pooled) != expected:
+        raise ValueError(f"{len(expected - set(pooled))} scenario cell(s) are missing from the shards.")
+
+    csv_rows = [["Dice Count"] + [f"d{y}" for y in sweeps.DICE_TYPES]]
+    cells = []
+    for i in range(1, config["max_dice"] + 1):
+        csv_rows.append([f"{i}d"] + [f"{pooled[(i, y)][1]:.3f}" for y in sweeps.DICE_TYPES])
+        for y in sweeps.DICE_TYPES:
+            n, mean, m2 = pooled[(i, y)]
+            variance = m2 / (n - 1) if n > 1 else 0.0
+            cells.append({"num_dice": i, "die_sides": y, "n": n, "mean": mean,
+                          "std": variance ** 0.5, "std_error": (variance / n) ** 0.5})
+    return csv_rows, {"config": config, "cells": cells}
+
+
+def merge_planned_scenario(config, records):
+    cells = {tuple(record["cell"]): record for record in records}
+    expected = {(i, y) for i, y, _ in scenario_units(config["max_dice"], 1)}
+    if set(cells) != expected:
+        raise ValueError(f"{len(expected - set(cells))} scenario cell(s) are missing from the shards.")
+
+    csv_rows = [["Dice Count"] + [f"d{y}" for y in sweeps.DICE_TYPES]]
+    summary_cells = []
+    for i in range(1, config["max_dice"] + 1):
+        csv_rows.append([f"{i}d"] + [f"{cells[(i, y)]['mean']:.3f}" for y in sweeps.DICE_TYPES])
+        for y in sweeps.DICE_TYPES:
+            record = cells[(i, y)]
+            summary_cells.append({"num_dice": i, "die_sides": y, "mean": record["mean"], "method": record["method"],
+                                  "estimated_error": record["estimated_error"]})
+    return csv_rows, {"config": config, "cells": summary_cells}
+
+
+# --- Build validation (validate_all_builds) ---
+
+def build_units():
+    return [(y, x) for y in balancete_magico.DIE_TYPES_Y for x in range(1, balancete_magico.MAX_DICE_X + 1)]
+
+
+def canonical_key(build):
+    """Position of a build in validate_all_builds' iteration order."""
+    x, y = (int(v) for v in build["Damage_Description"].split('d'))
+    return balancete_magico.DIE_TYPES_Y.index(y), x, build["Range_Blocks"], build["Area_Blocks"]
+
+
+def better_build(field, a, b):
+    """Highest 'field'; ties go to the build validate_all_builds would have found first."""
+    if a is None or b is None:
+        return a or b
+    if a[field] != b[field]:
+        return a if a[field] > b[field] else b
+    return a if canonical_key(a) < canonical_key(b) else b
+
+
+def summarize_builds(builds):
+    """Partial summary of one shard's builds (the 'Quick Builds Analysis' of validate_all_builds)."""
+    summary = empty_build_summary()
+    for build in builds:
+        summary["count"] += 1
+        summary["best_damage"] = better_build("Avg_Damage", summary["best_damage"], build)
+        if build["Total_PC_Cost"] == PowerEconomy.MAX_PC_BUDGET:
+            summary["max_level_count"] += 1
+            for key, field in (("max_level_best_damage", "Avg_Damage"), ("max_level_best_range", "Range_Blocks"),
+                               ("max_level_best_area", "Area_Blocks")):
+                summary[key] = better_build(field, summary[key], build)
+    return summary
+
+
+def empty_build_summary():
+    return {"count": 0, "best_damage": None, "max_level_count": 0, "max_level_best_damage": None,
+            "max_level_best_range": None, "max_level_best_area": None}
+
+
+def combine_build_summaries(a, b):
+    """Merges two partial summaries (counts add, best builds compete)."""
+    return {
+        "count": a["count"] + b["count"],
+        "best_damage": better_build("Avg_Damage", a["best_damage"], b["best_damage"]),
+        "max_level_count": a["max_level_count"] + b["max_level_count"],
+        "max_level_best_damage": better_build("Avg_Damage", a["max_level_best_damage"], b["max_level_best_damage"]),
+        "max_level_best_range": better_build("Range_Blocks", a["max_level_best_range"], b["max_level_best_range"]),
+        "max_level_best_area": better_build("Area_Blocks", a["max_level_best_area"], b["max_level_best_area"]),
+    }
+
+
+def run_builds_shard(path, shard, of):
+    """Validates this shard's (die type, dice count) rows and writes the builds plus a partial summary."""
+    units = set(shard_units(build_units(), shard, of))
+    builds = []
+    for build in balancete_magico.iter_valid_builds():
+        x, y = (int(v) for v in build["Damage_Description"].split('d'))
+        if (y, x) in units:
+            builds.append(build)
+
+    header = {"kind": "builds", "config": {"max_pc_budget": PowerEconomy.MAX_PC_BUDGET},
+              "shard": shard, "of": of, "rules": rules_fingerprint()}
+    records = [{"build": build} for build in builds] + [{"summary": summarize_builds(builds)}]
+    write_shard(path, header, records)
+    return len(builds)
+
+
+def merge_builds(records):
+    builds = sorted((r["build"] for r in records if "build" in r), key=canonical_key)
+    summary = empty_build_summary()
+    for record in records:
+        if "summary" in record:
+            summary = combine_build_summaries(summary, record["summary"])
+    if summary["count"] != len(builds):
+        raise ValueError("Shard summaries do not match the merged builds.")
+
+    csv_rows = [list(builds[0].keys())] + [list(b.values()) for b in builds] if builds else []
+    return csv_rows, summary
+
+
+# --- Merge ---
+
+def merge_shards(paths):
+    """
+    Validates that the shard files belong to one run (same kind, config, shard
+    count and rules) with every shard present once, then combines them.
+    Returns (kind, csv_rows, summary).
+    """
+    headers, records = [], []
+    for path in paths:
+        header, shard_records = read_shard(path)
+        headers.append(header)
+        records.extend(shard_records)
+
+    first = headers[0]
+    for header in headers[1:]:
+        for field in ("kind", "config", "of", "rules"):
+            if header[field] != first[field]:
+                raise ValueError(f"Shard files disagree on '{field}': {first[field]!r} != {header[field]!r}.")
+    shards = sorted(h["shard"] for h in headers)
+    if shards != list(range(first["of"])):
+        raise ValueError(f"Expected shards 0..{first['of'] - 1} exactly once, got {shards}.")
+
+    if first["kind"] == "scenario":
+        csv_rows, summary = merge_scenario(first, records)
+    else:
+        csv_rows, summary = merge_builds(records)
+    summary["rules"] = first["rules"]
+    return first["kind"], csv_rows, summary
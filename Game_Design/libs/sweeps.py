@@ -0,0 +1,203 @@
+"""
+Batch sweeps over the combat engine, shared by the CLI simulator
+('run_cenario_mode') and the portal's background jobs.
+"""
+import hashlib
+import json
+import os
+import random
+
+from Game_Design.libs.attack_kernels import compile_attack
+from Game_Design.libs.result_cache import cached
+from Game_Design.libs.synergia_rules import COMBAT_PARAMETERS, code_fingerprint, rule_parameters
+
+DICE_TYPES = [4, 6, 8, 10, 12]  # Standard die types
+N_SIMULATIONS_SCENARIO = 100000  # Simulations per cell in scenario
+SWEEP_SEED = 0  # Base seed: every cell derives its own, so cached cells are reproducible
+
+
+def derive_seed(base_seed, *parts):
+    """Deterministic 63-bit seed for one unit of work (e.g. a grid cell) of a seeded run."""
+    digest = hashlib.sha256(repr((base_seed,) + parts).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') >> 1
+
+
+@cached(parameters=COMBAT_PARAMETERS)
+def average_damage(num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule,
+                   n_simulations=N_SIMULATIONS_SCENARIO, seed=None):
+    """
+    Monte Carlo average damage of CombatMechanics.resolve_attack (through its compiled kernel).
+    A seed makes the run reproducible (and cacheable) without disturbing the global random stream.
+    """
+    kernel = compile_attack(num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule)
+    if seed is not None:
+        outer_state = random.getstate()
+    try:
+        if seed is not None:
+            random.seed(seed)
+        total_damage_sum, _ = kernel.run(n_simulations)
+    finally:
+        if seed is not None:
+            random.setstate(outer_state)
+    return total_damage_sum / n_simulations
+
+
+@cached(parameters=COMBAT_PARAMETERS)
+def damage_stats(num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule,
+                 n_simulations=N_SIMULATIONS_SCENARIO, seed=None):
+    """
+    Monte Carlo damage moments (n, mean, m2), where m2 is the sum of squared deviations.
+    Unlike a bare average, moments from separate runs can be pooled (see combine_stats).
+    """
+    kernel = compile_attack(num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule)
+    if seed is not None:
+        outer_state = random.getstate()
+    try:
+        if seed is not None:
+            random.seed(seed)
+        total_damage_sum, total_damage_sq = kernel.run(n_simulations)
+    finally:
+        if seed is not None:
+            random.setstate(outer_state)
+    mean = total_damage_sum / n_simulations
+    return n_simulations, mean, total_damage_sq - total_damage_sum * mean
+
+
+def combine_stats(a, b):
+    """Pools two (n, mean, m2) triples (Chan et al. parallel update)."""
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    return n, mean_a + delta * n_b / n, m2_a + m2_b + delta * delta * n_a * n_b / n
+
+
+class SweepJournal:
+    """
+    Append-only JSON-lines journal of finished sweep cells.
+    Every record is flushed and fsync'ed as soon as its cell is done, so an
+    interrupted sweep loses at most the cell that was running.
+    The journal only ever holds one sweep: a new run empties it (reset) and a
+    resumed one rewrites it with the cells it keeps (compact).
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, config, cell, seed, value):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(self._line(config, cell, seed, value))
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _line(config, cell, seed, value):
+        return json.dumps({"config": config, "cell": list(cell), "seed": seed, "value": value}, sort_keys=True) + "\n"
+
+    def reset(self):
+        """Empties the journal (start of a run that does not resume)."""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.flush()
+            os.fsync(f.fileno())
+
+    def compact(self, config):
+        """
+        Rewrites the journal with only the latest record of each cell of this config
+        (records of other sweeps, duplicates and a torn tail are dropped). Returns load(config).
+        """
+        cells = self.load(config)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for cell, (seed, value) in cells.items():
+                f.write(self._line(config, cell, seed, value))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        return cells
+
+    def load(self, config):
+        """{cell: (seed, value)} for the records of this config (the latest record of a cell wins)."""
+        cells = {}
+        if not os.path.exists(self.path):
+            return cells
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line of a killed run
+                if record.get("config") == config:
+                    cells[tuple(record["cell"])] = (record["seed"], record["value"])
+        return cells
+
+
+def scenario_values(max_dice, adv_state, is_vicious, bonus_damage, armor_type, crit_rule,
+                    average_fn=average_damage, on_cell=None, seed=SWEEP_SEED,
+                    n_simulations=N_SIMULATIONS_SCENARIO, journal_path=None, resume=False):
+    """
+    Average damage from 1dY to max_dice dY for every die type of a fixed scenario.
+    Returns {(num_dice, die_sides): average}.
+    'on_cell' is called after every cell (progress bars, job heartbeats).
+    Each cell gets a seed derived from 'seed' (None = unseeded, never cached).
+
+    With a journal_path every finished cell is appended to the journal and the
+    values are read back from it; 'resume' skips cells already journaled with the
+    same scenario, sample count, seed, evaluation function, rule code and combat rule parameters.
+    """
+    config = {
+        "adv_state": adv_state, "is_vicious": is_vicious, "bonus_damage": bonus_damage,
+        "armor_type": armor_type, "crit_rule": crit_rule, "n_simulations": n_simulations,
+        "parameters": rule_parameters(COMBAT_PARAMETERS),
+        # Cells computed another way (Monte Carlo vs planner) or under other rule code are not reused
+        "method": f"{average_fn.__module__}.{average_fn.__qualname__}",
+        "code": code_fingerprint(),
+    }
+    journal = SweepJournal(journal_path) if journal_path else None
+    done_cells = {}
+    if journal is not None:
+        if resume:
+            done_cells = journal.compact(config)
+        else:
+            journal.reset()
+    values = {}
+
+    for i in range(1, max_dice + 1):  # Rows (1d, 2d, ... Xd)
+        for y in DICE_TYPES:  # Columns (d4, d6, ...)
+            cell_seed = None if seed is None else derive_seed(seed, i, y)
+            previous = done_cells.get((i, y))
+            if previous is not None and cell_seed is not None and previous[0] == cell_seed:
+                values[(i, y)] = previous[1]
+            else:
+                values[(i, y)] = average_fn(
+                    num_dice=i,
+                    die_sides=y,
+                    adv_state=adv_state,
+                    is_vicious=is_vicious,
+                    bonus_damage=bonus_damage,
+                    armor_type=armor_type,
+                    crit_rule=crit_rule,
+                    n_simulations=n_simulations,
+                    seed=cell_seed
+                )
+                if journal is not None:
+                    journal.append(config, (i, y), cell_seed, values[(i, y)])
+            if on_cell is not None:
+                on_cell()
+
+    if journal is not None:
+        # The journal is the source of truth for the final table
+        journaled = journal.load(config)
+        values = {cell: journaled[cell][1] for cell in values}
+    return values
+
+
+def scenario_grid(max_dice, *args, **kwargs):
+    """
+    scenario_values() as CSV rows (header first), with values formatted like the simulator output.
+    Takes the same arguments as scenario_values.
+    """
+    values = scenario_values(max_dice, *args, **kwargs)
+    csv_data = [["Dice Count"] + [f"d{y}" for y in DICE_TYPES]]
+    for i in range(1, max_dice + 1):
+        csv_data.append([f"{i}d"] + [f"{values[(i, y)]:.3f}" for y in DICE_TYPES])
+    return csv_data
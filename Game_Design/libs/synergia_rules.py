@@ -1,5 +1,34 @@
 import random
 import math
+import hashlib
+import json
+import re
+import cmath
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def code_fingerprint():
+    """
+    Short hash of this file with the rule parameter values blanked out: changes whenever
+    the rule code changes, but not when only a parameter value is tuned.
+    """
+    with open(__file__, encoding='utf-8') as f:
+        source = f.read()
+    names = "|".join(sorted({name for cls in PARAMETRIZED_CLASSES for name in cls.PARAMETERS}))
+    source = re.sub(rf"^(\s+)({names}) = [^#\n]*", r"\1\2 = <parameter> ", source, flags=re.MULTILINE)
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()[:12]
+
+
+def rules_fingerprint():
+    """Short hash of the rule code and the current parameter values (used to version caches and outputs)."""
+    digest = hashlib.sha256(code_fingerprint().encode('utf-8'))
+    digest.update(parameters_fingerprint().encode('utf-8'))
+    return digest.hexdigest()[:12]
 
 
 class DiceEngine:
@@ -7,34 +36,237 @@ class DiceEngine:
     Generic dice rolling engine.
     Centralizes the system's randomness.
     Based on your old 'dice_roller.py'.
+
+    Dice come from the global 'random' stream (random.seed applies) unless a
+    seeded RollStream is installed (see roll_audit), which also records every
+    roll to an audit log.
     """
 
+    # Active roll_audit.RollStream, or None for the global 'random' stream. A context variable: a stream
+    # installed by one thread or task (a dice room) never captures the rolls of another
+    stream = ContextVar('synergia_roll_stream', default=None)
+
+    @staticmethod
+    def roll_die(sides):
+        """Rolls a single die."""
+        stream = DiceEngine.stream.get()
+        if stream is None:
+            return random.randint(1, sides)
+        with stream.record('dice', f"1d{sides}") as record:
+            value = stream.draw(sides)
+            record.results = [value]
+        return value
+
     @staticmethod
     def roll_XdY(num_die, sides):
         """Rolls X dice with Y sides and returns the list of results."""
-        return [random.randint(1, sides) for _ in range(num_die)]
+        stream = DiceEngine.stream.get()
+        if stream is None:
+            return [random.randint(1, sides) for _ in range(num_die)]
+        with stream.record('dice', f"{num_die}d{sides}") as record:
+            rolls = [stream.draw(sides) for _ in range(num_die)]
+            record.results = [sum(rolls)]
+        return rolls
 
     @staticmethod
     def roll_XdY_drop_lowest(num_die, sides, drop_n=1):
         """Rolls X dice, drops the N lowest."""
-        rolls = sorted(DiceEngine.roll_XdY(num_die, sides))
-        return rolls[drop_n:]
+        stream = DiceEngine.stream.get()
+        if stream is None:
+            return sorted(DiceEngine.roll_XdY(num_die, sides))[drop_n:]
+        with stream.record('dice', f"{num_die}d{sides}dl{drop_n}") as record:
+            kept = sorted(DiceEngine.roll_XdY(num_die, sides))[drop_n:]
+            record.results = [sum(kept)]
+        return kept
+
+    MAX_EXPLOSION_DEPTH = 100  # Rounds of explosions rolled at most (a threshold of 1 would never stop)
+    EXPLOSION_MODES = ('first', 'each')
 
     @staticmethod
-    def roll_XdY_explode(num_die, sides, threshold):
-        """Rolls X dice, exploding results >= threshold."""
+    def roll_XdY_explode(num_die, sides, threshold, mode='first', max_depth=None):
+        """
+        Rolls X dice, exploding results >= threshold, and returns the sum.
+        mode='first': while the first die of the latest pool explodes, a new XdY is added.
+        mode='each': every die >= threshold adds one more die, which can explode in turn.
+        At most max_depth rounds (default MAX_EXPLOSION_DEPTH) are rolled after the first pool.
+        """
+        if mode not in DiceEngine.EXPLOSION_MODES:
+            raise ValueError(f"Unknown explosion mode '{mode}' (choose from {DiceEngine.EXPLOSION_MODES}).")
+        if max_depth is None:
+            max_depth = DiceEngine.MAX_EXPLOSION_DEPTH
+
+        stream = DiceEngine.stream.get()
+        if stream is not None and stream.current is None:
+            expression = f"{num_die}d{sides}e{threshold}"
+            if mode == 'each':
+                expression += " each"
+            if max_depth != DiceEngine.MAX_EXPLOSION_DEPTH:
+                expression += f" depth={max_depth}"
+            with stream.record('dice', expression) as record:
+                record.results = [DiceEngine.roll_XdY_explode(num_die, sides, threshold, mode, max_depth)]
+            return record.results[0]
+
+        # Iterative: one pass per round of explosions, never one stack frame per explosion
         results = DiceEngine.roll_XdY(num_die, sides)
         final_sum = sum(results)
-
-        # Recursive explosion logic (simplified for sum)
-        if results and results[0] >= threshold:
-            # Note: Did the original logic explode only the first die or all?
-            # Assuming standard recursive explosion behavior
-            final_sum += DiceEngine.roll_XdY_explode(num_die, sides, threshold)
+        for _ in range(max_depth):
+            if mode == 'first':
+                if not results or results[0] < threshold:
+                    break
+                results = DiceEngine.roll_XdY(num_die, sides)
+            else:
+                exploded = sum(1 for r in results if r >= threshold)
+                if not exploded:
+                    break
+                results = DiceEngine.roll_XdY(exploded, sides)
+            final_sum += sum(results)
 
         return final_sum
 
 
+class Distribution:
+    """
+    Exact probability mass function over consecutive integers:
+    pmf[k] = P(X = offset + k), stored as a NumPy array.
+
+    Sums of independent variables are convolutions (FFT for large supports),
+    n i.i.d. copies use exponentiation by squaring, and huge dice pools can
+    switch to a Normal/Edgeworth approximation.
+    """
+
+    FFT_MIN_SIZE = 500  # Below this (len(a) * len(b) / len(a + b)) direct convolution is faster
+    APPROX_MIN_DICE = 2000  # sum_of_dice(method='auto') approximates from this pool size on
+
+    def __init__(self, pmf, offset=0):
+        self.pmf = np.asarray(pmf, dtype=float)
+        self.offset = int(offset)
+
+    @classmethod
+    def point(cls, value):
+        return cls([1.0], value)
+
+    @classmethod
+    def uniform(cls, low, high):
+        return cls(np.full(high - low + 1, 1 / (high - low + 1)), low)
+
+    @classmethod
+    def die(cls, sides):
+        return cls.uniform(1, sides)
+
+    @classmethod
+    def mixture(cls, weighted):
+        """Mixture of [(weight, Distribution), ...] (weights should sum to 1)."""
+        weighted = [(w, d) for w, d in weighted if w > 0]
+        low = min(d.offset for _, d in weighted)
+        high = max(d.offset + len(d.pmf) for _, d in weighted)
+        pmf = np.zeros(high - low)
+        for w, d in weighted:
+            pmf[d.offset - low:d.offset - low + len(d.pmf)] += w * d.pmf
+        return cls(pmf, low)
+
+    # --- Summaries ---
+
+    @property
+    def values(self):
+        return np.arange(self.offset, self.offset + len(self.pmf))
+
+    def mean(self):
+        return float(self.pmf @ self.values)
+
+    def variance(self):
+        return float(self.pmf @ (self.values - self.mean()) ** 2)
+
+    def prob(self, value):
+        k = value - self.offset
+        return float(self.pmf[k]) if 0 <= k < len(self.pmf) else 0.0
+
+    def cdf(self, value):
+        k = value - self.offset
+        return float(self.pmf[:max(0, min(k + 1, len(self.pmf)))].sum())
+
+    def quantile(self, p):
+        k = int(np.searchsorted(np.cumsum(self.pmf), p))
+        return self.offset + min(k, len(self.pmf) - 1)
+
+    # --- Operations ---
+
+    def shift(self, amount):
+        return Distribution(self.pmf, self.offset + amount)
+
+    def map(self, fn):
+        """Distribution of fn(X) for an integer-valued, vectorized fn (e.g. armor halving)."""
+        mapped = fn(self.values)
+        low = int(mapped.min())
+        return Distribution(np.bincount(mapped - low, weights=self.pmf), low)
+
+    def __add__(self, other):
+        """Sum of two independent variables."""
+        a, b = self.pmf, other.pmf
+        size = len(a) + len(b) - 1
+        if len(a) * len(b) / size < self.FFT_MIN_SIZE:
+            pmf = np.convolve(a, b)
+        else:
+            n_fft = 1 << (size - 1).bit_length()
+            pmf = np.fft.irfft(np.fft.rfft(a, n_fft) * np.fft.rfft(b, n_fft), n_fft)[:size]
+            pmf = np.clip(pmf, 0, None)  # FFT round-off leaves tiny negatives
+            pmf /= pmf.sum()
+        return Distribution(pmf, self.offset + other.offset)
+
+    def power(self, n):
+        """Sum of n i.i.d. copies, by exponentiation by squaring (O(log n) convolutions)."""
+        result = Distribution.point(0)
+        base = self
+        while n > 0:
+            if n & 1:
+                result = result + base
+            n >>= 1
+            if n:
+                base = base + base
+        return result
+
+    @classmethod
+    def approximate(cls, mean, variance, low, high, skewness=0.0, excess_kurtosis=0.0):
+        """
+        Discretized Edgeworth expansion (plain Normal when skewness = excess_kurtosis = 0)
+        on [low, high], truncated to +-10 standard deviations around the mean.
+        """
+        std = math.sqrt(variance)
+        low = max(low, int(math.floor(mean - 10 * std)))
+        high = min(high, int(math.ceil(mean + 10 * std)))
+        z = (np.arange(low, high + 1) - mean) / std
+        he3 = z ** 3 - 3 * z
+        he4 = z ** 4 - 6 * z ** 2 + 3
+        he6 = z ** 6 - 15 * z ** 4 + 45 * z ** 2 - 15
+        density = np.exp(-z ** 2 / 2) * (
+            1 + skewness / 6 * he3 + excess_kurtosis / 24 * he4 + skewness ** 2 / 72 * he6
+        )
+        pmf = np.clip(density, 0, None)
+        return cls(pmf / pmf.sum(), low)
+
+    @classmethod
+    def sum_of_dice(cls, num_die, sides, method='auto'):
+        """
+        Distribution of XdY. method: 'exact' (FFT/squaring), 'normal', 'edgeworth',
+        or 'auto' (exact up to APPROX_MIN_DICE dice, Edgeworth beyond).
+        """
+        if num_die == 0:
+            return cls.point(0)
+        if method == 'auto':
+            method = 'exact' if num_die < cls.APPROX_MIN_DICE else 'edgeworth'
+        if method == 'exact':
+            return cls.die(sides).power(num_die)
+
+        # A die is symmetric (no skewness); excess kurtosis of a sum shrinks as 1/n
+        variance = num_die * (sides ** 2 - 1) / 12
+        excess_kurtosis = 0.0
+        if method == 'edgeworth' and sides > 1:
+            excess_kurtosis = -6 * (sides ** 2 + 1) / (5 * (sides ** 2 - 1)) / num_die
+        if variance == 0:
+            return cls.point(num_die)
+        return cls.approximate(num_die * (sides + 1) / 2, variance, num_die, num_die * sides,
+                               excess_kurtosis=excess_kurtosis)
+
+
 class CombatMechanics:
     """
     Specific combat rules for Synergia RPG.
@@ -43,6 +275,12 @@ class CombatMechanics:
 
     ARMOR_TIERS = ['b', 'p', 'm', 's']  # Armored (Blindada), Heavy (Pesada), Medium (Média), None (Sem)
 
+    # Rule parameters (see rule_parameters / rule_versions)
+    ARMORED_DISADVANTAGE = 1  # Disadvantage steps armor 'b' imposes on the primary roll
+    ARMOR_DIVISOR = 2  # Armors 'm', 'p' and 'b' divide the damage by this (rounded down)
+    VICIOUS_DICE = 1  # Extra dice a Vicious attack rolls on a crit
+    PARAMETERS = {'ARMORED_DISADVANTAGE': 0, 'ARMOR_DIVISOR': 1, 'VICIOUS_DICE': 0}  # Name -> smallest valid value
+
     @staticmethod
     def degrade_armor(current_armor):
         """Armor degradation rule: b->p->m->s->s"""
@@ -55,13 +293,34 @@ class CombatMechanics:
         Executes a full attack round and returns a dictionary with the results.
         Returns structured data, not formatted text (better for Web and Analysis).
         """
+        stream = DiceEngine.stream.get()
+        if stream is None:
+            return CombatMechanics._resolve_attack(num_dice, die_sides, adv_state, is_vicious, bonus_damage,
+                                                   armor_type, crit_rule)
+        expression = CombatMechanics.attack_expression(num_dice, die_sides, adv_state, is_vicious, bonus_damage,
+                                                       armor_type, crit_rule)
+        with stream.record('attack', expression) as record:
+            result = CombatMechanics._resolve_attack(num_dice, die_sides, adv_state, is_vicious, bonus_damage,
+                                                     armor_type, crit_rule, randint=stream.randint)
+            record.results = [result["damage"]]
+        return result
+
+    @staticmethod
+    def attack_expression(num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule):
+        """Compact text form of an attack (how attacks appear in the roll audit log)."""
+        return (f"{num_dice}d{die_sides}{bonus_damage:+d} adv={adv_state} vicious={int(bool(is_vicious))} "
+                f"armor={armor_type} crit={crit_rule}")
+
+    @staticmethod
+    def _resolve_attack(num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule,
+                        randint=random.randint):
         logs = []
         current_armor = armor_type
         current_adv = adv_state
 
         # 1. Initial armor adjustment
         if current_armor == 'b':
-            current_adv -= 1
+            current_adv -= CombatMechanics.ARMORED_DISADVANTAGE
             logs.append("Armor 'b' applied Disadvantage.")
 
         # 2. Primary Roll
@@ -69,12 +328,12 @@ class CombatMechanics:
         final_primary_val = 0
 
         if current_adv == 0:
-            val = random.randint(1, die_sides)
+            val = randint(1, die_sides)
             primary_rolls = [val]
             final_primary_val = val
         else:
             qtd = abs(current_adv) + 1
-            rolls = [random.randint(1, die_sides) for _ in range(qtd)]
+            rolls = [randint(1, die_sides) for _ in range(qtd)]
             primary_rolls = rolls
             final_primary_val = max(rolls) if current_adv > 0 else min(rolls)
 
@@ -110,14 +369,15 @@ class CombatMechanics:
 
             # Vicious
             if is_vicious:
-                vicious_val = random.randint(1, die_sides)
-                total_dice_damage += vicious_val
-                logs.append(f"Vicious +{vicious_val}")
+                for _ in range(CombatMechanics.VICIOUS_DICE):
+                    vicious_val = randint(1, die_sides)
+                    total_dice_damage += vicious_val
+                    logs.append(f"Vicious +{vicious_val}")
 
             # Explosion
             current_explode_val = final_primary_val
             while current_explode_val == die_sides:
-                explode_val = random.randint(1, die_sides)
+                explode_val = randint(1, die_sides)
                 total_dice_damage += explode_val
                 logs.append(f"Explosion +{explode_val}")
                 current_explode_val = explode_val
@@ -135,7 +395,7 @@ class CombatMechanics:
             final_damage -= bonus_damage  # Removes the bonus that was added before
 
         if current_armor in ['m', 'p', 'b']:
-            final_damage = math.floor(final_damage / 2)
+            final_damage = final_damage // CombatMechanics.ARMOR_DIVISOR
             logs.append(f"Damage halved (Armor {current_armor})")
 
         return {
@@ -149,6 +409,184 @@ class CombatMechanics:
             }
         }
 
+    @staticmethod
+    def primary_distribution(die_sides, adv_state):
+        """Probability of each primary die face (index 0 -> face 1) after Advantage/Disadvantage."""
+        y = die_sides
+        if adv_state == 0:
+            return [1 / y] * y
+        qtd = abs(adv_state) + 1
+        if adv_state > 0:  # max of qtd dice
+            return [(v ** qtd - (v - 1) ** qtd) / y ** qtd for v in range(1, y + 1)]
+        return [((y - v + 1) ** qtd - (y - v) ** qtd) / y ** qtd for v in range(1, y + 1)]
+
+    @staticmethod
+    def expected_damage(num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule):
+        """
+        Exact expected damage of resolve_attack, without sampling.
+
+        Each branch is summarised by its mean and its residue characters
+        E[w^X] for the roots of unity w of order ARMOR_DIVISOR (for a divisor
+        of 2, the parity E[(-1)^X]): means add and characters multiply over
+        independent dice, and the armor division uses
+        E[floor(X/d)] = (E[X] - E[X mod d]) / d.
+        """
+        y = die_sides
+        d = CombatMechanics.ARMOR_DIVISOR
+        roots = CombatMechanics._residue_roots(d)  # roots[r][k - 1] = w_k^r
+
+        def char(value):
+            return roots[value % d]
+
+        def mul(a, b):
+            return [x * z for x, z in zip(a, b)]
+
+        die_mean = (y + 1) / 2
+        die_char, last_char = CombatMechanics._face_chars(y, d)
+        sec_mean = (num_dice - 1) * die_mean
+        sec_char = [c ** (num_dice - 1) for c in die_char]
+
+        def branch_damage(armor, dice_mean, dice_char):
+            if armor == 's':
+                return dice_mean + bonus_damage
+            if armor == 'm':
+                dice_mean += bonus_damage
+                dice_char = mul(dice_char, char(bonus_damage))
+            # 'm', 'p' and 'b' divide (p and b also drop the bonus)
+            residue_mean = sum(
+                r * (1 + sum(c / w for c, w in zip(dice_char, roots[r]))).real for r in range(1, d)
+            ) / d
+            return (dice_mean - residue_mean) / d
+
+        calc_adv_state = adv_state - CombatMechanics.ARMORED_DISADVANTAGE if armor_type == 'b' else adv_state
+        probs = CombatMechanics.primary_distribution(y, calc_adv_state)
+
+        # Normal hits (face 1 is a Miss and deals 0). branch_damage is affine in the mean
+        # and the characters, so the hit faces are folded into one mixture first.
+        total = 0.0
+        p_hit = sum(probs[1:y - 1])
+        if p_hit > 0:
+            hit_faces = [(v, probs[v - 1] / p_hit) for v in range(2, y)]
+            hit_mean = sum(v * p for v, p in hit_faces) + sec_mean
+            hit_char = mul(CombatMechanics._mean_char(hit_faces, d), sec_char)
+            total += p_hit * branch_damage(armor_type, hit_mean, hit_char)
+
+        if y < 2:
+            return total
+
+        # Crit: the primary die (and optional Vicious dice) plus an explosion chain.
+        # The chain rolls K extra max faces (P = q^K * (1 - q)) then one face in 1..y-1.
+        vicious_dice = CombatMechanics.VICIOUS_DICE if is_vicious else 0
+        crit_mean = y + sec_mean + vicious_dice * die_mean
+        crit_char = mul(mul(char(y), sec_char), [c ** vicious_dice for c in die_char])
+        q = 1 / y
+        sign = char(y)
+        last_mean = y / 2
+
+        def crit_armor(extra_max_faces):
+            if crit_rule == 'e':
+                return 's'
+            armor = armor_type
+            if crit_rule == 't':  # One step for the crit and one per exploding max face
+                for _ in range(1 + extra_max_faces):
+                    armor = CombatMechanics.degrade_armor(armor)
+            return armor
+
+        # After 3 extra max faces every armor has degraded to 's', so the rest is one tail term.
+        for k in range(3):
+            chain_mean = k * y + last_mean
+            chain_char = [w ** k * c for w, c in zip(sign, last_char)]
+            total += probs[y - 1] * (1 - q) * q ** k * branch_damage(
+                crit_armor(k), crit_mean + chain_mean, mul(crit_char, chain_char))
+
+        tail_mean = y * (3 + q / (1 - q)) + last_mean
+        tail_char = [w ** 3 * (1 - q) / (1 - q * w) * c for w, c in zip(sign, last_char)]
+        total += probs[y - 1] * q ** 3 * branch_damage(
+            crit_armor(3), crit_mean + tail_mean, mul(crit_char, tail_char))
+
+        return total
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _residue_roots(d):
+        """[[w^r for the roots of unity w != 1 of order d] for r in 0..d-1]."""
+        return [[cmath.exp(2j * cmath.pi * k * r / d) for k in range(1, d)] for r in range(d)]
+
+    @staticmethod
+    def _mean_char(weighted_faces, d):
+        """Characters of a face drawn with the given (face, probability) weights."""
+        roots = CombatMechanics._residue_roots(d)
+        by_residue = [0.0] * d
+        for u, p in weighted_faces:
+            by_residue[u % d] += p
+        return [sum(p * roots[r][k] for r, p in enumerate(by_residue) if p) for k in range(d - 1)]
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _face_chars(y, d):
+        """Characters of one die (faces 1..y) and of the last explosion face (1..y-1)."""
+        die_char = CombatMechanics._mean_char(((u, 1 / y) for u in range(1, y + 1)), d)
+        last_char = CombatMechanics._mean_char(((u, 1 / (y - 1)) for u in range(1, y)), d) if y > 1 else []
+        return die_char, last_char
+
+    @staticmethod
+    def damage_distribution(num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule,
+                            method='auto', tolerance=1e-15):
+        """
+        Full damage distribution of resolve_attack, built analytically.
+        The secondary dice are one Distribution.sum_of_dice (FFT, or approximated for huge pools);
+        the explosion chain is expanded until its remaining probability is below 'tolerance'.
+        """
+        y = die_sides
+        calc_adv_state = adv_state - CombatMechanics.ARMORED_DISADVANTAGE if armor_type == 'b' else adv_state
+        probs = CombatMechanics.primary_distribution(y, calc_adv_state)
+        secondary = Distribution.sum_of_dice(num_dice - 1, y, method)
+        divisor = CombatMechanics.ARMOR_DIVISOR
+
+        def finish(dist, armor):
+            if armor == 's':
+                return dist.shift(bonus_damage)
+            if armor == 'm':
+                dist = dist.shift(bonus_damage)
+            return dist.map(lambda v: np.floor_divide(v, divisor))
+
+        weighted = [(probs[0], Distribution.point(0))]  # Miss
+        if y < 2:
+            return Distribution.mixture(weighted)
+
+        # Normal hits: primary 2..y-1 (a mixture of shifts of the same secondary pool)
+        p_hit = sum(probs[1:y - 1])
+        if p_hit > 0:
+            primary_hit = Distribution(np.array(probs[1:y - 1]) / p_hit, 2)
+            weighted.append((p_hit, finish(primary_hit + secondary, armor_type)))
+
+        # Crits: P(explosion sum = k*y + u) = q^k / y for u in 1..y-1, grouped by final armor
+        crit_base = secondary.shift(y)
+        if is_vicious:
+            crit_base = crit_base + Distribution.sum_of_dice(CombatMechanics.VICIOUS_DICE, y, method)
+        q = 1 / y
+        max_k = max(1, math.ceil(math.log(tolerance) / math.log(q)))
+        chains = {}
+        for k in range(max_k + 1):
+            if crit_rule == 'e':
+                armor = 's'
+            else:
+                armor = armor_type
+                if crit_rule == 't':
+                    for _ in range(1 + k):
+                        armor = CombatMechanics.degrade_armor(armor)
+            chains.setdefault(armor, []).append(k)
+
+        for armor, ks in chains.items():
+            pmf = np.zeros((max(ks) + 1) * y)
+            for k in ks:
+                pmf[k * y + 1:k * y + y] = q ** k / y
+            weight = pmf.sum()
+            chain = Distribution(pmf / weight, 0)
+            weighted.append((probs[y - 1] * weight, finish(crit_base + chain, armor)))
+
+        return Distribution.mixture(weighted)
+
 
 class PowerEconomy:
     """
@@ -156,17 +594,23 @@ class PowerEconomy:
     Based on 'balancete_magico.py'.
     """
 
+    # Rule parameters (see rule_parameters / rule_versions)
     MAX_PC_BUDGET = 60  # System constant
+    DAMAGE_COST_DIVISOR = 2  # Damage costs (X*Y) / this
+    RANGE_COST_DIVISOR = 2  # Range costs ceil(blocks / this)
+    AREA_COST_PER_BLOCK = 1
+    PARAMETERS = {'MAX_PC_BUDGET': 0, 'DAMAGE_COST_DIVISOR': 1, 'RANGE_COST_DIVISOR': 1,
+                  'AREA_COST_PER_BLOCK': 0}  # Name -> smallest valid value
 
     @staticmethod
     def calculate_cost(num_die, tipo_dado, alcance, area):
         """
         Calculates the Creation Points (PC) cost of an ability.
-        Formula: (X*Y)/2 + Range/2 + Area
+        Formula: (X*Y)/2 + Range/2 + Area (with the default parameters)
         """
-        custo_dano = (num_die * tipo_dado) / 2
-        custo_alcance = math.ceil(alcance / 2)
-        custo_area = area
+        custo_dano = (num_die * tipo_dado) / PowerEconomy.DAMAGE_COST_DIVISOR
+        custo_alcance = math.ceil(alcance / PowerEconomy.RANGE_COST_DIVISOR)
+        custo_area = area * PowerEconomy.AREA_COST_PER_BLOCK
 
         total = custo_dano + custo_alcance + custo_area
 
@@ -181,4 +625,57 @@ class PowerEconomy:
     @staticmethod
     def estimate_avg_damage(num_die, tipo_dado):
         """Returns the statistical average damage (excluding crits/misses)."""
-        return num_die * ((tipo_dado + 1) / 2)
\ No newline at end of file
+        return num_die * ((tipo_dado + 1) / 2)
+
+
+# --- Rule parameters ---
+
+PARAMETRIZED_CLASSES = (CombatMechanics, PowerEconomy)
+COMBAT_PARAMETERS = tuple(f"CombatMechanics.{name}" for name in CombatMechanics.PARAMETERS)
+ECONOMY_PARAMETERS = tuple(f"PowerEconomy.{name}" for name in PowerEconomy.PARAMETERS)
+
+
+def rule_parameters(names=None):
+    """Current value of every rule parameter as {'Class.NAME': value} (only 'names' if given)."""
+    values = {f"{cls.__name__}.{name}": getattr(cls, name) for cls in PARAMETRIZED_CLASSES
+              for name in cls.PARAMETERS}
+    if names is None:
+        return values
+    return {name: values[name] for name in names}
+
+
+def parameters_fingerprint(names=None):
+    """Short hash of the current parameter values (all, or only 'names')."""
+    payload = json.dumps(rule_parameters(names), sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def set_rule_parameters(values):
+    """
+    Sets rule parameters ({'Class.NAME': value}) in place and returns their previous values.
+    Raises ValueError for unknown names and values that are not integers above the parameter's minimum.
+    """
+    classes = {cls.__name__: cls for cls in PARAMETRIZED_CLASSES}
+    previous = {}
+    for name, value in values.items():
+        class_name, _, attr = name.partition('.')
+        cls = classes.get(class_name)
+        if cls is None or attr not in cls.PARAMETERS:
+            raise ValueError(f"Unknown rule parameter '{name}' (choose from {sorted(rule_parameters())}).")
+        if isinstance(value, bool) or not isinstance(value, int) or value < cls.PARAMETERS[attr]:
+            raise ValueError(f"'{name}' must be an integer >= {cls.PARAMETERS[attr]} (got {value!r}).")
+    for name, value in values.items():
+        class_name, _, attr = name.partition('.')
+        previous[name] = getattr(classes[class_name], attr)
+        setattr(classes[class_name], attr, value)
+    return previous
+
+
+@contextmanager
+def rule_overrides(values):
+    """Runs a block with some rule parameters changed (what-if sweeps), restoring them afterwards."""
+    previous = set_rule_parameters(values)
+    try:
+        yield
+    finally:
+        set_rule_parameters(previous)
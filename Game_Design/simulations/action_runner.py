@@ -1,5 +1,14 @@
 import re
-from Game_Design.dice_roller import *
+
+from Game_Design.libs.synergia_rules import DiceEngine
+
+# R#XdYdlAeZ+-W (every part but 'dY' is optional)
+ACTION_PATTERN = re.compile(
+    r"^(?:(?P<R>\d+)#)?(?P<X>\d*)d(?P<Y>\d+)"
+    r"(?:d(?P<drop>[lh])(?P<A>\d*))?"
+    r"(?:e(?P<Z>\d*))?"
+    r"(?:(?P<sign>[+-])(?P<W>\d+))?$"
+)
 
 
 def read_action(command: str) -> list:
@@ -10,87 +19,78 @@ def read_action(command: str) -> list:
 
     returns mandatorily the list with all possible
     commands, what is optional is with or N (N->None)
-    return: ['R orN', 'X', 'Y', 'lA orN', 'Z orN', '+-W orN', 'False or True']
-    ex1: ['None', '4', '6', 'l1', 'None', '0', 'True']
-    ex2: ['2', '3', '12', 'l1', '12', '5', 'False']
+    return: [R, X, Y, 'lA' or 'hA' or None, Z or None, W, addition]
+    ex1: [1, 4, 6, 'l2', None, 0, True]
+    ex2: [2, 3, 12, 'l1', 12, 5, False]   ('e' alone explodes on the max face)
+
+    Raises ValueError for a command that does not follow the syntax.
     """
-    command.strip()  # Transforms '4d6 + 5' -> '4d6+5'
-    command.lower()  # Transforms '3d12Dl2' -> '3d12dl2'
-
-    final_command = []
-    index = 0
-    reference_command = re.split(r'[#, d, e, +, -]', command)
-    # reference_command:
-    # ex1: [-- '4', '6', 'l1', -- '0']
-    # ex2: ['2', '3', '12', 'l1', '12', '-5']
-    # The split() method returns a list of substrings.
-    if '#' in command:
-        final_command.append(int(reference_command[index]))  # index=0
-        index += 1  # index=1
-    else:
-        final_command.append(1)
-
-    final_command.append(reference_command[index])  # X
-    final_command.append(reference_command[index + 1])  # Y
-    index += 2  # index=3
-
-    if ('l' in command) or ('h' in command):
-        final_command.append(reference_command[index])  # index=3
-        index += 1  # index=4
-    else:
-        final_command.append(None)
-
-    # Exploding Critical eZ or e ex: e8, e
-    if 'e' in command:
-        final_command.append(reference_command[index])  # index=4
-        index += 1  # index=5
-    else:
-        final_command.append(None)
-
-    # Modifier + or - ex: +3, -5
-    addition = True
-    if ('-' in command) or ('+' in command):
-        final_command.append(reference_command[index])
-        if '-' in command:
-            addition = False
-    else:
-        final_command.append(0)
-    final_command.append(addition)
-    print(final_command)
-    return final_command
-
-
-def run_action(command: str):
-    c = read_action(command)
+    command = command.replace(" ", "").lower()  # '3d12Dl2 + 5' -> '3d12dl2+5'
+    match = ACTION_PATTERN.match(command)
+    if not match:
+        raise ValueError(f"Invalid dice expression '{command}' (expected R#XdYdlAeZ+-W, e.g. 2#3d12dl1e-5).")
+
+    repeat = int(match['R'] or 1)
+    num_die = int(match['X'] or 1)
+    sides = int(match['Y'])
+    if repeat < 1 or num_die < 1 or sides < 1:
+        raise ValueError("R, X and Y must be at least 1.")
+
+    drop = None
+    if match['drop']:
+        drop_n = int(match['A'] or 1)
+        if drop_n >= num_die:
+            raise ValueError(f"Cannot drop {drop_n} of {num_die} dice.")
+        drop = f"{match['drop']}{drop_n}"
+
+    explode = None
+    if match['Z'] is not None:
+        explode = int(match['Z'] or sides)
+        if explode < 2:
+            raise ValueError("Exploding at 1 or less would never stop.")
+
+    modifier = int(match['W'] or 0)
+    addition = match['sign'] != '-'
+    return [repeat, num_die, sides, drop, explode, modifier, addition]
+
+
+def run_action(command: str) -> list:
     """
-    return: ['R orN', 'X', 'Y', 'lA orN', 'Z orN', 'W orN', 'False or True']
-                1      1     2     3         4        5            6
+    return: one dict per repetition (R): {"rolls", "kept", "total"}
 
-    WHICH roll to make is to consider only A and Z. 
+    WHICH roll to make is to consider only A and Z.
         W only applies to the final result
         R is simply how many times to do it
     so the priority of what to define first is:
     l and h, A and Z | X and Y | W | R
-         1           2     3   4 
+         1           2     3   4
     """
-    rolls = []  # list of N-lists of results. Functions will have resolved advantages etc
-    R = int(c[0])
-    X = int(c[1])
-    Y = int(c[2])
-    function = roll_XdY
-    D = False
-    Z = False
-
-    if c[4] is not None:
-        Z = int(c[4])
-        function = roll_XdY_eZ
-    if c[3] is not None:
-        pass
-
-    for r in range(int(R)):
-        rolls[r] = function(X, Y)
-
-    pass
-
-
-read_action("3d6")
+    R, X, Y, drop, Z, W, addition = read_action(command)
+    modifier = W if addition else -W
+
+    stream = DiceEngine.stream.get()
+    if stream is not None:
+        # Audited session: the whole expression is one roll in the log
+        with stream.record('action', command) as record:
+            results = _roll_action(R, X, Y, drop, Z, modifier)
+            record.results = [r["total"] for r in results]
+        return results
+    return _roll_action(R, X, Y, drop, Z, modifier)
+
+
+def _roll_action(R, X, Y, drop, Z, modifier):
+    results = []
+    for _ in range(R):
+        rolls = DiceEngine.roll_XdY(X, Y)
+        kept = sorted(rolls)
+        if drop is not None:
+            drop_n = int(drop[1:])
+            kept = kept[drop_n:] if drop[0] == 'l' else kept[:-drop_n]
+        total = sum(kept)
+
+        # Same rule as DiceEngine.roll_XdY_explode: the first die triggers a new XdY
+        if Z is not None and rolls[0] >= Z:
+            total += DiceEngine.roll_XdY_explode(X, Y, Z)
+
+        results.append({"rolls": rolls, "kept": kept, "total": total + modifier})
+    return results
@@ -0,0 +1,92 @@
+"""
+Runs one shard of a big sweep, or merges the shard files into one CSV.
+
+    # On each machine (shard 0..3 of 4), writing to a shared folder:
+    python shard_runner.py scenario --shard 0 --of 4 --max-dice 50 --armor b --crit t -o /shared/scen_0.jsonl
+    python shard_runner.py builds --shard 0 --of 4 -o /shared/builds_0.jsonl
+
+    # Anywhere, once every shard is done:
+    python shard_runner.py merge /shared/scen_*.jsonl -o synergia_cenario_output.csv --summary summary.json
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+
+# Makes the shared 'Game_Design.libs' importable when running this script directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from Game_Design.libs import shards, sweeps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded Synergia sweeps.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scenario = commands.add_parser("scenario", help="Run one shard of a scenario grid (run_cenario_mode).")
+    scenario.add_argument("--max-dice", type=int, default=10)
+    scenario.add_argument("--adv", type=int, default=0, help="Advantage state (1, 0, -1).")
+    scenario.add_argument("--vicious", action="store_true")
+    scenario.add_argument("--bonus", type=int, default=0)
+    scenario.add_argument("--armor", choices=['s', 'm', 'p', 'b'], default='s')
+    scenario.add_argument("--crit", choices=['e', 't'], default='e')
+    scenario.add_argument("--samples", type=int, default=sweeps.N_SIMULATIONS_SCENARIO)
+    scenario.add_argument("--seed", type=int, default=sweeps.SWEEP_SEED)
+    scenario.add_argument("--method", choices=shards.SCENARIO_METHODS, default='planned',
+                          help="planned: like the simulator (cheapest method at least as precise as --samples); "
+                               "monte_carlo: always simulate --samples.")
+    scenario.add_argument("--replicas", type=int, default=1,
+                          help="monte_carlo only: split every cell's samples into this many units.")
+
+    builds = commands.add_parser("builds", help="Run one shard of validate_all_builds.")
+
+    for shard_parser in (scenario, builds):
+        shard_parser.add_argument("--shard", type=int, required=True, help="Index of this shard (0-based).")
+        shard_parser.add_argument("--of", type=int, required=True, help="Total number of shards.")
+        shard_parser.add_argument("-o", "--output", required=True, help="Shard file to write (.jsonl).")
+
+    merge = commands.add_parser("merge", help="Merge shard files into one CSV.")
+    merge.add_argument("inputs", nargs="+")
+    merge.add_argument("-o", "--output", required=True, help="Merged CSV file.")
+    merge.add_argument("--summary", help="Also write the merged statistics as JSON.")
+
+    args = parser.parse_args()
+    start_time = time.time()
+
+    if args.command == "scenario":
+        try:
+            count = shards.run_scenario_shard(
+                args.output, args.shard, args.of, args.max_dice, args.adv, args.vicious, args.bonus,
+                args.armor, args.crit, n_simulations=args.samples, seed=args.seed, replicas=args.replicas,
+                method=args.method
+            )
+        except ValueError as e:
+            print(f"[ERROR] Could not run the shard: {e}")
+            sys.exit(1)
+        print(f"Shard {args.shard}/{args.of}: {count} unit(s) in {time.time() - start_time:.2f}s -> {args.output}")
+
+    elif args.command == "builds":
+        count = shards.run_builds_shard(args.output, args.shard, args.of)
+        print(f"Shard {args.shard}/{args.of}: {count:,} valid build(s) in {time.time() - start_time:.2f}s "
+              f"-> {args.output}")
+
+    else:
+        try:
+            kind, csv_rows, summary = shards.merge_shards(args.inputs)
+        except ValueError as e:
+            print(f"[ERROR] Could not merge: {e}")
+            sys.exit(1)
+
+        # Same CSV dialects as the single-machine tools
+        delimiter = ';' if kind == "scenario" else ','
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f, delimiter=delimiter).writerows(csv_rows)
+        if args.summary:
+            with open(args.summary, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2)
+        print(f"[SUCCESS] Merged {len(args.inputs)} {kind} shard(s) into '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,22 @@
+import os
+import sys
+import argparse
 import random
 import math
 import time
 import csv
+import json
+
+# Makes the shared 'Game_Design.libs' importable when running this script directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from Game_Design.libs.result_cache import cached
+from Game_Design.libs.synergia_rules import COMBAT_PARAMETERS, CombatMechanics
+from Game_Design.libs import columnar
+from Game_Design.libs import doe
+from Game_Design.libs import planner
+from Game_Design.libs import rule_versions
+from Game_Design.libs import sensitivity
+from Game_Design.libs.sweeps import DICE_TYPES, SWEEP_SEED, scenario_values
 
 # Tries to import 'rich'. If it fails, warns the user.
 try:
@@ -16,10 +31,14 @@ except ImportError:
     exit()
 
 # --- CONSTANTS ---
-DICE_TYPES = [4, 6, 8, 10, 12]  # Standard die types
 N_SIMULATIONS_SINGLE = 300000  # Simulations for quick test
 N_SIMULATIONS_SCENARIO = 100000  # Simulations per cell in scenario (faster)
+SINGLE_SEED = 0  # Seed of the single-mode simulation (same config -> cached result)
 EXIT_KEYWORD = 'back'  # Keyword to return to main menu
+JOURNAL_FILENAME = "synergia_cenario_journal.jsonl"  # Finished scenario cells (for --resume)
+N_SIMULATIONS_DOE = 20000  # Simulations per point in DOE mode with Monte Carlo evaluation
+DOE_FILENAME = "synergia_doe_surrogate.json"
+TORNADO_FILENAME = "synergia_sensitivity_tornado.csv"
 
 
 # --- SIMULATION FUNCTIONS (THE "ENGINE") ---
@@ -56,7 +75,7 @@ def simulate_synergia_roll(num_dice, die_sides, adv_state, is_vicious, bonus_dam
     roll_details = []
 
     if current_armor_type == 'b':
-        current_adv_state -= 1
+        current_adv_state -= CombatMechanics.ARMORED_DISADVANTAGE
         roll_details.append("Info: Armor 'b' applies Disadvantage.")
 
     primary_roll, primary_detail = roll_primary_die(die_sides, current_adv_state)
@@ -87,9 +106,10 @@ def simulate_synergia_roll(num_dice, die_sides, adv_state, is_vicious, bonus_dam
             current_armor_type = new_armor
 
         if is_vicious:
-            vicious_roll = random.randint(1, die_sides)
-            roll_details.append(f"Vicious Extra: [{vicious_roll}]")
-            total_dice_damage += vicious_roll
+            for _ in range(CombatMechanics.VICIOUS_DICE):
+                vicious_roll = random.randint(1, die_sides)
+                roll_details.append(f"Vicious Extra: [{vicious_roll}]")
+                total_dice_damage += vicious_roll
 
         current_explosion = primary_roll
         while current_explosion == die_sides:
@@ -121,7 +141,7 @@ def simulate_synergia_roll(num_dice, die_sides, adv_state, is_vicious, bonus_dam
     final_damage = total_dice_damage + bonus_to_add
 
     if apply_halving:
-        final_damage = math.floor(final_damage / 2)
+        final_damage = final_damage // CombatMechanics.ARMOR_DIVISOR
         roll_details.append(f"Info: Damage Halved (Armor {current_armor_type})")
 
     return final_damage, roll_details, status
@@ -145,7 +165,7 @@ def analyze_roll_config(console, description, num_dice, die_sides, adv_state, is
 
     calc_adv_state = adv_state
     if armor_type == 'b':
-        calc_adv_state -= 1
+        calc_adv_state -= CombatMechanics.ARMORED_DISADVANTAGE
 
     if calc_adv_state == 0:  # Normal
         prob_miss = 1 / Y
@@ -175,21 +195,23 @@ def analyze_roll_config(console, description, num_dice, die_sides, adv_state, is
     console.print(Panel(prob_text, title="[bold green]Theoretical Probabilities[/bold green]", border_style="green",
                         padding=(1, 2)))
 
-    # --- Part 2: Monte Carlo Simulation (WITH SPINNER) ---
-    total_damage_sum = 0
-    avg_damage = 0
-    with console.status(f"[bold yellow]Running {N_SIMULATIONS_SINGLE:,} simulations...", spinner="dots8Bit") as status:
-        for _ in range(N_SIMULATIONS_SINGLE):
-            damage, _, _ = simulate_synergia_roll(
-                num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule
-            )
-            total_damage_sum += damage
-        avg_damage = total_damage_sum / N_SIMULATIONS_SINGLE
+    # --- Part 2: Average Damage (WITH SPINNER) ---
+    # The planner picks the cheapest method at least as precise as N_SIMULATIONS_SINGLE samples
+    config = (num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule)
+    tolerance = planner.mean_tolerance_of(N_SIMULATIONS_SINGLE, num_dice, die_sides)
+    with console.status(f"[bold yellow]Calculating average damage...", spinner="dots8Bit") as status:
+        evaluation = planner.default_planner().evaluate(config, 'mean', tolerance, seed=SINGLE_SEED)
         time.sleep(0.5)
+    avg_damage = evaluation["value"]
 
     sim_text = Text()
     sim_text.append("Effective Average Damage: ", style="default")
-    sim_text.append(f"{avg_damage:.3f}", style="bold yellow")
+    sim_text.append(f"{avg_damage:.3f}\n", style="bold yellow")
+    method = evaluation["method"]
+    if evaluation["n_samples"]:
+        method += f" ({evaluation['n_samples']:,} samples)"
+    sim_text.append(f"Method: {method} | error <= {evaluation['estimated_error']:.3g} | "
+                    f"{evaluation['seconds'] * 1000:.2f} ms", style="dim")
 
     console.print(
         Panel(sim_text, title="[bold magenta]Damage Simulation[/bold magenta]", border_style="magenta", padding=(1, 2)))
@@ -218,18 +240,17 @@ def analyze_roll_config(console, description, num_dice, die_sides, adv_state, is
     console.print("")
 
 
-def calculate_average_damage(num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule):
+@cached(parameters=COMBAT_PARAMETERS)
+def calculate_average_damage(num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule,
+                             n_simulations=N_SIMULATIONS_SCENARIO, seed=None):
     """
     (SCENARIO MODE)
     "Silent" function that only calculates and returns average damage.
+    At least as precise as n_simulations Monte Carlo runs, by the cheapest method the
+    planner finds (usually the exact closed form). Seeded runs are stored in the on-disk result cache.
     """
-    total_damage_sum = 0
-    for _ in range(N_SIMULATIONS_SCENARIO):
-        damage, _, _ = simulate_synergia_roll(
-            num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule
-        )
-        total_damage_sum += damage
-    return total_damage_sum / N_SIMULATIONS_SCENARIO
+    return planner.average_damage(num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule,
+                                  n_simulations=n_simulations, seed=seed)
 
 
 # --- MENU AND INPUT VALIDATION FUNCTIONS ---
@@ -305,6 +326,19 @@ def get_max_dice_input(console):
             console.print("[prompt.invalid]Invalid input. Please enter an integer.")
 
 
+def get_int_input(console, prompt, low, high):
+    while True:
+        val = console.input(f"[bold cyan]{prompt}[/] ")
+        if val.lower() in ['stop', EXIT_KEYWORD]: return EXIT_KEYWORD
+        try:
+            value = int(val)
+            if low <= value <= high:
+                return value
+            console.print(f"[prompt.invalid]Please enter a number between {low} and {high}.")
+        except ValueError:
+            console.print("[prompt.invalid]Invalid input. Please enter an integer.")
+
+
 # --- EXECUTION MODES ---
 
 def run_avulso_mode(console):
@@ -362,8 +396,12 @@ def run_avulso_mode(console):
         console.print("--- Next Single Analysis ---", justify="center")
 
 
-def run_cenario_mode(console):
-    """Runs the scenario definition and CSV generation mode."""
+def run_cenario_mode(console, resume=False, journal_path=JOURNAL_FILENAME, output_format="csv"):
+    """
+    Runs the scenario definition and CSV generation mode.
+    Every finished cell goes to the journal; with 'resume', cells already
+    journaled for the same scenario and seed are not simulated again.
+    """
 
     console.print(Panel(
         f"Scenario Definition Mode\n"
@@ -399,16 +437,13 @@ def run_cenario_mode(console):
         f"Adv: {adv_state} | Vicious: {is_vicious} | Bonus: +{bonus} | "
         f"Armor: {armor_type.upper()} | Crit: {crit_rule.upper()}"
     )
-    console.print(Panel(f"Scenario Defined: {desc_cenario}\nTesting from 1dY to {max_dice}dY.",
+    resume_note = f"\nResuming from journal '{journal_path}'." if resume else ""
+    console.print(Panel(f"Scenario Defined: {desc_cenario}\nTesting from 1dY to {max_dice}dY.{resume_note}",
                         title="[bold cyan]Summary[/bold cyan]"))
 
     # --- Process Batch ---
     console.print(f"\n[bold]--- 3. Processing {max_dice * len(DICE_TYPES)} combinations ---[/bold]")
 
-    csv_data = []
-    header = ["Dice Count"] + [f"d{y}" for y in DICE_TYPES]
-    csv_data.append(header)
-
     total_steps = max_dice * len(DICE_TYPES)
 
     # Configura a barra de progresso
@@ -423,33 +458,43 @@ def run_cenario_mode(console):
     with progress_bar as progress:
         task = progress.add_task("[green]Calculating Damage...", total=total_steps)
 
-        for i in range(1, max_dice + 1):  # Rows (1d, 2d, ... Xd)
-            current_row = [f"{i}d"]
-            for y in DICE_TYPES:  # Columns (d4, d6, ...)
-                avg_dmg = calculate_average_damage(
-                    num_dice=i,
-                    die_sides=y,
-                    adv_state=adv_state,
-                    is_vicious=is_vicious,
-                    bonus_damage=bonus,
-                    armor_type=armor_type,
-                    crit_rule=crit_rule
-                )
-                current_row.append(f"{avg_dmg:.3f}")
-                progress.update(task, advance=1)
-            csv_data.append(current_row)
-
-    # --- Salvar o Arquivo CSV ---
-    filename = "synergia_cenario_output.csv"
+        values = scenario_values(
+            max_dice, adv_state, is_vicious, bonus, armor_type, crit_rule,
+            average_fn=calculate_average_damage,
+            on_cell=lambda: progress.update(task, advance=1),
+            n_simulations=N_SIMULATIONS_SCENARIO,
+            journal_path=journal_path,
+            resume=resume
+        )
+    table = columnar.scenario_table(max_dice, values)
+
+    # --- Salvar os Arquivos (.npy colunar e/ou CSV derivado) ---
+    saved_files = []
+    scenario = {"adv_state": adv_state, "is_vicious": is_vicious, "bonus_damage": bonus,
+                "armor_type": armor_type, "crit_rule": crit_rule}
     try:
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f ,delimiter=';')
-            writer.writerows(csv_data)
+        saved = {}
+        if output_format in ("npy", "both"):
+            saved["npy"] = columnar.save_table("synergia_cenario_output.npy", table, "scenario", metadata=scenario)
+            saved_files.append(saved["npy"])
+
+        if output_format in ("csv", "both"):
+            filename = "synergia_cenario_output.csv"
+            with open(filename, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f ,delimiter=';')
+                writer.writerows(columnar.scenario_csv_rows(table))
+            saved["csv_path"] = filename
+            saved_files.append(filename)
+
+        # Tracked output: a later tweak of the combat parameters recomputes it (rule_versions)
+        spec = dict(scenario, max_dice=max_dice, seed=SWEEP_SEED, n_simulations=N_SIMULATIONS_SCENARIO,
+                    method="planned")
+        rule_versions.record_output("scenario", spec, **saved)
 
         console.print(Panel(
             f"[bold green]Sucesso![/bold green]\n"
             f"O cenário foi processado e os resultados foram salvos em:\n"
-            f"[bold cyan]{filename}[/bold cyan]",
+            f"[bold cyan]{', '.join(saved_files)}[/bold cyan]",
             title="[bold]Exportação Concluída[/bold]",
             padding=(1, 2)
         ))
@@ -457,7 +502,7 @@ def run_cenario_mode(console):
     except Exception as e:
         console.print(Panel(
             f"[bold red]Erro ao Salvar o Arquivo![/bold red]\n"
-            f"Não foi possível salvar o .csv. Detalhes do erro:\n"
+            f"Não foi possível salvar os resultados. Detalhes do erro:\n"
             f"[italic]{e}[/italic]",
             title="[bold]Falha na Exportação[/bold]",
             padding=(1, 2)
@@ -468,9 +513,158 @@ def run_cenario_mode(console):
     return  # Retorna ao menu main
 
 
+def run_doe_mode(console):
+    """
+    Samples the whole parameter space (dice, die type, advantage, vicious, bonus,
+    crit rule, for every armor) with a space-filling design, fits a per-armor
+    polynomial surrogate of expected damage and reports its held-out error.
+    """
+
+    console.print(Panel(
+        f"Design of Experiments Mode\n"
+        f"Instead of a full grid, a Latin hypercube or Sobol design samples every rule parameter at once "
+        f"and a polynomial surrogate of the average damage is fitted for each armor.\n"
+        f"Type '[bold red]{EXIT_KEYWORD}[/bold red]' or '[bold red]stop[/bold red]' at any time to return to main menu.",
+        title="[bold]DOE Mode[/bold]",
+        padding=(1, 2),
+        border_style="yellow"
+    ))
+
+    design = get_validated_input(console, "Design: Latin hypercube (lhs) or Sobol (sobol)?", list(doe.DESIGNS))
+    if design == EXIT_KEYWORD: return
+
+    n_points = get_int_input(console, "How many design points (e.g., 256)?", 32, 100000)
+    if n_points == EXIT_KEYWORD: return
+
+    max_dice = get_max_dice_input(console)
+    if max_dice == EXIT_KEYWORD: return
+
+    max_bonus = get_int_input(console, "What is the MAXIMUM fixed damage bonus (e.g., 10)?", 0, 100)
+    if max_bonus == EXIT_KEYWORD: return
+
+    degree = get_int_input(console, f"Surrogate polynomial degree (e.g., {doe.DEFAULT_DEGREE})?", 1, 6)
+    if degree == EXIT_KEYWORD: return
+
+    method = get_validated_input(console, "Evaluate points exactly (e) or by Monte Carlo (m)?", ['e', 'm'])
+    if method == EXIT_KEYWORD: return
+    evaluate = doe.exact_evaluator if method == 'e' else doe.monte_carlo_evaluator(N_SIMULATIONS_DOE)
+
+    n_holdout = max(32, math.ceil(n_points * doe.HOLDOUT_FRACTION))
+    progress_bar = Progress(
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        "[progress.percentage]{task.percentage:>3.0f}%",
+        TimeRemainingColumn(),
+        console=console
+    )
+    try:
+        with progress_bar as progress:
+            task = progress.add_task("[green]Evaluating design...", total=n_points + n_holdout)
+            result = doe.run_doe(max_dice, max_bonus, n_points, design=design, degree=degree, n_holdout=n_holdout,
+                                 evaluate=evaluate, on_point=lambda: progress.update(task, advance=1))
+    except ValueError as e:
+        console.print(f"[prompt.invalid]{e}")
+        return
+
+    error_text = Text()
+    error_text.append(f"Held-out points: {n_holdout} per armor\n\n", style="default")
+    for armor, errors in result["errors"].items():
+        label = "All armors" if armor == 'all' else f"Armor {armor.upper()}"
+        error_text.append(f"{label:<11} ", style="bold")
+        error_text.append(f"RMSE {errors['rmse']:.3f} | Max {errors['max_abs_error']:.3f} | "
+                          f"Mean rel. {errors['mean_rel_error'] * 100:.2f}% | R² {errors['r2']:.4f}\n")
+    console.print(Panel(error_text, title="[bold green]Surrogate Error[/bold green]", border_style="green",
+                        padding=(1, 2)))
+
+    report = {
+        "design": design,
+        "n_points": n_points,
+        "max_dice": max_dice,
+        "max_bonus": max_bonus,
+        "evaluation": "exact" if method == 'e' else f"monte_carlo ({N_SIMULATIONS_DOE} simulations)",
+        "surrogate": result["surrogate"].to_dict(),
+        "errors": result["errors"],
+        "holdout": result["holdout"],
+    }
+    try:
+        with open(DOE_FILENAME, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        console.print(f"[bold green]Surrogate and held-out errors saved to[/bold green] [bold cyan]{DOE_FILENAME}[/bold cyan]")
+    except OSError as e:
+        console.print(f"[bold red]Could not save '{DOE_FILENAME}':[/bold red] [italic]{e}[/italic]")
+
+    console.print(f"\n--- Retornando ao Menu Principal ---", justify="center")
+
+
+def run_sensitivity_mode(console):
+    """
+    Steps every attack input and combat rule parameter around one configuration
+    and ranks them by how much they move expected damage, miss rate and attacks to kill.
+    """
+
+    console.print(Panel(
+        f"Sensitivity Mode\n"
+        f"Each input of the attack and each combat rule parameter is moved one step down and up; "
+        f"the factors are ranked by their swing (with their elasticity e, if numeric).\n"
+        f"Type '[bold red]{EXIT_KEYWORD}[/bold red]' or '[bold red]stop[/bold red]' at any time to return to main menu.",
+        title="[bold]Sensitivity Mode[/bold]",
+        padding=(1, 2),
+        border_style="yellow"
+    ))
+
+    num_dice, die_sides = None, None
+    while num_dice is None:
+        roll_str = console.input("\n[bold cyan]Enter base roll (e.g., 4d8):[/] ").strip()
+        num_dice, die_sides = parse_roll_input(console, roll_str)
+        if num_dice == EXIT_KEYWORD: return
+        if num_dice is None:
+            console.print("[prompt.invalid]Invalid format. Use 'XdY'.")
+
+    adv_state = get_adv_state(console)
+    if adv_state == EXIT_KEYWORD: return
+
+    is_vicious = get_yes_no_input(console, "Is the attack 'Vicious'?")
+    if is_vicious == EXIT_KEYWORD: return
+
+    bonus = get_bonus_input(console)
+    if bonus == EXIT_KEYWORD: return
+
+    armor_type = get_validated_input(console, "What is the target's armor (s, m, p, b)?", ['s', 'm', 'p', 'b'])
+    if armor_type == EXIT_KEYWORD: return
+
+    crit_rule = get_validated_input(console, "What is the crit rule (e - epic, t - tactical)?", ['e', 't'])
+    if crit_rule == EXIT_KEYWORD: return
+
+    target_hp = get_int_input(console, f"Target HP for attacks to kill (e.g., {sensitivity.DEFAULT_TARGET_HP})?", 1, 10000)
+    if target_hp == EXIT_KEYWORD: return
+
+    report = sensitivity.combat_sensitivity(num_dice, die_sides, adv_state, is_vicious, bonus, armor_type, crit_rule,
+                                            target_hp=target_hp)
+
+    for output, rows in report["tornado"].items():
+        tornado_text = Text()
+        for row in rows:
+            tornado_text.append(f"{row['factor']:<37}", style="bold")
+            tornado_text.append(f"{row['low']!s:>5} -> {row['high']!s:<5}{row['swing']:+9.3f}")
+            if row["elasticity"] is not None:
+                tornado_text.append(f"  e={row['elasticity']:+.2f}", style="cyan")
+            tornado_text.append("\n")
+        console.print(Panel(tornado_text, title=f"[bold green]{output} = {report['metrics'][output]:.4f}[/bold green]",
+                            border_style="green", padding=(1, 2)))
+
+    try:
+        with open(TORNADO_FILENAME, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(sensitivity.tornado_csv_rows(report))
+        console.print(f"[bold green]Tornado tables saved to[/bold green] [bold cyan]{TORNADO_FILENAME}[/bold cyan]")
+    except OSError as e:
+        console.print(f"[bold red]Could not save '{TORNADO_FILENAME}':[/bold red] [italic]{e}[/italic]")
+
+    console.print(f"\n--- Retornando ao Menu Principal ---", justify="center")
+
+
 # --- FUNÇÃO PRINCIPAL (O MENU) ---
 
-def main():
+def main(resume=False, journal_path=JOURNAL_FILENAME, output_format="csv"):
     """Roda o loop principal do menu (Avulso vs. Cenário)."""
     console = Console()
 
@@ -486,8 +680,9 @@ def main():
         console.print("\n[bold]--- Menu Principal ---[/bold]")
         choice = Prompt.ask(
             "O que você deseja fazer?\n\n"
-            "[bold](A)[/bold]vulsos | [bold](C)[/bold]enário | [bold](S)[/bold]air",
-            choices=["a", "c", "s"],
+            "[bold](A)[/bold]vulsos | [bold](C)[/bold]enário | [bold](D)[/bold]OE | [bold](T)[/bold]ornado | "
+            "[bold](S)[/bold]air",
+            choices=["a", "c", "d", "t", "s"],
             show_choices=False  # Adicionado para não poluir a tela
         )
 
@@ -495,7 +690,13 @@ def main():
             run_avulso_mode(console)
 
         elif choice == 'c':
-            run_cenario_mode(console)
+            run_cenario_mode(console, resume=resume, journal_path=journal_path, output_format=output_format)
+
+        elif choice == 'd':
+            run_doe_mode(console)
+
+        elif choice == 't':
+            run_sensitivity_mode(console)
 
         elif choice == 's':
             console.print("\n[bold blue]Obrigado por usar o Analisador Synergia! Até mais.[/bold blue]")
@@ -504,4 +705,12 @@ def main():
 
 # --- Ponto de Entrada do Script ---
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Analisador de Rolagens Synergia")
+    parser.add_argument("--resume", action="store_true",
+                        help="Scenario mode: skip cells already in the journal (same scenario and seed).")
+    parser.add_argument("--journal", default=JOURNAL_FILENAME,
+                        help=f"Journal of finished scenario cells (default: {JOURNAL_FILENAME}).")
+    parser.add_argument("--format", choices=["csv", "npy", "both"], default="csv",
+                        help="Scenario mode output: CSV, columnar .npy (+ .schema.json sidecar) or both.")
+    args = parser.parse_args()
+    main(resume=args.resume, journal_path=args.journal, output_format=args.format)
\ No newline at end of file
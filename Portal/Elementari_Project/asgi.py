@@ -2,6 +2,11 @@
 ASGI config for Elementari_Project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django; WebSocket connections go to the live dice rooms
+(core.dice_rooms). runserver only speaks HTTP, so run it from Portal/ on an
+ASGI server (uvicorn[standard] from requirements.txt brings WebSocket support):
+
+    uvicorn Elementari_Project.asgi:application --port 8000
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
@@ -13,4 +18,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Elementari_Project.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from core.dice_rooms import dice_room_app  # noqa: E402  (needs the apps loaded above)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        await dice_room_app(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -10,11 +10,17 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Repository root, so the portal imports the shared engine as 'Game_Design.libs...'
+REPO_DIR = BASE_DIR.parent
+if str(REPO_DIR) not in sys.path:
+    sys.path.append(str(REPO_DIR))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/3.2/howto/deployment/checklist/
@@ -37,10 +43,13 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'core',
 ]
 
 MIDDLEWARE = [
+    'core.telemetry.TelemetryMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StaticAssetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -51,18 +60,27 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'Elementari_Project.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    # Parse each template once per process instead of on every request
+    TEMPLATE_LOADERS = [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.telemetry.TimedDjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.rules_version',
             ],
+            'loaders': TEMPLATE_LOADERS,
         },
     },
 ]
@@ -77,9 +95,41 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Job workers and web requests share this file: wait for locks instead of failing
+        'OPTIONS': {'timeout': 20},
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'core.telemetry.InstrumentedLocMemCache',
+        'LOCATION': 'synergia-portal',
     }
 }
 
+# Pages and fragments are keyed by the rules fingerprint, so editing
+# synergia_rules.py invalidates every cached rules page at once.
+from Game_Design.libs.synergia_rules import rules_fingerprint  # noqa: E402
+
+RULES_VERSION = rules_fingerprint()
+PAGE_CACHE_SECONDS = 60 * 15
+FRAGMENT_CACHE_SECONDS = 60 * 60 * 24
+
+# Request/engine telemetry (core.telemetry), scraped from /metrics by local addresses only
+TELEMETRY_ENABLED = True
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Rules-engine sidecar (python -m Game_Design.libs.engine_server --socket <path>); None runs the engine in-process
+ENGINE_SOCKET = None
+ENGINE_TIMEOUT = 10.0  # Seconds before a sidecar request counts as failed (then it runs in-process)
+
+# Append-only binary log of every dice-room roll (Game_Design.libs.roll_audit); None disables it
+ROLL_AUDIT_LOG = BASE_DIR / 'roll_audit.log'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -119,6 +169,12 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# 'manage.py collectstatic' writes content-hashed files plus .gz/.br variants here,
+# served with far-future cache headers by core.middleware.StaticAssetMiddleware
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
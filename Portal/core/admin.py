@@ -1,3 +1,23 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import Power, PowerBuild, SimulationJob
+
+
+@admin.register(PowerBuild)
+class PowerBuildAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'total_pc_cost', 'avg_damage', 'expected_damage_m')
+    list_filter = ('die_type',)
+
+
+@admin.register(Power)
+class PowerAdmin(admin.ModelAdmin):
+    list_display = ('name', 'build', 'created_at')
+    search_fields = ('name',)
+    raw_id_fields = ('build',)
+
+
+@admin.register(SimulationJob)
+class SimulationJobAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'status', 'progress', 'worker', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    exclude = ('result_csv',)
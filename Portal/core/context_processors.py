@@ -0,0 +1,9 @@
+from django.conf import settings
+
+
+def rules_version(request):
+    """Exposes the rules fingerprint used to key the cached template fragments."""
+    return {
+        'rules_version': settings.RULES_VERSION,
+        'fragment_cache_seconds': settings.FRAGMENT_CACHE_SECONDS,
+    }
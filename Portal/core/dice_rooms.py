@@ -0,0 +1,220 @@
+"""
+Live dice rooms over WebSockets (plain ASGI, served by uvicorn: see Elementari_Project/asgi.py).
+
+Every connection is one asyncio task on the server's event loop instead of a
+WSGI thread per player. Players send rolls in the action_runner syntax; the
+server resolves them with DiceEngine / CombatMechanics and broadcasts the
+result to everyone in the room through an in-process channel layer.
+
+    ws://<host>/ws/rooms/<room>/?name=<player>
+    -> {"action": "roll", "expression": "2#4d6dl1+1"}
+    -> {"action": "attack", "expression": "3d8+2", "adv_state": 1, "is_vicious": false,
+        "armor_type": "p", "crit_rule": "t"}
+    <- {"type": "history", "events": [...]}, then one {"type": "roll" | "attack" | "join" | "leave", ...}
+       per room event, or {"type": "error", "error": ...} for the sender only
+
+Each room rolls from its own seeded roll_audit.RollStream; with
+settings.ROLL_AUDIT_LOG set, every roll is appended to that audit log and
+room events carry {"audit": {"session", "position"}} to look them up.
+
+The layer mirrors the Channels API (new_channel / send / receive / group_add /
+group_discard / group_send) so a shared backend can replace it when the portal
+runs on more than one process.
+"""
+import asyncio
+import json
+import re
+import time
+from collections import deque
+from urllib.parse import parse_qs
+
+from django.conf import settings
+
+from Game_Design.libs.roll_audit import AuditLog, RollStream, using_stream
+from Game_Design.libs.synergia_rules import CombatMechanics
+from Game_Design.simulations.action_runner import read_action, run_action
+
+ROOM_PATH = re.compile(r"^/ws/rooms/(?P<room>[\w-]{1,50})/$")
+ROOM_HISTORY = 50  # Events replayed to a player joining the room
+CHANNEL_CAPACITY = 100  # Pending messages per connection before the oldest are dropped
+MAX_REPEAT = 20
+MAX_DICE = 100
+MAX_SIDES = 1000
+MAX_PLAYER_NAME = 30
+
+
+class InMemoryChannelLayer:
+    """
+    Single-process channel layer: one bounded asyncio.Queue per connection and
+    a bounded history per group. group_send never awaits a slow reader: a full
+    queue drops its oldest message, so one stalled player cannot hold up the room.
+    Only for use from one event loop (no locking).
+    """
+
+    def __init__(self, capacity=CHANNEL_CAPACITY, history=ROOM_HISTORY):
+        self.capacity = capacity
+        self.history_size = history
+        self.channels = {}
+        self.groups = {}
+        self.histories = {}
+        self._counter = 0
+
+    def new_channel(self):
+        self._counter += 1
+        name = f"local.{self._counter}"
+        self.channels[name] = asyncio.Queue(maxsize=self.capacity)
+        return name
+
+    async def send(self, channel, message):
+        queue = self.channels.get(channel)
+        if queue is None:
+            return  # Channel already closed
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    async def receive(self, channel):
+        return await self.channels[channel].get()
+
+    async def group_add(self, group, channel):
+        self.groups.setdefault(group, set()).add(channel)
+
+    async def group_discard(self, group, channel):
+        members = self.groups.get(group)
+        if members is not None:
+            members.discard(channel)
+            if not members:
+                # Empty rooms are forgotten: memory stays bounded by the live rooms
+                del self.groups[group]
+                self.histories.pop(group, None)
+
+    async def group_send(self, group, message):
+        if group not in self.groups:
+            return  # Nobody left in the room
+        self.histories.setdefault(group, deque(maxlen=self.history_size)).append(message)
+        for channel in self.groups.get(group, ()):
+            await self.send(channel, message)
+
+    def history(self, group):
+        return list(self.histories.get(group, ()))
+
+    def close_channel(self, channel):
+        self.channels.pop(channel, None)
+
+
+channel_layer = InMemoryChannelLayer()
+room_streams = {}  # group -> RollStream of the live rooms
+_audit_log = []
+
+
+def audit_log():
+    """The process-wide AuditLog (opened on first use), or None when settings.ROLL_AUDIT_LOG is unset."""
+    if not _audit_log:
+        path = getattr(settings, 'ROLL_AUDIT_LOG', None)
+        _audit_log.append(AuditLog(path) if path else None)
+    return _audit_log[0]
+
+
+# --- Roll resolution ---
+
+def resolve_message(message):
+    """Resolves one player message into a room event. Raises ValueError for bad input."""
+    if not isinstance(message, dict):
+        raise ValueError("Messages must be JSON objects.")
+    action = message.get('action')
+    expression = str(message.get('expression', ''))
+    R, X, Y, drop, Z, W, addition = read_action(expression)
+    if R > MAX_REPEAT or X > MAX_DICE or Y > MAX_SIDES:
+        raise ValueError(f"At most {MAX_REPEAT} repetitions of {MAX_DICE} dice with {MAX_SIDES} sides.")
+
+    if action == 'roll':
+        return {'type': 'roll', 'expression': expression, 'results': run_action(expression)}
+
+    if action == 'attack':
+        if R != 1 or drop is not None or Z is not None:
+            raise ValueError("Attacks take a plain XdY+W expression (crits explode by the rules).")
+        armor_type = message.get('armor_type', 's')
+        crit_rule = message.get('crit_rule', 't')
+        if armor_type not in CombatMechanics.ARMOR_TIERS or crit_rule not in ('e', 't'):
+            raise ValueError("armor_type must be s, m, p or b and crit_rule e or t.")
+        adv_state = int(message.get('adv_state', 0))
+        if not -3 <= adv_state <= 3:
+            raise ValueError("adv_state must be between -3 and 3.")
+        is_vicious = message.get('is_vicious', False)
+        if not isinstance(is_vicious, bool):
+            raise ValueError("is_vicious must be true or false.")
+        result = CombatMechanics.resolve_attack(
+            X, Y, adv_state, is_vicious, W if addition else -W, armor_type, crit_rule
+        )
+        return {'type': 'attack', 'expression': expression, 'armor_type': armor_type, 'crit_rule': crit_rule,
+                'adv_state': adv_state, 'result': result}
+
+    raise ValueError("action must be 'roll' or 'attack'.")
+
+
+# --- ASGI WebSocket application ---
+
+async def broadcast(group, event):
+    """Serializes a room event once and fans it out to the whole room."""
+    event['time'] = time.time()
+    await channel_layer.group_send(group, {'type': 'room.event', 'text': json.dumps(event)})
+
+
+async def dice_room_app(scope, receive, send):
+    match = ROOM_PATH.match(scope['path'])
+    if match is None:
+        await receive()  # websocket.connect
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+
+    group = f"room.{match['room']}"
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    player = (query.get('name', ['Anonymous'])[0].strip() or 'Anonymous')[:MAX_PLAYER_NAME]
+
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    await send({'type': 'websocket.accept'})
+
+    channel = channel_layer.new_channel()
+    history = ','.join(message['text'] for message in channel_layer.history(group))
+    await send({'type': 'websocket.send', 'text': f'{{"type": "history", "events": [{history}]}}'})
+    await channel_layer.group_add(group, channel)
+    if group not in room_streams:
+        room_streams[group] = RollStream(log=audit_log(), name=group)
+    stream = room_streams[group]
+    await broadcast(group, {'type': 'join', 'player': player})
+
+    async def from_player():
+        while True:
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                return
+            try:
+                message = json.loads(event.get('text') or '{}')
+                position = stream.position
+                with using_stream(stream):
+                    room_event = resolve_message(message)
+            except (TypeError, ValueError) as e:  # json.JSONDecodeError is a ValueError
+                await channel_layer.send(channel, {'type': 'room.event',
+                                                   'text': json.dumps({'type': 'error', 'error': str(e)})})
+                continue
+            room_event['player'] = player
+            room_event['audit'] = {'session': str(stream.session_id), 'position': position}
+            await broadcast(group, room_event)
+
+    async def to_player():
+        while True:
+            message = await channel_layer.receive(channel)
+            await send({'type': 'websocket.send', 'text': message['text']})
+
+    tasks = [asyncio.ensure_future(from_player()), asyncio.ensure_future(to_player())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await channel_layer.group_discard(group, channel)
+        channel_layer.close_channel(channel)
+        if group not in channel_layer.groups:
+            room_streams.pop(group, None)  # A room that empties starts a new session next time
+        await broadcast(group, {'type': 'leave', 'player': player})
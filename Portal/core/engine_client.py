@@ -0,0 +1,108 @@
+"""
+Client of the rules-engine sidecar (Game_Design.libs.engine_server).
+
+With settings.ENGINE_SOCKET set, views send their analyses to the sidecar,
+which batches concurrent requests from every worker on one warm engine.
+Each thread keeps one connection. Without a socket, or while the sidecar is
+down or runs other rules (a different rules fingerprint), the same
+operations run in-process, so the portal works without it.
+"""
+import itertools
+import json
+import logging
+import socket
+import threading
+import time
+
+from django.conf import settings
+
+from Game_Design.libs.engine_server import run_operation
+
+logger = logging.getLogger(__name__)
+
+RETRY_SECONDS = 5.0  # After a failure, run in-process for this long before reconnecting
+
+
+class EngineUnavailable(Exception):
+    pass
+
+
+class EngineConnection:
+    """Blocking newline-delimited JSON connection to the sidecar."""
+
+    def __init__(self, path, timeout):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.file = self.sock.makefile('rb')
+        self.ids = itertools.count(1)
+
+    def request(self, op, args):
+        request_id = next(self.ids)
+        self.sock.sendall(json.dumps({'id': request_id, 'op': op, 'args': args}).encode('utf-8') + b"\n")
+        line = self.file.readline()
+        if not line:
+            raise EngineUnavailable("The engine closed the connection.")
+        response = json.loads(line)
+        if response.get('id') != request_id:
+            raise EngineUnavailable(f"Response to request {response.get('id')} instead of {request_id}.")
+        return response
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+_local = threading.local()
+
+
+def _connection():
+    """This thread's sidecar connection, or None when it should run in-process for now."""
+    connection = getattr(_local, 'connection', None)
+    if connection is not None:
+        return connection
+    if time.monotonic() < getattr(_local, 'retry_at', 0.0):
+        return None
+
+    connection = EngineConnection(settings.ENGINE_SOCKET, settings.ENGINE_TIMEOUT)
+    rules_version = connection.request('hello', {}).get('result', {}).get('rules_version')
+    if rules_version != settings.RULES_VERSION:
+        connection.close()
+        raise EngineUnavailable(f"The engine runs rules {rules_version}, the portal {settings.RULES_VERSION}.")
+    _local.connection = connection
+    return connection
+
+
+def _disconnect(error):
+    connection = getattr(_local, 'connection', None)
+    if connection is not None:
+        connection.close()
+    _local.connection = None
+    _local.retry_at = time.monotonic() + RETRY_SECONDS
+    logger.warning("Engine sidecar unavailable (%s); running in-process for %.0fs.", error, RETRY_SECONDS)
+
+
+def call(op, **args):
+    """
+    Result of an engine operation (see engine_server.OPERATIONS), from the
+    sidecar when one is configured and reachable, else computed in-process.
+    Raises ValueError for invalid arguments.
+    """
+    response = None
+    if settings.ENGINE_SOCKET:
+        try:
+            connection = _connection()
+            if connection is not None:
+                response = connection.request(op, args)
+        except (OSError, ValueError, EngineUnavailable) as e:
+            _disconnect(e)
+    if response is None:
+        response = run_operation(op, args)
+
+    if 'error' in response:
+        raise ValueError(response['error'])
+    return response['result']
@@ -0,0 +1,192 @@
+"""
+Background simulation jobs stored in the portal database (no Redis/Celery).
+
+Views call submit_job(); 'manage.py run_job_workers' processes run worker_loop(),
+claiming queued rows with a conditional UPDATE so two workers never take the same job.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import socket
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from Game_Design.balance.balancete_magico import iter_valid_builds
+from Game_Design.libs import planner, sweeps
+from Game_Design.libs.engine_server import MAX_ADVANTAGE, MAX_ATTACK_BONUS
+
+from .models import SimulationJob
+
+ARMOR_TYPES = ['s', 'm', 'p', 'b']
+CRIT_RULES = ['e', 't']
+MAX_SCENARIO_DICE = 50
+MAX_SEED = 2 ** 63 - 1
+
+
+# --- Config normalization (also what makes identical jobs hash the same) ---
+
+def normalize_scenario_config(config):
+    if not isinstance(config, dict):
+        raise ValueError("config must be an object.")
+    normalized = {
+        'max_dice': int(config.get('max_dice', 10)),
+        'adv_state': int(config.get('adv_state', 0)),
+        'is_vicious': str(config.get('is_vicious', False)).lower() in ('1', 'true', 's', 'on'),
+        'bonus_damage': int(config.get('bonus_damage', 0)),
+        'armor_type': str(config.get('armor_type', 's')),
+        'crit_rule': str(config.get('crit_rule', 'e')),
+        'n_simulations': int(config.get('n_simulations', sweeps.N_SIMULATIONS_SCENARIO)),
+        'seed': int(config.get('seed', sweeps.SWEEP_SEED)),
+        # Cells come from the planner (as in the simulator): at least as precise as n_simulations samples
+        'method': 'planned',
+    }
+    if not 1 <= normalized['max_dice'] <= MAX_SCENARIO_DICE:
+        raise ValueError(f"max_dice must be between 1 and {MAX_SCENARIO_DICE}.")
+    # Kernels inline one die per advantage step and distributions span the bonus: same limits as the API
+    if not -MAX_ADVANTAGE <= normalized['adv_state'] <= MAX_ADVANTAGE:
+        raise ValueError(f"adv_state must be between -{MAX_ADVANTAGE} and {MAX_ADVANTAGE}.")
+    if not 0 <= normalized['bonus_damage'] <= MAX_ATTACK_BONUS:
+        raise ValueError(f"bonus_damage must be between 0 and {MAX_ATTACK_BONUS}.")
+    if not 0 <= normalized['seed'] <= MAX_SEED:
+        raise ValueError(f"seed must be between 0 and {MAX_SEED}.")
+    if normalized['armor_type'] not in ARMOR_TYPES:
+        raise ValueError(f"armor_type must be one of {ARMOR_TYPES}.")
+    if normalized['crit_rule'] not in CRIT_RULES:
+        raise ValueError(f"crit_rule must be one of {CRIT_RULES}.")
+    if not 1 <= normalized['n_simulations'] <= 1000000:
+        raise ValueError("n_simulations must be between 1 and 1,000,000.")
+    return normalized
+
+
+def normalize_builds_config(config):
+    return {}  # validate_all_builds has no parameters (its limits are module constants)
+
+
+# --- Job runners: config -> CSV text ---
+
+def run_scenario_job(config, on_progress):
+    total_cells = config['max_dice'] * len(sweeps.DICE_TYPES)
+    done = [0]
+
+    def on_cell():
+        done[0] += 1
+        on_progress(done[0] / total_cells)
+
+    csv_data = sweeps.scenario_grid(
+        config['max_dice'], config['adv_state'], config['is_vicious'], config['bonus_damage'],
+        config['armor_type'], config['crit_rule'], average_fn=planner.average_damage, on_cell=on_cell,
+        seed=config['seed'], n_simulations=config['n_simulations']
+    )
+    output = io.StringIO()
+    csv.writer(output, delimiter=';').writerows(csv_data)  # Same format as run_cenario_mode
+    return output.getvalue()
+
+
+def run_builds_job(config, on_progress):
+    output = io.StringIO()
+    writer = None
+    for build in iter_valid_builds():
+        if writer is None:
+            writer = csv.DictWriter(output, fieldnames=build.keys())
+            writer.writeheader()
+        writer.writerow(build)
+    return output.getvalue()
+
+
+JOB_KINDS = {
+    'scenario': (normalize_scenario_config, run_scenario_job),
+    'builds': (normalize_builds_config, run_builds_job),
+}
+
+
+# --- Queue operations ---
+
+def config_hash(kind, config):
+    # The rules version is part of the key: after a rules change the same config is a new job
+    payload = json.dumps({'kind': kind, 'config': config, 'rules_version': settings.RULES_VERSION}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def submit_job(kind, config):
+    """
+    Queues a job, or returns the existing one for an identical configuration.
+    Failed jobs are re-queued on resubmission. Returns (job, created).
+    Raises ValueError for an unknown kind or an invalid configuration.
+    """
+    if kind not in JOB_KINDS:
+        raise ValueError(f"kind must be one of {list(JOB_KINDS)}.")
+    normalize, _ = JOB_KINDS[kind]
+    config = normalize(config)
+
+    with transaction.atomic():
+        job, created = SimulationJob.objects.get_or_create(
+            config_hash=config_hash(kind, config),
+            defaults={'kind': kind, 'config': config},
+        )
+        if not created and job.status == SimulationJob.FAILED:
+            job.status = SimulationJob.QUEUED
+            job.error = ''
+            job.progress = 0
+            job.save(update_fields=['status', 'error', 'progress'])
+    return job, created
+
+
+def claim_next_job(worker_name):
+    """Atomically moves the oldest queued job to RUNNING for this worker."""
+    candidates = (SimulationJob.objects.filter(status=SimulationJob.QUEUED)
+                  .order_by('created_at').values_list('pk', flat=True)[:10])
+    for pk in candidates:
+        claimed = SimulationJob.objects.filter(pk=pk, status=SimulationJob.QUEUED).update(
+            status=SimulationJob.RUNNING, worker=worker_name, started_at=timezone.now()
+        )
+        if claimed:
+            return SimulationJob.objects.get(pk=pk)
+    return None
+
+
+def run_job(job):
+    _, runner = JOB_KINDS[job.kind]
+    last_update = [0.0]
+
+    def on_progress(fraction):
+        # Throttled: progress is only for polling, not worth a write per cell
+        now = time.monotonic()
+        if now - last_update[0] >= 1.0:
+            last_update[0] = now
+            SimulationJob.objects.filter(pk=job.pk).update(progress=fraction)
+
+    try:
+        result = runner(job.config, on_progress)
+    except Exception as e:
+        SimulationJob.objects.filter(pk=job.pk).update(
+            status=SimulationJob.FAILED, error=f"{type(e).__name__}: {e}", finished_at=timezone.now()
+        )
+    else:
+        SimulationJob.objects.filter(pk=job.pk).update(
+            status=SimulationJob.DONE, result_csv=result, progress=1, finished_at=timezone.now()
+        )
+
+
+def requeue_stale_jobs():
+    """Puts RUNNING jobs back in the queue (their worker died). Only safe when no worker is alive."""
+    return SimulationJob.objects.filter(status=SimulationJob.RUNNING).update(
+        status=SimulationJob.QUEUED, worker='', started_at=None, progress=0
+    )
+
+
+def worker_loop(poll_interval=2.0, once=False):
+    """Claims and runs jobs until interrupted (or until the queue is empty if 'once')."""
+    worker_name = f"{socket.gethostname()}:{os.getpid()}"
+    while True:
+        job = claim_next_job(worker_name)
+        if job is not None:
+            run_job(job)
+        elif once:
+            return
+        else:
+            time.sleep(poll_interval)
@@ -0,0 +1,39 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.power_tables import ASSET_PATH, build_tables, read_asset, tables_fingerprint
+
+
+class Command(BaseCommand):
+    help = ("Exports the PowerEconomy cost components and an expected damage table to a minified static JSON "
+            "asset, so the power creator previews builds in the browser without calling the server.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('-o', '--output', default=str(ASSET_PATH))
+        parser.add_argument('--check', action='store_true',
+                            help="Write nothing; fail if the asset differs from what the current rules produce (CI).")
+
+    def handle(self, *args, **options):
+        tables = build_tables()
+        output = Path(options['output'])
+
+        if options['check']:
+            try:
+                asset = read_asset(output)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {output}: {e}")
+            asset_version = tables_fingerprint(asset)  # Of its contents, not the version it claims
+            if asset_version != tables['tables_version']:
+                raise CommandError(f"{output} is outdated (tables {asset_version}, rules produce "
+                                   f"{tables['tables_version']}): run manage.py export_power_tables.")
+            self.stdout.write(self.style.SUCCESS(f"{output} is up to date (tables {tables['tables_version']})."))
+            return
+
+        output.parent.mkdir(parents=True, exist_ok=True)
+        payload = json.dumps(tables, separators=(',', ':'))
+        output.write_text(payload, encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {output} ({len(payload):,} bytes, {len(tables['damage']['values']):,} damage values, "
+            f"tables {tables['tables_version']}, rules {tables['rules_version']})."))
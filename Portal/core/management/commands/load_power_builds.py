@@ -0,0 +1,79 @@
+import csv
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Game_Design.balance.balancete_magico import iter_valid_builds
+from Game_Design.libs.synergia_rules import CombatMechanics
+
+from core.models import PowerBuild
+
+
+class Command(BaseCommand):
+    help = "Replaces the PowerBuild catalog with the output of validate_all_builds, using batched bulk_create."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--csv', dest='csv_path',
+                            help="Load an existing power_builds_validation.csv instead of recomputing the builds.")
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        if options['csv_path']:
+            csv_file = open(options['csv_path'], newline='', encoding='utf-8')
+            rows = csv.DictReader(csv_file)
+        else:
+            csv_file = None
+            rows = iter_valid_builds()
+
+        # Expected damage only depends on the dice and the armor, not on range/area
+        expected_cache = {}
+        builds = (self.build_from_row(row, expected_cache) for row in rows)
+
+        total = 0
+        try:
+            with transaction.atomic():
+                PowerBuild.objects.all().delete()
+                while True:
+                    batch = list(islice(builds, batch_size))
+                    if not batch:
+                        break
+                    PowerBuild.objects.bulk_create(batch, batch_size=batch_size)
+                    total += len(batch)
+        finally:
+            if csv_file is not None:
+                csv_file.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Loaded {total:,} power builds."))
+
+    @staticmethod
+    def build_from_row(row, expected_cache):
+        num_dice, die_type = (int(v) for v in row["Damage_Description"].split('d'))
+
+        key = (num_dice, die_type)
+        if key not in expected_cache:
+            expected_cache[key] = {
+                armor: CombatMechanics.expected_damage(
+                    num_dice, die_type, 0, False, 0, armor, PowerBuild.EXPECTED_DAMAGE_CRIT_RULE
+                )
+                for armor in CombatMechanics.ARMOR_TIERS
+            }
+        expected = expected_cache[key]
+
+        return PowerBuild(
+            num_dice=num_dice,
+            die_type=die_type,
+            range_blocks=int(row["Range_Blocks"]),
+            area_blocks=int(row["Area_Blocks"]),
+            damage_cost=float(row["Damage_Cost"]),
+            range_cost=int(row["Range_Cost"]),
+            area_cost=int(row["Area_Cost"]),
+            total_pc_cost=float(row["Total_PC_Cost"]),
+            avg_damage=float(row["Avg_Damage"]),
+            expected_damage_s=expected['s'],
+            expected_damage_m=expected['m'],
+            expected_damage_p=expected['p'],
+            expected_damage_b=expected['b'],
+        )
@@ -0,0 +1,52 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def worker_main(poll_interval, once):
+    # Spawned processes (Windows/macOS) start without Django configured
+    import django
+    django.setup()
+
+    from core.jobs import worker_loop
+    worker_loop(poll_interval=poll_interval, once=once)
+
+
+class Command(BaseCommand):
+    help = "Runs worker processes that execute queued simulation jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=max(1, multiprocessing.cpu_count() - 1))
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds between queue checks when there is nothing to do.")
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty.")
+        parser.add_argument('--requeue-stale', action='store_true',
+                            help="Re-queue jobs left RUNNING by workers that died (no other worker may be alive).")
+
+    def handle(self, *args, **options):
+        if options['requeue_stale']:
+            from core.jobs import requeue_stale_jobs
+            self.stdout.write(f"Re-queued {requeue_stale_jobs()} stale job(s).")
+
+        # Child processes must open their own SQLite connections
+        connections.close_all()
+
+        processes = [
+            multiprocessing.Process(target=worker_main, args=(options['poll_interval'], options['once']),
+                                    name=f"sim-worker-{i}")
+            for i in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(self.style.SUCCESS(f"Started {len(processes)} worker process(es)."))
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
+            self.stdout.write("Workers stopped.")
@@ -0,0 +1,91 @@
+import mimetypes
+import os
+import posixpath
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+
+class StaticAssetMiddleware:
+    """
+    Serves collected static files straight from STATIC_ROOT.
+
+    Picks the precompressed .br/.gz sibling written by
+    CompressedManifestStaticFilesStorage when the client accepts it, and marks
+    content-hashed names as immutable so browsers never ask for them again.
+    """
+
+    IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+    SHORT_CACHE = 'public, max-age=300'
+    ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.static_root = settings.STATIC_ROOT
+        self.static_prefix = settings.STATIC_URL
+        # Hashed names from staticfiles.json (empty until collectstatic has run)
+        self.hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    def __call__(self, request):
+        if self.static_root and request.path.startswith(self.static_prefix):
+            response = self.serve(request, request.path[len(self.static_prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        name = posixpath.normpath(name).lstrip('/')
+        try:
+            path = safe_join(self.static_root, name)
+        except SuspiciousFileOperation:  # Path traversal attempt
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        stat = os.stat(path)
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime, stat.st_size):
+            return HttpResponseNotModified()
+
+        content_type, _ = mimetypes.guess_type(path)
+        accepted = self.accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        served_path, encoding = path, None
+        for candidate, suffix in self.ENCODINGS:
+            if candidate in accepted and os.path.isfile(path + suffix):
+                served_path, encoding = path + suffix, candidate
+                break
+
+        response = FileResponse(open(served_path, 'rb'), content_type=content_type or 'application/octet-stream')
+        del response['Content-Disposition']  # Set from the file name; assets are not downloads
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = self.IMMUTABLE_CACHE if name in self.hashed_names else self.SHORT_CACHE
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    @staticmethod
+    def accepted_encodings(header):
+        """Codings of an Accept-Encoding header with a non-zero q-value ('*' stands for any other coding)."""
+        accepted, refused = set(), set()
+        for item in header.split(','):
+            coding, *params = [part.strip() for part in item.split(';')]
+            if not coding:
+                continue
+            quality = 1.0
+            for param in params:
+                key, _, value = param.partition('=')
+                if key.strip().lower() == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            (accepted if quality > 0 else refused).add(coding.lower())
+        if '*' in accepted:
+            accepted.update(coding for coding, _ in StaticAssetMiddleware.ENCODINGS if coding not in refused)
+        return accepted
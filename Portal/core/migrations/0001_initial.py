@@ -0,0 +1,67 @@
+# Generated by Django 3.2.25 on 2026-10-19 14:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Power',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('description', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PowerBuild',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('num_dice', models.PositiveSmallIntegerField()),
+                ('die_type', models.PositiveSmallIntegerField()),
+                ('range_blocks', models.PositiveSmallIntegerField()),
+                ('area_blocks', models.PositiveSmallIntegerField()),
+                ('damage_cost', models.FloatField()),
+                ('range_cost', models.PositiveSmallIntegerField()),
+                ('area_cost', models.PositiveSmallIntegerField()),
+                ('total_pc_cost', models.FloatField()),
+                ('avg_damage', models.FloatField()),
+                ('expected_damage_s', models.FloatField()),
+                ('expected_damage_m', models.FloatField()),
+                ('expected_damage_p', models.FloatField()),
+                ('expected_damage_b', models.FloatField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='powerbuild',
+            index=models.Index(fields=['total_pc_cost', 'avg_damage'], name='build_cost_damage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='powerbuild',
+            index=models.Index(fields=['die_type', 'total_pc_cost'], name='build_die_cost_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='powerbuild',
+            index=models.Index(fields=['avg_damage', 'total_pc_cost'], name='build_damage_cost_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='powerbuild',
+            constraint=models.UniqueConstraint(fields=('num_dice', 'die_type', 'range_blocks', 'area_blocks'), name='unique_power_build'),
+        ),
+        migrations.AddField(
+            model_name='power',
+            name='build',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='powers', to='core.powerbuild'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-19 16:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_simulationjob'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='powerbuild',
+            name='build_cost_damage_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='powerbuild',
+            name='build_die_cost_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='powerbuild',
+            name='build_damage_cost_idx',
+        ),
+    ]
@@ -1,3 +1,91 @@
 from django.db import models
 
-# Create your models here.
+
+class PowerBuild(models.Model):
+    """
+    One valid (damage, range, area) combination of the power economy,
+    as produced by validate_all_builds. Read-only catalog for the power creator.
+    """
+
+    # Crit rule used for the cached expected damage columns (no Advantage, not Vicious, no bonus)
+    EXPECTED_DAMAGE_CRIT_RULE = 't'
+
+    num_dice = models.PositiveSmallIntegerField()
+    die_type = models.PositiveSmallIntegerField()
+    range_blocks = models.PositiveSmallIntegerField()
+    area_blocks = models.PositiveSmallIntegerField()
+
+    # Cost breakdown (PowerEconomy.calculate_cost)
+    damage_cost = models.FloatField()
+    range_cost = models.PositiveSmallIntegerField()
+    area_cost = models.PositiveSmallIntegerField()
+    total_pc_cost = models.FloatField()
+
+    # Damage: plain dice average plus the exact expectation per armor tier
+    avg_damage = models.FloatField()
+    expected_damage_s = models.FloatField()
+    expected_damage_m = models.FloatField()
+    expected_damage_p = models.FloatField()
+    expected_damage_b = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['num_dice', 'die_type', 'range_blocks', 'area_blocks'], name='unique_power_build'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.num_dice}d{self.die_type} | Range {self.range_blocks} | Area {self.area_blocks}"
+
+
+class Power(models.Model):
+    """A power saved by a player, pointing at the catalog build it was created from."""
+
+    name = models.CharField(max_length=100)
+    description = models.TextField(blank=True)
+    build = models.ForeignKey(PowerBuild, on_delete=models.PROTECT, related_name='powers')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.name} ({self.build})"
+
+
+class SimulationJob(models.Model):
+    """
+    A long sweep queued from the portal and executed by 'manage.py run_job_workers'.
+    Identical submissions share one row through config_hash.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    KIND_CHOICES = [('scenario', 'Scenario grid'), ('builds', 'Build validation')]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    config = models.JSONField()
+    config_hash = models.CharField(max_length=64, unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    progress = models.FloatField(default=0)
+
+    result_csv = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
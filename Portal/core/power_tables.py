@@ -0,0 +1,99 @@
+"""
+Static rule tables for the power creator (written by 'manage.py export_power_tables').
+
+The asset carries a 'tables_version': a hash of the table contents. The page
+compares it with the version the running rules would produce, so only a change
+that alters the tables (a parameter, a cost or damage rule) marks the asset as
+outdated, not any edit of synergia_rules.py.
+"""
+import hashlib
+import json
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+from Game_Design.balance.balancete_magico import DIE_TYPES_Y, MAX_ALCANCE, MAX_AREA, MAX_DICE_X
+from Game_Design.libs.synergia_rules import CombatMechanics, PowerEconomy, parameters_fingerprint, rule_parameters
+
+FORMAT_VERSION = 1
+ASSET_PATH = Path(__file__).resolve().parent / 'static' / 'data' / 'power_tables.json'
+DAMAGE_SCALE = 1000  # Expected damage is stored as integer thousandths
+ADV_STATES = (-1, 0, 1)
+VICIOUS_STATES = (False, True)
+CRIT_RULES = ('e', 't')
+VERSION_FIELDS = ('rules_version', 'tables_version')  # Left out of the contents hash
+
+
+def build_tables():
+    """
+    Cost components are stored per axis (total = damage + range + area, as in
+    PowerEconomy.calculate_cost). Damage values are a flat row-major array over
+    damage['axes'], in order, scaled by DAMAGE_SCALE.
+    """
+    dice = list(range(1, MAX_DICE_X + 1))
+    armors = list(CombatMechanics.ARMOR_TIERS)
+
+    economy = {
+        'max_pc_budget': PowerEconomy.MAX_PC_BUDGET,
+        'max_range': MAX_ALCANCE,
+        'max_area': MAX_AREA,
+        # damage_cost[die_type index][num_dice - 1]
+        'damage_cost': [[PowerEconomy.calculate_cost(x, y, 0, 0)['custo_dano'] for x in dice]
+                        for y in DIE_TYPES_Y],
+        'range_cost': [PowerEconomy.calculate_cost(0, 0, r, 0)['custo_alcance'] for r in range(MAX_ALCANCE + 1)],
+        'area_cost': [PowerEconomy.calculate_cost(0, 0, 0, a)['custo_area'] for a in range(MAX_AREA + 1)],
+        'avg_damage': [[PowerEconomy.estimate_avg_damage(x, y) for x in dice] for y in DIE_TYPES_Y],
+    }
+
+    values = [
+        round(DAMAGE_SCALE * CombatMechanics.expected_damage(x, y, adv, vicious, 0, armor, crit))
+        for crit in CRIT_RULES
+        for adv in ADV_STATES
+        for vicious in VICIOUS_STATES
+        for armor in armors
+        for y in DIE_TYPES_Y
+        for x in dice
+    ]
+    damage = {
+        'axes': [['crit_rule', list(CRIT_RULES)], ['adv_state', list(ADV_STATES)],
+                 ['is_vicious', list(VICIOUS_STATES)], ['armor_type', armors],
+                 ['die_type', list(DIE_TYPES_Y)], ['num_dice', dice]],
+        'bonus_damage': 0,
+        'scale': DAMAGE_SCALE,
+        'values': values,
+    }
+
+    tables = {
+        'format': FORMAT_VERSION,
+        'rules_version': settings.RULES_VERSION,  # Informative: the rules the asset was exported with
+        'parameters': rule_parameters(),
+        'dice': dice,
+        'die_types': list(DIE_TYPES_Y),
+        'economy': economy,
+        'damage': damage,
+    }
+    tables['tables_version'] = tables_fingerprint(tables)
+    return tables
+
+
+def tables_fingerprint(tables):
+    """Short hash of the table contents (parameters and values, not the version fields)."""
+    contents = {key: value for key, value in tables.items() if key not in VERSION_FIELDS}
+    payload = json.dumps(contents, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def expected_tables_version():
+    """tables_version the current rules produce (built once per process and set of parameters)."""
+    return _expected_tables_version(parameters_fingerprint())
+
+
+@lru_cache(maxsize=8)
+def _expected_tables_version(parameters):
+    return build_tables()['tables_version']
+
+
+def read_asset(path=ASSET_PATH):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
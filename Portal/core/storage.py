@@ -0,0 +1,57 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only the .gz variants are emitted
+    brotli = None
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage (content-hashed filenames) that also writes .gz and .br
+    siblings of every hashed text asset at collectstatic time, so the
+    StaticAssetMiddleware never compresses anything per request.
+    """
+
+    COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.json', '.svg', '.txt', '.html', '.map')
+    MIN_SIZE = 256  # Bytes; smaller files do not gain from compression
+    MAX_RATIO = 0.95  # Keep a variant only if it saves at least 5%
+
+    def post_process(self, *args, **kwargs):
+        yield from super().post_process(*args, **kwargs)
+
+        if kwargs.get('dry_run'):
+            return
+
+        for hashed_name in set(self.hashed_files.values()):
+            if not hashed_name.endswith(self.COMPRESSIBLE_EXTENSIONS):
+                continue
+            with self.open(hashed_name) as original:
+                content = original.read()
+            if len(content) < self.MIN_SIZE:
+                continue
+
+            for suffix, compressed in self.compress(content):
+                if len(compressed) > len(content) * self.MAX_RATIO:
+                    continue
+                compressed_name = hashed_name + suffix
+                if self.exists(compressed_name):
+                    self.delete(compressed_name)
+                self._save(compressed_name, ContentFile(compressed))
+                yield hashed_name, compressed_name, True
+
+    def stored_name(self, name):
+        # A missing asset renders its unhashed URL (a broken image) instead of failing the whole page
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    @staticmethod
+    def compress(content):
+        yield '.gz', gzip.compress(content, compresslevel=9, mtime=0)
+        if brotli is not None:
+            yield '.br', brotli.compress(content, quality=11)
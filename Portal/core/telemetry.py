@@ -0,0 +1,307 @@
+"""
+Request telemetry: per-view latency histograms, a per-request time breakdown
+(database, templates, cache, synergia_rules engine) and cache hit/miss counts,
+exposed in the Prometheus text format at /metrics (local addresses only).
+
+Aggregation is lock-cheap: every thread writes to its own shard of counters
+and histograms without locking; only shard creation and the /metrics scrape
+take a lock. Each process keeps its own registry, so scrape every worker
+process (or run one process per port) when the portal runs several.
+"""
+import bisect
+import threading
+import time
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.template.backends.django import DjangoTemplates
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COMPONENTS = ('db', 'template', 'cache', 'engine')
+
+METRICS = {
+    'synergia_request_duration_seconds': ('histogram', "Request latency by view."),
+    'synergia_request_component_seconds': (
+        'histogram', "Time per request spent in one component (db, template, cache, engine), by view."),
+    'synergia_requests_total': ('counter', "Requests by view and status class."),
+    'synergia_cache_requests_total': ('counter', "Cache lookups by result (hit or miss)."),
+    'synergia_engine_seconds_total': ('counter', "Time inside synergia_rules calls, by function (outermost call)."),
+    'synergia_engine_calls_total': ('counter', "synergia_rules calls, by function (outermost call)."),
+}
+
+
+# --- Sharded registry ---
+
+class _Shard:
+    __slots__ = ('counters', 'histograms')
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}  # key -> [bucket counts (non-cumulative, +Inf last), sum, count]
+
+
+class MetricsRegistry:
+    """Counters and histograms keyed by (name, labels), with one shard per thread."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def inc(self, name, labels=(), amount=1):
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        histograms = self._shard().histograms
+        key = (name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        histogram[0][bisect.bisect_left(self.buckets, value)] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+    def collect(self):
+        """Sums the shards: ({key: value}, {key: [buckets, sum, count]})."""
+        counters, histograms = {}, {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, value in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0) + value
+            for key, (buckets, total, count) in list(shard.histograms.items()):
+                merged = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+                merged[1] += total
+                merged[2] += count
+        return counters, histograms
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_labels(labels)} {value}")
+                continue
+            for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), buckets):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {total}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for k, v in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+registry = MetricsRegistry()
+
+
+# --- Per-request component timers ---
+
+_request = threading.local()
+
+
+def _timings():
+    timings = getattr(_request, 'timings', None)
+    if timings is None:
+        timings = _request.timings = dict.fromkeys(COMPONENTS, 0.0)
+        _request.depth = dict.fromkeys(COMPONENTS, 0)
+    return timings
+
+
+def _start(component):
+    """Start time, or None when this component is already being timed further up the stack."""
+    _timings()
+    depth = _request.depth
+    if depth[component]:
+        return None
+    depth[component] = 1
+    return time.perf_counter()
+
+
+def _stop(component, start):
+    """Adds the time since 'start' to the component; returns it (0 for a nested call)."""
+    if start is None:
+        return 0.0
+    elapsed = time.perf_counter() - start
+    _request.timings[component] += elapsed
+    _request.depth[component] = 0
+    return elapsed
+
+
+def timed(component, fn):
+    """Wraps fn so its time counts towards 'component' (nested calls of the same component count once)."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = _start(component)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _stop(component, start)
+    return wrapper
+
+
+def _db_timer(execute, sql, params, many, context):
+    start = _start('db')
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        _stop('db', start)
+
+
+# --- Instrumented backends ---
+
+class InstrumentedLocMemCache(LocMemCache):
+    """LocMemCache that counts hits and misses and times lookups."""
+
+    _MISSING = object()
+
+    def get(self, key, default=None, version=None):
+        start = _start('cache')
+        try:
+            value = super().get(key, self._MISSING, version)
+        finally:
+            _stop('cache', start)
+        hit = value is not self._MISSING
+        registry.inc('synergia_cache_requests_total', (('result', 'hit' if hit else 'miss'),))
+        return value if hit else default
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+        self.render = timed('template', template.render)
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend whose templates time their rendering."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+# synergia_rules functions the web process calls directly (views, engine_server operations, dice rooms).
+# Inner helpers are left alone: every wrapper costs about a microsecond per call.
+ENGINE_ENTRY_POINTS = {
+    'DiceEngine': ('roll_XdY',),
+    'CombatMechanics': ('resolve_attack', 'expected_damage', 'damage_distribution'),
+    'PowerEconomy': ('calculate_cost', 'estimate_avg_damage'),
+}
+
+
+def instrument_engine():
+    """
+    Times the ENGINE_ENTRY_POINTS. Called by TelemetryMiddleware, so only the
+    web server process pays for it (not job workers or management commands).
+    """
+    from Game_Design.libs import synergia_rules
+
+    for class_name, names in ENGINE_ENTRY_POINTS.items():
+        cls = getattr(synergia_rules, class_name)
+        for name in names:
+            attr = vars(cls)[name]
+            if not getattr(attr.__func__, '_telemetry', False):
+                setattr(cls, name, staticmethod(_engine_timer(f"{class_name}.{name}", attr.__func__)))
+
+
+def _engine_timer(label, fn):
+    labels = (('function', label),)
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = _start('engine')
+        if start is None:
+            return fn(*args, **kwargs)  # Inner call of an instrumented call: already being timed
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            registry.inc('synergia_engine_seconds_total', labels, _stop('engine', start))
+            registry.inc('synergia_engine_calls_total', labels)
+    wrapper._telemetry = True
+    return wrapper
+
+
+# --- Middleware and endpoint ---
+
+class TelemetryMiddleware:
+    """Records latency and the component breakdown of every request (first in MIDDLEWARE)."""
+
+    def __init__(self, get_response):
+        if not settings.TELEMETRY_ENABLED:
+            raise MiddlewareNotUsed
+        instrument_engine()
+        self.get_response = get_response
+        self.static_prefix = settings.STATIC_URL
+
+    def __call__(self, request):
+        timings = _timings()
+        for component in COMPONENTS:
+            timings[component] = 0.0
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(_db_timer))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            view = match.view_name
+        elif request.path.startswith(self.static_prefix):
+            view = 'static'
+        else:
+            view = 'unmatched'
+        labels = (('view', view),)
+
+        registry.observe('synergia_request_duration_seconds', elapsed, labels)
+        registry.inc('synergia_requests_total', labels + (('status', f"{response.status_code // 100}xx"),))
+        for component in COMPONENTS:
+            registry.observe('synergia_request_component_seconds', timings[component],
+                             labels + (('component', component),))
+        return response
+
+
+def metrics(request):
+    """Prometheus scrape endpoint; 404 for anything but settings.METRICS_ALLOWED_IPS."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,3 +1,670 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import os
+import pickle
+import random
+import re
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.contrib.staticfiles import finders
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+
+import loadtest
+from Game_Design.dice_roller import analyze_stat_method, roll_exploding_pools, roll_stat_arrays
+from Game_Design.libs import (columnar, doe, engine_server, planner, result_cache, rule_versions, sensitivity, shards,
+                              sweeps)
+from Game_Design.libs.attack_kernels import compile_attack
+from Game_Design.libs.encounter_engine import Combatant, run_encounters
+from Game_Design.libs.roll_audit import AuditLog, RollStream, using_stream, verify_log
+from Game_Design.libs.synergia_rules import (
+    COMBAT_PARAMETERS, CombatMechanics, DiceEngine, Distribution, rule_overrides, rule_parameters,
+    set_rule_parameters
+)
+
+from .dice_rooms import InMemoryChannelLayer, resolve_message
+from .jobs import run_scenario_job, submit_job
+from .middleware import StaticAssetMiddleware
+from .models import PowerBuild
+from .power_tables import read_asset, tables_fingerprint
+
+TEMPLATES_DIR = Path(__file__).resolve().parent / 'templates'
+ATTACK = dict(num_dice=3, die_sides=8, adv_state=0, is_vicious=False, bonus_damage=0, armor_type='m', crit_rule='t')
+
+
+# --- Pages and static assets ---
+
+@override_settings(DEBUG=False, ALLOWED_HOSTS=['localhost'])
+class PageRenderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client(HTTP_HOST='localhost')
+
+    def test_pages_render_without_debug(self):
+        for url in ('/', '/criador-poderes/', '/pagina-teste/', '/simulacoes/', '/salas/mesa-1/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_static_references_exist(self):
+        for template in TEMPLATES_DIR.rglob('*.html'):
+            for name in re.findall(r"{% static '([^']+)' %}", template.read_text(encoding='utf-8')):
+                with self.subTest(template=template.name, asset=name):
+                    self.assertIsNotNone(finders.find(name))
+
+    def test_power_tables_asset_is_current(self):
+        call_command('export_power_tables', check=True, stdout=io.StringIO())
+
+    def test_power_tables_check_reads_the_contents(self):
+        asset = read_asset()
+        self.assertEqual(asset['tables_version'], tables_fingerprint(asset))
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, 'power_tables.json')
+            asset['economy']['max_pc_budget'] += 1  # Stale contents under the current version
+            path.write_text(json.dumps(asset), encoding='utf-8')
+            with self.assertRaises(CommandError):
+                call_command('export_power_tables', check=True, output=str(path), stdout=io.StringIO())
+
+
+class StaticAssetMiddlewareTests(SimpleTestCase):
+    def serve(self, accept_encoding):
+        with tempfile.TemporaryDirectory() as static_root:
+            for name, content in (('app.js', b'plain'), ('app.js.gz', b'gzip'), ('app.js.br', b'brotli')):
+                Path(static_root, name).write_bytes(content)
+            with override_settings(STATIC_ROOT=static_root):
+                middleware = StaticAssetMiddleware(lambda request: None)
+                request = RequestFactory().get('/static/app.js', HTTP_ACCEPT_ENCODING=accept_encoding)
+                response = middleware(request)
+                content = b''.join(response.streaming_content)
+                response.close()
+        return response, content
+
+    def test_encoding_follows_q_values(self):
+        for header, expected in (('gzip, br', b'brotli'), ('br;q=0, gzip', b'gzip'), ('gzip;q=0', b'plain'),
+                                 ('*;q=0.5, br;q=0', b'gzip'), ('identity', b'plain'), ('', b'plain')):
+            with self.subTest(header=header):
+                response, content = self.serve(header)
+                self.assertEqual(content, expected)
+                self.assertNotIn('Content-Disposition', response)
+
+
+# --- Attack kernels ---
+
+class KernelTests(SimpleTestCase):
+    def test_kernel_mean_matches_expected_damage(self):
+        for config in ((3, 8, 0, False, 0, 'm', 't'), (2, 6, 1, True, 2, 's', 'e'), (4, 10, -1, False, 3, 'b', 't')):
+            with self.subTest(config=config):
+                random.seed(0)
+                n = 200000
+                total, total_sq = compile_attack(*config).run(n)
+                mean = total / n
+                std_error = ((total_sq / n - mean ** 2) / n) ** 0.5
+                self.assertLess(abs(mean - CombatMechanics.expected_damage(*config)), 5 * std_error)
+
+    def test_invalid_configuration(self):
+        for config in ((0, 6, 0, False, 0, 's', 't'), (2, 6, 0, False, '1; x', 's', 't'), (2, 6, 0, False, 0, 'z', 't')):
+            with self.subTest(config=config):
+                with self.assertRaises(ValueError):
+                    compile_attack(*config)
+
+
+# --- Damage distributions ---
+
+class DistributionTests(SimpleTestCase):
+    def test_distribution_mean_matches_expected_damage(self):
+        for config in ((3, 8, 0, False, 0, 'm', 't'), (2, 6, 1, True, 2, 's', 'e'), (4, 10, -1, False, 3, 'b', 't')):
+            with self.subTest(config=config):
+                distribution = CombatMechanics.damage_distribution(*config)
+                self.assertAlmostEqual(distribution.pmf.sum(), 1.0)
+                self.assertAlmostEqual(distribution.mean(), CombatMechanics.expected_damage(*config))
+
+    def test_sum_of_dice(self):
+        three_d6 = Distribution.sum_of_dice(3, 6, 'exact')
+        self.assertAlmostEqual(three_d6.prob(10), 27 / 216)
+        self.assertAlmostEqual(three_d6.variance(), 3 * 35 / 12)
+
+        exact = Distribution.sum_of_dice(60, 6, 'exact')
+        approximate = Distribution.sum_of_dice(60, 6, 'edgeworth')
+        self.assertAlmostEqual(approximate.mean(), exact.mean(), places=6)
+        self.assertAlmostEqual(approximate.variance(), exact.variance(), places=3)
+        self.assertEqual(approximate.quantile(0.5), exact.quantile(0.5))
+
+
+# --- Engine sidecar ---
+
+class EngineOperationTests(SimpleTestCase):
+    def test_invalid_arguments_are_errors(self):
+        for args in (dict(ATTACK, num_dice=0), dict(ATTACK, num_dice=-5), dict(ATTACK, bonus_damage='1')):
+            with self.subTest(args=args):
+                self.assertIn('error', engine_server.run_operation('attack_analysis', args))
+
+    def test_stats_in_process(self):
+        self.assertTrue(engine_server.run_operation('stats', {})['result']['in_process'])
+
+    def test_failure_is_isolated_to_its_request(self):
+        server = engine_server.EngineServer()
+        responses = server.evaluate_batch([('attack_analysis', dict(ATTACK, num_dice=0)), ([], {}),
+                                           ('attack_analysis', {'x': {1, 2}}), ('attack_analysis', ATTACK)])
+        self.assertEqual(['error' in response for response in responses], [True, True, True, False])
+        self.assertIn('result', responses[3])
+
+        with mock.patch.object(engine_server, 'run_operation', side_effect=RuntimeError("boom")):
+            responses = server.evaluate_batch([('hello', {}), ('attack_analysis', ATTACK)])
+        self.assertIn('error', responses[0])
+        self.assertIn('result', responses[1])  # Served from the LRU filled above
+
+
+# --- Simulation jobs ---
+
+class JobTests(TestCase):
+    def test_identical_jobs_dedupe_within_a_rules_version(self):
+        job, created = submit_job('builds', {})
+        self.assertTrue(created)
+        self.assertEqual(submit_job('builds', {}), (job, False))
+
+    def test_rules_change_makes_a_new_job(self):
+        job, _ = submit_job('builds', {})
+        with override_settings(RULES_VERSION='other-rules'):
+            new_job, created = submit_job('builds', {})
+        self.assertTrue(created)
+        self.assertNotEqual(new_job.pk, job.pk)
+
+    def test_scenario_config_bounds(self):
+        for config in ({'adv_state': 200000}, {'bonus_damage': 10 ** 7}, {'seed': -1}, {'max_dice': 0}, []):
+            with self.subTest(config=config):
+                with self.assertRaises(ValueError):
+                    submit_job('scenario', config)
+
+    def test_submit_rejects_non_object_bodies(self):
+        for body in ([1, 2], 3, 'scenario'):
+            with self.subTest(body=body):
+                response = self.client.post('/jobs/', json.dumps(body), content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+
+    def test_scenario_job_uses_the_planner(self):
+        job, _ = submit_job('scenario', {'max_dice': 2, 'armor_type': 'm', 'crit_rule': 't'})
+        rows = [line.split(';') for line in run_scenario_job(job.config, lambda fraction: None).splitlines()]
+        self.assertAlmostEqual(float(rows[2][3]), CombatMechanics.expected_damage(2, 8, 0, False, 0, 'm', 't'),
+                               places=3)
+
+
+# --- Sharded sweeps ---
+
+class ScenarioShardTests(SimpleTestCase):
+    SCENARIO = (2, 0, False, 0, 'm', 't')  # max_dice, adv_state, is_vicious, bonus_damage, armor_type, crit_rule
+
+    def run_shards(self, of, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            parts = []
+            for shard in range(of):
+                path = os.path.join(directory, f"shard-{shard}.jsonl")
+                shards.run_scenario_shard(path, shard, of, *self.SCENARIO, **options)
+                parts.append(shards.read_shard(path))
+        header = parts[0][0]
+        return shards.merge_scenario(header, [record for _, records in parts for record in records])
+
+    def test_planned_shards_match_the_simulator(self):
+        csv_rows, _ = self.run_shards(2, n_simulations=2000)
+        max_dice, *attack = self.SCENARIO
+        self.assertEqual(csv_rows[2][3], f"{planner.average_damage(2, 8, *attack):.3f}")
+
+    def test_pooled_replicas_equal_the_single_runs(self):
+        _, summary = self.run_shards(3, n_simulations=5, replicas=2, method='monte_carlo', seed=7)
+        cell = next(cell for cell in summary['cells'] if (cell['num_dice'], cell['die_sides']) == (1, 6))
+        _, adv_state, is_vicious, bonus_damage, armor_type, crit_rule = self.SCENARIO
+        runs = [sweeps.damage_stats(1, 6, adv_state, is_vicious, bonus_damage, armor_type, crit_rule,
+                                    n_simulations=n, seed=sweeps.derive_seed(7, 1, 6, r))
+                for r, n in enumerate((3, 2))]
+        self.assertEqual(cell['n'], 5)
+        self.assertAlmostEqual(cell['mean'], (runs[0][0] * runs[0][1] + runs[1][0] * runs[1][1]) / 5)
+
+    def test_more_replicas_than_samples_is_rejected(self):
+        for options in (dict(n_simulations=2, replicas=3, method='monte_carlo'), dict(replicas=2),
+                        dict(n_simulations=0, method='monte_carlo')):
+            with self.subTest(options=options):
+                with self.assertRaises(ValueError):
+                    shards.run_scenario_shard(os.devnull, 0, 1, *self.SCENARIO, **options)
+
+
+# --- Dice rooms ---
+
+class DiceRoomTests(SimpleTestCase):
+    def test_attack_flags_must_be_json_booleans(self):
+        message = {'action': 'attack', 'expression': '3d8+2', 'armor_type': 'm'}
+        for is_vicious in ('false', 'true', 0, None):
+            with self.subTest(is_vicious=is_vicious):
+                with self.assertRaises(ValueError):
+                    resolve_message(dict(message, is_vicious=is_vicious))
+        for is_vicious in (False, True):
+            self.assertEqual(resolve_message(dict(message, is_vicious=is_vicious))['type'], 'attack')
+
+    def test_bad_messages(self):
+        for message in ([], {'action': 'roll', 'expression': '21#1d6'}, {'action': 'attack', 'expression': '2#3d8'},
+                        {'action': 'attack', 'expression': '3d8', 'adv_state': 4}, {'action': 'cast'}):
+            with self.subTest(message=message):
+                with self.assertRaises(ValueError):
+                    resolve_message(message)
+
+    def test_full_channel_drops_its_oldest_message(self):
+        async def scenario():
+            layer = InMemoryChannelLayer(capacity=2)
+            channel = layer.new_channel()
+            await layer.group_add('room.a', channel)
+            for n in range(3):
+                await layer.group_send('room.a', {'n': n})
+            received = [(await layer.receive(channel))['n'] for _ in range(2)]
+            await layer.group_discard('room.a', channel)
+            return received, layer.groups, layer.history('room.a')
+
+        self.assertEqual(asyncio.run(scenario()), ([1, 2], {}, []))
+
+
+# --- Dice roller ---
+
+class ExplodingPoolTests(SimpleTestCase):
+    def test_mean_matches_the_geometric_series(self):
+        # 3d6 exploding on 6: every round adds 3d6 (first) or one die per 6 (each), so the mean is 10.5 / (5/6)
+        for mode in ('first', 'each'):
+            with self.subTest(mode=mode):
+                totals = roll_exploding_pools(200000, 3, 6, 6, mode=mode, seed=0)
+                std_error = totals.std() / len(totals) ** 0.5
+                self.assertLess(abs(totals.mean() - 12.6), 5 * std_error)
+
+    def test_large_dice_do_not_overflow(self):
+        totals = roll_exploding_pools(1000, 2, 100000, 100001, seed=0)
+        self.assertTrue((totals >= 2).all() and (totals <= 200000).all())
+
+    def test_explosion_depth_is_bounded(self):
+        # Every die explodes on 1+, so each pool rolls exactly 1 + max_depth dice
+        for mode in ('first', 'each'):
+            totals = roll_exploding_pools(1000, 1, 6, 1, mode=mode, max_depth=4, seed=0)
+            self.assertTrue((totals >= 5).all() and (totals <= 30).all())
+
+
+# --- Encounters ---
+
+class EncounterTests(SimpleTestCase):
+    PARTY = [Combatant("A", hp=20, armor='m', num_dice=2, die_sides=8)]
+    MONSTERS = [Combatant("B", hp=20, armor='s', num_dice=2, die_sides=6)]
+
+    def test_seeded_encounters_restore_the_random_state(self):
+        random.seed(1)
+        expected = random.random()
+        random.seed(1)
+        run_encounters.uncached(self.PARTY, self.MONSTERS, n_encounters=50, seed=5)
+        self.assertEqual(random.random(), expected)
+
+    def test_bad_options_leave_the_random_state_alone(self):
+        random.seed(1)
+        expected = random.random()
+        random.seed(1)
+        with self.assertRaises(TypeError):
+            run_encounters.uncached(self.PARTY, self.MONSTERS, n_encounters=50, seed=5, unknown_option=True)
+        self.assertEqual(random.random(), expected)
+
+
+# --- Sweeps ---
+
+class SweepTests(SimpleTestCase):
+    @staticmethod
+    def product(**config):
+        return float(config['num_dice'] * config['die_sides'])
+
+    def test_journal_holds_one_sweep(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'journal.jsonl')
+            scenario = (0, False, 0, 'm', 't')
+            for _ in range(2):
+                sweeps.scenario_values(3, *scenario, average_fn=self.product, journal_path=path)
+            cells = 3 * len(sweeps.DICE_TYPES)
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(len(f.readlines()), cells)
+
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write('{"torn')
+            values = sweeps.scenario_values(3, *scenario, average_fn=self.product, journal_path=path, resume=True)
+            self.assertEqual(values[(3, 8)], 24.0)
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(len(f.readlines()), cells)
+
+    def test_failed_seeded_run_restores_the_random_state(self):
+        kernel = mock.Mock()
+        kernel.run.side_effect = KeyboardInterrupt
+        for function in (sweeps.average_damage, sweeps.damage_stats):
+            with self.subTest(function=function.__name__):
+                random.seed(1)
+                expected = random.random()
+                random.seed(1)
+                with mock.patch.object(sweeps, 'compile_attack', return_value=kernel):
+                    with self.assertRaises(KeyboardInterrupt):
+                        function.uncached(*ATTACK.values(), n_simulations=10, seed=5)
+                self.assertEqual(random.random(), expected)
+
+
+# --- Evaluation planner ---
+
+class PlannerTests(SimpleTestCase):
+    CONFIG = (3, 8, 0, False, 0, 'm', 't')
+
+    def test_exact_methods_agree_with_the_closed_form(self):
+        expected = CombatMechanics.expected_damage(*self.CONFIG)
+        evaluation = planner.Planner().evaluate(self.CONFIG, 'mean', tolerance=0.01)
+        self.assertAlmostEqual(evaluation['value'], expected)
+        self.assertEqual(evaluation['estimated_error'], 0.0)
+        self.assertAlmostEqual(planner.run_method('exact', 'mean', self.CONFIG), expected)
+
+    def test_failed_monte_carlo_run_restores_the_random_state(self):
+        kernel = mock.Mock()
+        kernel.run.side_effect = KeyboardInterrupt
+        random.seed(1)
+        expected = random.random()
+        random.seed(1)
+        with mock.patch.object(planner, 'compile_attack', return_value=kernel):
+            with self.assertRaises(KeyboardInterrupt):
+                planner.run_method('monte_carlo', 'mean', self.CONFIG, n_samples=10, seed=5)
+        self.assertEqual(random.random(), expected)
+
+    def test_resume_ignores_cells_of_another_method(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'journal.jsonl')
+            sweeps.scenario_values(2, 0, False, 0, 'm', 't', average_fn=SweepTests.product, journal_path=path)
+            calls = []
+
+            def other_method(**config):
+                calls.append(config)
+                return 0.0
+
+            sweeps.scenario_values(2, 0, False, 0, 'm', 't', average_fn=other_method, journal_path=path, resume=True)
+            self.assertEqual(len(calls), 2 * len(sweeps.DICE_TYPES))
+
+
+# --- Build catalog ---
+
+class BuildListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for num_dice, die_type, cost in ((2, 6, 6.0), (4, 8, 16.0), (6, 8, 24.0)):
+            avg = num_dice * (die_type + 1) / 2
+            PowerBuild.objects.create(
+                num_dice=num_dice, die_type=die_type, range_blocks=0, area_blocks=0, damage_cost=cost, range_cost=0,
+                area_cost=0, total_pc_cost=cost, avg_damage=avg, expected_damage_s=avg, expected_damage_m=avg,
+                expected_damage_p=avg, expected_damage_b=avg)
+
+    def test_filters_and_order(self):
+        response = self.client.get('/api/builds/', {'max_cost': 20, 'order': 'damage'})
+        self.assertEqual([build['num_dice'] for build in response.json()['results']], [4, 2])
+        response = self.client.get('/api/builds/', {'die_type': 8, 'min_damage': 20, 'order': 'cost'})
+        self.assertEqual([build['num_dice'] for build in response.json()['results']], [6])
+
+    def test_limit_is_clamped(self):
+        response = self.client.get('/api/builds/', {'limit': -5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+        self.assertEqual(self.client.get('/api/builds/', {'limit': 'x'}).status_code, 400)
+
+
+# --- Result cache ---
+
+calls = []
+
+
+@result_cache.cached(parameters=COMBAT_PARAMETERS)
+def cached_square(x, seed=0):
+    calls.append(x)
+    return x * x
+
+
+class ResultCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = result_cache.ResultCache(os.path.join(directory.name, 'results.sqlite3'), 1024 * 1024)
+        patcher = mock.patch.object(result_cache, '_default_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        calls.clear()
+
+    def test_seeded_calls_are_computed_once(self):
+        self.assertEqual([cached_square(3), cached_square(3), cached_square(3, seed=1)], [9, 9, 9])
+        self.assertEqual(calls, [3, 3])
+        cached_square(3, seed=None)  # Not reproducible: always runs
+        self.assertEqual(len(calls), 3)
+
+    def test_parameter_change_invalidates(self):
+        cached_square(4)
+        previous = set_rule_parameters({'CombatMechanics.ARMOR_DIVISOR': 3})
+        try:
+            cached_square(4)
+        finally:
+            set_rule_parameters(previous)
+        cached_square(4)
+        self.assertEqual(calls, [4, 4])
+
+    def test_least_recently_used_entries_are_evicted(self):
+        size = len(pickle.dumps(b'x' * 100, protocol=pickle.HIGHEST_PROTOCOL))
+        cache = result_cache.ResultCache(self.cache.path, max_bytes=3 * size)  # Room for three entries
+        for key in ('a', 'b', 'c'):
+            cache.set(key, b'x' * 100)
+        cache.get('a')
+        cache.set('d', b'x' * 100)
+        self.assertEqual([cache.get(key)[0] for key in 'abcd'], [True, False, True, True])
+
+
+# --- Columnar tables ---
+
+class ColumnarTests(SimpleTestCase):
+    BUILDS = [
+        {"Damage_Description": "2d6", "Range_Blocks": 1, "Area_Blocks": 0, "Total_PC_Cost": 6.5, "Avg_Damage": 7.0,
+         "Damage_Cost": 6.0, "Range_Cost": 0, "Area_Cost": 0},
+        {"Damage_Description": "10d12", "Range_Blocks": 4, "Area_Blocks": 2, "Total_PC_Cost": 64.0,
+         "Avg_Damage": 65.0, "Damage_Cost": 60.0, "Range_Cost": 2, "Area_Cost": 2},
+    ]
+
+    def test_save_load_round_trip(self):
+        table = columnar.builds_table(self.BUILDS)
+        with tempfile.TemporaryDirectory() as directory:
+            path = columnar.save_table(os.path.join(directory, 'builds'), table, 'builds', {'note': 'test'})
+            loaded, schema = columnar.load_table(path)
+            self.assertEqual(loaded.tolist(), table.tolist())
+            self.assertEqual((schema['kind'], schema['rows'], schema['metadata']), ('builds', 2, {'note': 'test'}))
+            self.assertEqual(columnar.builds_csv_rows(loaded)[2][0], '10d12')
+
+            schema['rows'] = 3
+            with open(columnar.schema_path(path), 'w', encoding='utf-8') as f:
+                json.dump(schema, f)
+            with self.assertRaises(ValueError):
+                columnar.load_table(path)
+
+    def test_scenario_csv_round_trip(self):
+        values = {(i, y): i * y / 3 for i in range(1, 4) for y in sweeps.DICE_TYPES}
+        table = columnar.scenario_table(3, values)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'scenario.csv')
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f, delimiter=';').writerows(columnar.scenario_csv_rows(table))
+            self.assertEqual(columnar.scenario_table_from_csv(path).tolist(),
+                             [tuple(round(v, 3) for v in row) for row in table.tolist()])
+
+
+# --- Stat arrays ---
+
+class StatArrayTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_stat_odds_rejects_huge_methods(self):
+        self.assertEqual(self.client.get('/api/stat-odds/', {'method': '2#4000d20'}).status_code, 400)
+        response = self.client.get('/api/stat-odds/', {'method': '6#4d6dl1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(18 <= response.json()['avg_total'] <= 108)
+
+    def test_stat_arrays_do_not_overflow(self):
+        arrays = roll_stat_arrays('2#4000d20', 50, seed=0)
+        self.assertTrue((arrays >= 4000).all() and (arrays <= 80000).all())
+
+    def test_drop_lowest_matches_the_known_mean(self):
+        # 4d6 drop the lowest averages 15869/1296 per stat
+        arrays = roll_stat_arrays('6#4d6dl1', 100000, seed=0)
+        self.assertAlmostEqual(arrays.mean(), 15869 / 1296, places=1)
+        self.assertEqual(arrays.shape, (100000, 6))
+
+    def test_analysis_is_seeded(self):
+        analysis = analyze_stat_method('6#3d6', 20000, seed=3)
+        self.assertEqual(analysis, analyze_stat_method('6#3d6', 20000, seed=3))
+        self.assertAlmostEqual(analysis['avg_total'], 63, delta=0.5)
+        odds = [analysis['prob_at_least_one'][n] for n in (15, 16, 17, 18)]
+        self.assertEqual(odds, sorted(odds, reverse=True))
+
+
+# --- Roll audit ---
+
+class RollAuditTests(SimpleTestCase):
+    def test_round_trip_with_concurrent_rolls(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'audit.log')
+            log = AuditLog(path)
+            stream = RollStream(seed=7, log=log, name='room')
+            stop = threading.Event()
+
+            def other_rolls():  # Another room / view: must neither be recorded nor draw from the stream
+                while not stop.is_set():
+                    DiceEngine.roll_XdY(3, 6)
+
+            thread = threading.Thread(target=other_rolls)
+            thread.start()
+            try:
+                with using_stream(stream):
+                    for _ in range(100):
+                        DiceEngine.roll_XdY(2, 8)
+                        CombatMechanics.resolve_attack(*ATTACK.values())
+            finally:
+                stop.set()
+                thread.join()
+                log.close()
+
+            self.assertIsNone(DiceEngine.stream.get())
+            self.assertEqual(list(verify_log(path).values()), [(200, [])])
+
+    def test_seeded_streams_replay(self):
+        rolls = []
+        for _ in range(2):
+            with using_stream(RollStream(seed=11)):
+                rolls.append([DiceEngine.roll_XdY(4, 6) for _ in range(20)])
+        self.assertEqual(rolls[0], rolls[1])
+
+
+# --- API bounds and load mix ---
+
+class ApiBoundsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_attack_analysis_bounds(self):
+        self.assertEqual(self.client.get('/api/attack-analysis/', {'bonus_damage': 10 ** 7}).status_code, 400)
+        self.assertEqual(self.client.get('/api/attack-analysis/', {'num_dice': 0}).status_code, 400)
+        self.assertEqual(self.client.get('/api/attack-analysis/', {'bonus_damage': 5}).status_code, 200)
+
+    def test_validate_power_bounds(self):
+        self.assertEqual(self.client.get('/api/validate-power/', {'num_dice': 10 ** 6, 'die_type': 6}).status_code, 400)
+        self.assertEqual(self.client.get('/api/validate-power/', {'num_dice': 3, 'die_type': 6}).status_code, 200)
+
+    def test_load_mix_requests_are_valid(self):
+        traffic = loadtest.TrafficMix(loadtest.DEFAULT_MIX, seed=0)
+        for _ in range(40):
+            _, path = traffic.next_request()
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 200)
+
+    def test_percentiles_and_summary(self):
+        self.assertEqual(loadtest.percentile([0.1, 0.2, 0.3, 0.4], 50), 0.2)
+        self.assertIsNone(loadtest.percentile([], 95))
+        summary = loadtest.summarize([('home', 0.01, 200), ('home', 0.03, 500)], elapsed=2.0)
+        self.assertEqual((summary['overall']['requests'], summary['overall']['errors']), (2, 1))
+        self.assertEqual(summary['endpoints']['home']['throughput_rps'], 1.0)
+
+
+# --- Design of experiments ---
+
+class DesignTests(SimpleTestCase):
+    def test_designs_stratify_every_axis(self):
+        rng = np.random.default_rng(0)
+        for name, points in (('lhs', doe.latin_hypercube(16, 6, rng)), ('sobol', doe.sobol(16, 6, rng))):
+            with self.subTest(design=name):
+                self.assertEqual(points.shape, (16, 6))
+                self.assertTrue(((points >= 0) & (points < 1)).all())
+                for axis in points.T:  # One point in each sixteenth of every axis
+                    self.assertEqual(sorted((axis * 16).astype(int)), list(range(16)))
+
+    def test_configs_stay_on_the_grid(self):
+        levels = doe.factor_levels(max_dice=6, max_bonus=3)
+        for config in doe.design_points('sobol', 64, levels, np.random.default_rng(0)):
+            for factor in doe.FACTORS:
+                self.assertIn(config[factor], levels[factor])
+
+    def test_surrogate_tracks_the_engine(self):
+        result = doe.run_doe(max_dice=6, max_bonus=3, n_points=64, design='sobol', degree=2)
+        self.assertGreater(result['errors']['all']['r2'], 0.99)
+        config = result['holdout']['configs'][0]
+        self.assertAlmostEqual(result['surrogate'].predict('m', **config),
+                               CombatMechanics.expected_damage(armor_type='m', **config), delta=1.0)
+
+
+# --- Rule versions ---
+
+class RuleVersionTests(SimpleTestCase):
+    SPEC = {"max_dice": 2, "adv_state": 0, "is_vicious": False, "bonus_damage": 0, "armor_type": "p",
+            "crit_rule": "t", "seed": 0, "n_simulations": 1000, "method": "planned"}
+
+    def test_only_affected_outputs_are_recomputed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            manifest = rule_versions.RuleManifest(os.path.join(directory, 'manifest.json'))
+            npy = os.path.join(directory, 'scenario.npy')
+            table = rule_versions.build_scenario(self.SPEC)
+            rule_versions.write_output({"kind": "scenario", "spec": self.SPEC, "npy": npy}, table)
+            name = manifest.record_output("scenario", self.SPEC, npy=npy)
+
+            with rule_overrides({'PowerEconomy.MAX_PC_BUDGET': 70}):  # Scenario grids do not read the economy
+                self.assertEqual(manifest.stale_outputs(), {})
+
+            with rule_overrides({'CombatMechanics.ARMOR_DIVISOR': 3}):
+                self.assertEqual(manifest.stale_outputs(), {name: {'CombatMechanics.ARMOR_DIVISOR': (2, 3)}})
+                [report] = rule_versions.recompute(manifest)
+                self.assertEqual(manifest.stale_outputs(), {})
+                new_value = CombatMechanics.expected_damage(2, 8, 0, False, 0, 'p', 't')
+
+            diff = report["diff"]
+            self.assertEqual((diff["rows_before"], diff["rows_after"], diff["changed"]), (2, 2, 2))
+            self.assertEqual(set(diff["columns"]), {f"d{y}" for y in sweeps.DICE_TYPES})
+            self.assertAlmostEqual(columnar.load_table(npy)[0][1]["d8"], new_value)
+            self.assertEqual(len(manifest.data["versions"]), 2)
+
+
+# --- Sensitivity analysis ---
+
+class SensitivityTests(SimpleTestCase):
+    def test_time_to_kill(self):
+        self.assertEqual(sensitivity.time_to_kill(Distribution.point(5), 30), 6.0)
+        self.assertEqual(sensitivity.time_to_kill(Distribution.point(0), 30), float('inf'))
+        self.assertAlmostEqual(sensitivity.time_to_kill(Distribution.die(6), 1), 1.0)
+
+    def test_damage_cost_is_linear_in_the_dice(self):
+        rows = {row['factor']: row for row in sensitivity.economy_sensitivity(10, 6, 4, 2)['tornado']['custo_dano']}
+        self.assertAlmostEqual(rows['num_dice']['elasticity'], 1.0)
+        self.assertAlmostEqual(rows['die_type']['elasticity'], 1.0)
+        self.assertEqual(rows['range_blocks']['swing'], 0)
+
+    def test_combat_tornado_is_sorted_and_restores_the_rules(self):
+        parameters = rule_parameters()
+        report = sensitivity.combat_sensitivity(4, 8, 0, False, 0, 'm', 't')
+        self.assertEqual(rule_parameters(), parameters)
+        rows = report['tornado']['expected_damage']
+        self.assertEqual([abs(row['swing']) for row in rows], sorted((abs(row['swing']) for row in rows), reverse=True))
+        num_dice = next(row for row in rows if row['factor'] == 'num_dice')
+        self.assertAlmostEqual(num_dice['output_high'], CombatMechanics.expected_damage(5, 8, 0, False, 0, 'm', 't'))
@@ -0,0 +1,20 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'synergia'
+
+urlpatterns = [
+    path('', views.home, name='home'),
+    path('criador-poderes/', views.criador_poderes, name='criador-poderes'),
+    path('pagina-teste/', views.pagina_teste, name='pagina-teste'),
+    path('api/builds/', views.build_list, name='build-list'),
+    path('api/stat-odds/', views.stat_odds, name='stat-odds'),
+    path('api/validate-power/', views.validate_power, name='validate-power'),
+    path('api/attack-analysis/', views.attack_analysis, name='attack-analysis'),
+    path('simulacoes/', views.simulacoes, name='simulacoes'),
+    path('salas/<slug:room>/', views.dice_room, name='dice-room'),
+    path('jobs/', views.job_submit, name='job-submit'),
+    path('jobs/<int:job_id>/', views.job_status, name='job-status'),
+    path('jobs/<int:job_id>/result.csv', views.job_result, name='job-result'),
+]
@@ -1,3 +1,235 @@
-from django.shortcuts import render
+import json
 
-# Create your views here.
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_GET, require_POST
+
+from Game_Design.balance.balancete_magico import DIE_TYPES_Y, MAX_ALCANCE, MAX_AREA, MAX_DICE_X
+from Game_Design.dice_roller import analyze_stat_method, parse_stat_method
+from Game_Design.libs.engine_server import MAX_ADVANTAGE, MAX_ATTACK_BONUS, MAX_ATTACK_DICE, MAX_ATTACK_SIDES
+from Game_Design.libs.synergia_rules import CombatMechanics
+
+from . import engine_client
+from .jobs import submit_job
+from .models import PowerBuild, SimulationJob
+from .power_tables import expected_tables_version
+
+BUILD_FIELDS = (
+    'num_dice', 'die_type', 'range_blocks', 'area_blocks',
+    'damage_cost', 'range_cost', 'area_cost', 'total_pc_cost',
+    'avg_damage', 'expected_damage_s', 'expected_damage_m', 'expected_damage_p', 'expected_damage_b',
+)
+BUILD_ORDERINGS = {
+    'damage': ('-avg_damage', 'total_pc_cost'),
+    'cost': ('total_pc_cost', '-avg_damage'),
+}
+MAX_BUILDS_PER_PAGE = 200
+STAT_ODDS_ARRAYS = 200000
+STAT_ODDS_SEED = 0  # Fixed: the same method always shows the same odds (and is cacheable)
+MAX_STAT_ODDS_STATS = 12
+MAX_STAT_ODDS_DICE = 10
+MAX_STAT_ODDS_SIDES = 100
+
+# Anonymous rules pages: identical for every player until the rules change.
+# They never touch the session or CSRF token, so responses carry no 'Vary: Cookie'
+# and one cached copy per URL serves everyone.
+cache_rules_page = cache_page(settings.PAGE_CACHE_SECONDS, key_prefix=f"pages-{settings.RULES_VERSION}")
+
+
+@cache_rules_page
+def home(request):
+    return render(request, 'pages/home.html', {'title': 'Home'})
+
+
+@cache_rules_page
+def criador_poderes(request):
+    return render(request, 'pages/criador-poderes.html', {'tables_version': expected_tables_version()})
+
+
+@cache_rules_page
+def pagina_teste(request):
+    return render(request, 'pages/pagina_teste.html')
+
+
+def build_list(request):
+    """
+    Filters the PowerBuild catalog in the database (an API for scripts: the power
+    creator previews builds from the static power tables instead).
+    Query params: max_cost, die_type, min_damage, order (damage|cost), limit.
+    """
+    try:
+        builds = PowerBuild.objects.all()
+        if 'max_cost' in request.GET:
+            builds = builds.filter(total_pc_cost__lte=float(request.GET['max_cost']))
+        if 'die_type' in request.GET:
+            builds = builds.filter(die_type=int(request.GET['die_type']))
+        if 'min_damage' in request.GET:
+            builds = builds.filter(avg_damage__gte=float(request.GET['min_damage']))
+        limit = max(1, min(int(request.GET.get('limit', 50)), MAX_BUILDS_PER_PAGE))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid filter value.'}, status=400)
+
+    ordering = BUILD_ORDERINGS.get(request.GET.get('order', 'damage'))
+    if ordering is None:
+        return JsonResponse({'error': f"order must be one of {list(BUILD_ORDERINGS)}."}, status=400)
+
+    results = list(builds.order_by(*ordering).values(*BUILD_FIELDS)[:limit])
+    return JsonResponse({'count': len(results), 'results': results})
+
+
+@require_GET
+@cache_rules_page
+def stat_odds(request):
+    """
+    Odds of a stat-generation method for the character creator.
+    Query param: method (rollem notation, default 6#4d6dl1; '#' must be sent as %23).
+    """
+    method = request.GET.get('method', '6#4d6dl1')
+    try:
+        stats, x, y, _, _ = parse_stat_method(method)
+        if stats > MAX_STAT_ODDS_STATS or x > MAX_STAT_ODDS_DICE or y > MAX_STAT_ODDS_SIDES:
+            raise ValueError(f"At most {MAX_STAT_ODDS_STATS} stats of {MAX_STAT_ODDS_DICE} dice "
+                             f"with {MAX_STAT_ODDS_SIDES} sides.")
+        report = analyze_stat_method(method, STAT_ODDS_ARRAYS, seed=STAT_ODDS_SEED)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(report)
+
+
+@cache_rules_page
+def dice_room(request, room):
+    """Live dice room page; the rolls themselves go over the WebSocket (core.dice_rooms)."""
+    return render(request, 'pages/dice_room.html', {'room': room})
+
+
+@require_GET
+@cache_rules_page
+def validate_power(request):
+    """
+    Cost and average damage of one power (PowerEconomy, through the engine sidecar).
+    Query params: num_dice, die_type, range_blocks, area_blocks.
+    """
+    try:
+        num_dice = int(request.GET['num_dice'])
+        die_type = int(request.GET['die_type'])
+        range_blocks = int(request.GET.get('range_blocks', 0))
+        area_blocks = int(request.GET.get('area_blocks', 0))
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'num_dice and die_type are required integers.'}, status=400)
+    # Same limits as the build catalog (balancete_magico)
+    if not (1 <= num_dice <= MAX_DICE_X and 1 <= die_type <= max(DIE_TYPES_Y)
+            and 0 <= range_blocks <= MAX_ALCANCE and 0 <= area_blocks <= MAX_AREA):
+        return JsonResponse({'error': f"num_dice must be 1-{MAX_DICE_X}, die_type 1-{max(DIE_TYPES_Y)}, "
+                                      f"range_blocks 0-{MAX_ALCANCE} and area_blocks 0-{MAX_AREA}."}, status=400)
+
+    try:
+        cost = engine_client.call('power_cost', num_dice=num_dice, die_type=die_type, range_blocks=range_blocks,
+                                  area_blocks=area_blocks)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'num_dice': num_dice, 'die_type': die_type, 'range_blocks': range_blocks, 'area_blocks': area_blocks,
+        **cost,
+    })
+
+
+@require_GET
+@cache_rules_page
+def attack_analysis(request):
+    """
+    Exact damage analysis of one attack configuration (engine_server.attack_analysis).
+    Query params: num_dice, die_sides, adv_state, is_vicious, bonus_damage, armor_type, crit_rule.
+    """
+    try:
+        num_dice = int(request.GET.get('num_dice', 1))
+        die_sides = int(request.GET.get('die_sides', 6))
+        adv_state = int(request.GET.get('adv_state', 0))
+        bonus_damage = int(request.GET.get('bonus_damage', 0))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid number.'}, status=400)
+    is_vicious = request.GET.get('is_vicious', 'false').lower() in ('1', 'true', 's', 'on')
+    armor_type = request.GET.get('armor_type', 's')
+    crit_rule = request.GET.get('crit_rule', 't')
+    if not (1 <= num_dice <= MAX_ATTACK_DICE and 2 <= die_sides <= MAX_ATTACK_SIDES
+            and -MAX_ADVANTAGE <= adv_state <= MAX_ADVANTAGE and 0 <= bonus_damage <= MAX_ATTACK_BONUS):
+        return JsonResponse({'error': f"num_dice must be 1-{MAX_ATTACK_DICE}, die_sides 2-{MAX_ATTACK_SIDES}, "
+                                      f"adv_state -{MAX_ADVANTAGE} to {MAX_ADVANTAGE} "
+                                      f"and bonus_damage 0-{MAX_ATTACK_BONUS}."}, status=400)
+    if armor_type not in CombatMechanics.ARMOR_TIERS or crit_rule not in ('e', 't'):
+        return JsonResponse({'error': 'armor_type must be s, m, p or b and crit_rule e or t.'}, status=400)
+
+    try:
+        analysis = engine_client.call('attack_analysis', num_dice=num_dice, die_sides=die_sides, adv_state=adv_state,
+                                      is_vicious=is_vicious, bonus_damage=bonus_damage, armor_type=armor_type,
+                                      crit_rule=crit_rule)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'num_dice': num_dice, 'die_sides': die_sides, 'adv_state': adv_state, 'is_vicious': is_vicious,
+        'bonus_damage': bonus_damage, 'armor_type': armor_type, 'crit_rule': crit_rule,
+        **analysis,
+    })
+
+
+# --- Background simulation jobs ---
+
+def simulacoes(request):
+    return render(request, 'pages/simulacoes.html', {'recent_jobs': SimulationJob.objects.order_by('-created_at')[:20]})
+
+
+def job_payload(job):
+    return {
+        'id': job.pk,
+        'kind': job.kind,
+        'config': job.config,
+        'status': job.status,
+        'progress': round(job.progress, 3),
+        'error': job.error,
+        'status_url': reverse('synergia:job-status', args=[job.pk]),
+        'result_url': reverse('synergia:job-result', args=[job.pk]) if job.status == SimulationJob.DONE else None,
+    }
+
+
+@require_POST
+def job_submit(request):
+    """Accepts JSON {"kind": ..., "config": {...}} or a form with 'kind' and the config fields."""
+    if request.content_type == 'application/json':
+        try:
+            body = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON body.'}, status=400)
+        if not isinstance(body, dict):
+            return JsonResponse({'error': 'The JSON body must be an object.'}, status=400)
+        kind, config = body.get('kind'), body.get('config', {})
+    else:
+        config = request.POST.dict()
+        kind = config.pop('kind', None)
+        config.pop('csrfmiddlewaretoken', None)
+
+    try:
+        job, created = submit_job(kind, config)
+    except (TypeError, ValueError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    payload = job_payload(job)
+    payload['deduplicated'] = not created
+    return JsonResponse(payload, status=201 if created else 200)
+
+
+@require_GET
+def job_status(request, job_id):
+    job = get_object_or_404(SimulationJob.objects.defer('result_csv'), pk=job_id)
+    return JsonResponse(job_payload(job))
+
+
+@require_GET
+def job_result(request, job_id):
+    job = get_object_or_404(SimulationJob, pk=job_id)
+    if job.status != SimulationJob.DONE:
+        return JsonResponse({'error': f"Job is {job.status}."}, status=409)
+    response = HttpResponse(job.result_csv, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="synergia_{job.kind}_{job.pk}.csv"'
+    return response
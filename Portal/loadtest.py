@@ -0,0 +1,243 @@
+"""
+Load generator for a locally running portal (standard library only).
+
+Opens 'concurrency' keep-alive HTTP/1.1 connections from asyncio clients and
+replays a traffic mix of page views, power validations and attack analyses.
+Attack configurations follow a Zipf popularity (a few builds are requested
+far more often than the rest). Writes throughput, latency percentiles and
+error rates per endpoint to a JSON report, tagged with the current commit so
+runs can be compared. Compare reports taken against the same server: Django's
+runserver adds a ~40ms floor per keep-alive request (delayed ACKs), which
+hides small changes in the views themselves.
+
+    python manage.py runserver --noreload 8000   # or any WSGI/ASGI server
+    python loadtest.py --url http://127.0.0.1:8000 --concurrency 32 --duration 30 -o report.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import subprocess
+import time
+from urllib.parse import urlencode, urlsplit
+
+DEFAULT_MIX = {'home': 30, 'criador-poderes': 15, 'validate-power': 25, 'attack-analysis': 30}
+ZIPF_EXPONENT = 1.1
+MAX_ATTACK_CONFIGS = 5000  # Popularity ranks drawn from (the tail beyond is never requested)
+PERCENTILES = (50, 95, 99)
+
+
+# --- Traffic ---
+
+class TrafficMix:
+    """Draws request paths: endpoint by weight, attack configurations by Zipf rank."""
+
+    def __init__(self, mix, seed, zipf_exponent=ZIPF_EXPONENT):
+        self.rng = random.Random(seed)
+        self.endpoints = list(mix)
+        self.endpoint_weights = list(itertools.accumulate(mix.values()))
+
+        configs = list(itertools.product(range(1, 11), (4, 6, 8, 10, 12), (-1, 0, 1), ('false', 'true'),
+                                         (0, 2, 5), ('s', 'm', 'p', 'b'), ('e', 't')))
+        self.rng.shuffle(configs)  # Popularity is unrelated to the configuration itself
+        self.attack_configs = configs[:MAX_ATTACK_CONFIGS]
+        self.attack_weights = list(itertools.accumulate(
+            1 / rank ** zipf_exponent for rank in range(1, len(self.attack_configs) + 1)
+        ))
+
+    def next_request(self):
+        endpoint = self.rng.choices(self.endpoints, cum_weights=self.endpoint_weights)[0]
+        if endpoint == 'home':
+            return endpoint, '/'
+        if endpoint == 'criador-poderes':
+            return endpoint, '/criador-poderes/'
+        if endpoint == 'validate-power':
+            params = {'num_dice': self.rng.randint(1, 30), 'die_type': self.rng.choice((4, 6, 8, 10, 12)),
+                      'range_blocks': self.rng.randint(0, 20), 'area_blocks': self.rng.randint(0, 36)}
+            return endpoint, '/api/validate-power/?' + urlencode(params)
+        config = self.rng.choices(self.attack_configs, cum_weights=self.attack_weights)[0]
+        keys = ('num_dice', 'die_sides', 'adv_state', 'is_vicious', 'bonus_damage', 'armor_type', 'crit_rule')
+        return endpoint, '/api/attack-analysis/?' + urlencode(dict(zip(keys, config)))
+
+
+# --- Minimal keep-alive HTTP/1.1 client ---
+
+class HttpConnection:
+    def __init__(self, host, port, timeout):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.reader = self.writer = None
+
+    async def get(self, path):
+        """Returns (status, body length). Reconnects when the server closed the connection."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout)
+        request = f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nAccept-Encoding: identity\r\n\r\n"
+        self.writer.write(request.encode('latin-1'))
+        return await asyncio.wait_for(self._read_response(), self.timeout)
+
+    async def _read_response(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection.")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            length = 0
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                await self.reader.readexactly(size + 2)
+                length += size
+                if size == 0:
+                    break
+        elif 'content-length' in headers:
+            length = int(headers['content-length'])
+            await self.reader.readexactly(length)
+        else:
+            length = len(await self.reader.read())  # Body delimited by the connection close
+            headers['connection'] = 'close'
+
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, length
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+# --- Run ---
+
+async def client(host, port, traffic, deadline, results, timeout):
+    connection = HttpConnection(host, port, timeout)
+    try:
+        while time.monotonic() < deadline:
+            endpoint, path = traffic.next_request()
+            start = time.perf_counter()
+            try:
+                status, _ = await connection.get(path)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+                status = type(e).__name__
+                connection.close()
+            results.append((endpoint, time.perf_counter() - start, status))
+    finally:
+        connection.close()
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-p * len(sorted_values) // 100))  # ceil(p/100 * n)
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(results, elapsed):
+    """Throughput, latency percentiles (ms) and errors, overall and per endpoint."""
+    def stats(rows):
+        latencies = sorted(latency for _, latency, _ in rows)
+        statuses = {}
+        for _, _, status in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        errors = sum(count for status, count in statuses.items() if not ('200' <= status < '400'))
+        summary = {
+            'requests': len(rows),
+            'throughput_rps': len(rows) / elapsed if elapsed else 0.0,
+            'errors': errors,
+            'error_rate': errors / len(rows) if rows else 0.0,
+            'status_counts': statuses,
+            'latency_ms': {'mean': 1000 * sum(latencies) / len(latencies) if latencies else None,
+                           'max': 1000 * latencies[-1] if latencies else None},
+        }
+        for p in PERCENTILES:
+            value = percentile(latencies, p)
+            summary['latency_ms'][f"p{p}"] = None if value is None else 1000 * value
+        return summary
+
+    endpoints = sorted({endpoint for endpoint, _, _ in results})
+    return {
+        'overall': stats(results),
+        'endpoints': {e: stats([row for row in results if row[0] == e]) for e in endpoints},
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_load(url, concurrency, duration, warmup, mix, seed, timeout):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    traffic = TrafficMix(mix, seed)
+
+    if warmup > 0:
+        await asyncio.gather(*(client(host, port, traffic, time.monotonic() + warmup, [], timeout)
+                               for _ in range(concurrency)))
+
+    results = []
+    start = time.monotonic()
+    await asyncio.gather(*(client(host, port, traffic, start + duration, results, timeout)
+                           for _ in range(concurrency)))
+    return summarize(results, time.monotonic() - start)
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{name}' (choose from {list(DEFAULT_MIX)}).")
+        mix[name] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test a locally running Synergia portal.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=16, help="Simultaneous keep-alive clients.")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds.")
+    parser.add_argument("--warmup", type=float, default=3, help="Unmeasured seconds first (fills caches).")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Endpoint weights, e.g. home=30,criador-poderes=15,validate-power=25,attack-analysis=30")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the traffic mix.")
+    parser.add_argument("--timeout", type=float, default=30, help="Seconds before a request counts as failed.")
+    parser.add_argument("-o", "--output", default="loadtest_report.json")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run_load(args.url, args.concurrency, args.duration, args.warmup, args.mix, args.seed,
+                                   args.timeout))
+    report = {
+        'commit': current_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'config': {'url': args.url, 'concurrency': args.concurrency, 'duration': args.duration,
+                   'warmup': args.warmup, 'mix': args.mix, 'seed': args.seed, 'zipf_exponent': ZIPF_EXPONENT},
+        **summary,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    overall = report['overall']
+    print(f"{overall['requests']:,} requests, {overall['throughput_rps']:.1f} req/s, "
+          f"error rate {overall['error_rate'] * 100:.2f}%")
+    for endpoint, stats in report['endpoints'].items():
+        latency = stats['latency_ms']
+        print(f"  {endpoint:<16} p50 {latency['p50']:.1f}ms  p95 {latency['p95']:.1f}ms  p99 {latency['p99']:.1f}ms"
+              f"  errors {stats['errors']}")
+    print(f"Report written to '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()